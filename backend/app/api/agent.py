@@ -5,18 +5,26 @@ This module provides REST API endpoints to interact with the autonomous debuggin
 Enhanced with automatic retry logic for failed fixes.
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, validator
-from typing import Optional, Dict, Any, List, Generator
-from sqlalchemy.orm import Session
+from typing import Optional, Dict, Any, List, AsyncGenerator, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
+import json
+import base64
+import uuid
+from datetime import datetime, timezone
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
 from core.agent import BugExorcistAgent, quick_fix, fix_with_retry
-from app.database import SessionLocal
-from app import crud
+from core.error_signature import error_signature
+from app.database import AsyncSessionLocal, get_async_db
+from app import async_crud
+from app.usage_buffer import attempt_usage
 
 
 router = APIRouter(prefix="/api/agent", tags=["agent"])
@@ -34,6 +42,9 @@ class BugAnalysisRequest(BaseModel):
     openai_api_key: Optional[str] = Field(None, description="OpenAI API key (optional, uses env if not provided)")
     use_retry: bool = Field(True, description="Enable automatic retry logic (default: True)")
     max_attempts: int = Field(3, description="Maximum retry attempts (default: 3, max: 5)", ge=1, le=5)
+    race: bool = Field(False, description="Generate max_attempts candidate fixes concurrently and keep the first verified one")
+    max_cost: Optional[float] = Field(None, description="Cost ceiling in USD for race mode", ge=0)
+    bypass_cache: bool = Field(False, description="Skip the LLM response cache and always call the provider")
 
     @validator("language")
     def validate_language(cls, v):
@@ -74,6 +85,47 @@ class BugAnalysisResponse(BaseModel):
     attempt_number: Optional[int] = 1
     usage: Optional[Dict[str, Any]] = None
     referenced_files: Optional[List[str]] = []
+    fingerprint: Optional[str] = None
+    known_fix: bool = False
+
+
+class BatchBugItem(BaseModel):
+    """A single bug within a batch analysis request"""
+    error_message: str
+    code_snippet: str
+    file_path: Optional[str] = None
+    language: str = Field("python", description="The programming language of the code")
+    additional_context: Optional[str] = None
+
+    @validator("language")
+    def validate_language(cls, v):
+        from app.main import sanitize_language
+        return sanitize_language(v)
+
+
+class BatchAnalysisRequest(BaseModel):
+    """Request model for batch analysis; settings apply to every bug"""
+    bugs: List[BatchBugItem] = Field(..., min_length=1)
+    project_path: Optional[str] = Field(".", description="Path to the project root")
+    openai_api_key: Optional[str] = None
+    use_retry: bool = True
+    max_attempts: int = Field(3, ge=1, le=5)
+    concurrency: Optional[int] = Field(None, ge=1, le=32, description="Clusters analyzed in parallel (default: BATCH_CONCURRENCY)")
+    bypass_cache: bool = False
+
+    @validator("bugs")
+    def validate_batch_size(cls, v):
+        max_bugs = int(os.getenv("BATCH_MAX_BUGS", "500"))
+        if len(v) > max_bugs:
+            raise ValueError(f"A batch may contain at most {max_bugs} bugs")
+        return v
+
+    @validator("project_path")
+    def validate_project_path(cls, v):
+        from app.main import validate_paths
+        if v and not validate_paths(repo_path=None, project_path=v):
+            raise ValueError("Invalid or unauthorized project path")
+        return v
 
 
 class RetryFixRequest(BaseModel):
@@ -85,6 +137,9 @@ class RetryFixRequest(BaseModel):
     additional_context: Optional[str] = None
     openai_api_key: Optional[str] = None
     max_attempts: int = Field(3, ge=1, le=5)
+    race: bool = False
+    max_cost: Optional[float] = Field(None, ge=0)
+    bypass_cache: bool = False
 
     @validator("language")
     def validate_language(cls, v):
@@ -101,12 +156,41 @@ class RetryFixResponse(BaseModel):
     message: str
     language: str = "python"
     last_error: Optional[str] = None
+    fingerprint: Optional[str] = None
+    known_fix: bool = False
+
+
+class JobSubmitRequest(RetryFixRequest):
+    """Request model for a background fix job"""
+    project_path: Optional[str] = Field(".", description="Path to the project root")
+
+    @validator("project_path")
+    def validate_project_path(cls, v):
+        from app.main import validate_paths
+        if v and not validate_paths(repo_path=None, project_path=v):
+            raise ValueError("Invalid or unauthorized project path")
+        return v
+
+
+class JobResponse(BaseModel):
+    """Response model for job submission and polling"""
+    job_id: str
+    kind: str
+    status: str
+    bug_id: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    queue_depth: Optional[int] = None
 
 
 class VerifyFixRequest(BaseModel):
     """Request model for bug fix verification"""
     fixed_code: str = Field(..., description="The fixed code to verify")
     language: str = Field("python", description="The programming language of the code")
+    bypass_cache: bool = Field(False, description="Re-run the code even if this exact fix was already verified")
 
     @validator("language")
     def validate_language(cls, v):
@@ -138,12 +222,17 @@ class BugStatusResponse(BaseModel):
     description: str
     status: str
     created_at: str
+    fingerprint: Optional[str] = None
+    occurrences: Optional[int] = None
 
 
 class BugListResponse(BaseModel):
     """Response model for bug list"""
     bugs: List[BugStatusResponse]
     count: int
+    next_cursor: Optional[str] = None
+    total_estimate: Optional[int] = None
+    total_is_exact: Optional[bool] = None
 
 
 class VerificationResponse(BaseModel):
@@ -152,6 +241,7 @@ class VerificationResponse(BaseModel):
     output: Optional[str] = None
     error: Optional[str] = None
     execution_time: Optional[float] = None
+    cached: bool = False
 
 
 class ConnectionTestResponse(BaseModel):
@@ -179,34 +269,61 @@ class AgentHealthResponse(BaseModel):
     capabilities: List[str]
     retry_config: Dict[str, Any]
     ai_fallback_chain: List[str]
+    llm_cache: Optional[Dict[str, Any]] = None
 
 
-# Dependency for database session
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def known_fix_result(fix: Dict[str, Any]) -> Dict[str, Any]:
+    """Retry-style result for a fix reused from a recurring bug's fingerprint."""
+    return {
+        "success": True,
+        "final_fix": {**fix, "timestamp": datetime.now().isoformat()},
+        "all_attempts": [],
+        "total_attempts": 0,
+        "message": "Reused the verified fix of a previously seen bug",
+        "known_fix": True
+    }
 
 
 @router.post("/analyze", response_model=BugAnalysisResponse)
-async def analyze_bug(request_body: BugAnalysisRequest, request: Request, db: Session = Depends(get_db)) -> BugAnalysisResponse:
+async def analyze_bug(request_body: BugAnalysisRequest, request: Request, db: AsyncSession = Depends(get_async_db)) -> BugAnalysisResponse:
     """
     Analyze a bug and generate a fix using the configured AI agent.
     """
     try:
         # Create bug report in database
-        bug_report = crud.create_bug_report(
-            db=db,
-            description=f"{request_body.error_message[:200]}..."
+        fingerprint = error_signature(request_body.error_message, request_body.code_snippet, request_body.language)
+        bug_report = await async_crud.create_bug_report(
+            db,
+            description=f"{request_body.error_message[:200]}...",
+            fingerprint=fingerprint,
+            language=request_body.language
         )
         bug_id = f"BUG-{bug_report.id}"
         
         # Create a session for tracking usage
-        import uuid
         session_id = str(uuid.uuid4())
-        crud.create_session(db=db, session_id=session_id, bug_report_id=bug_report.id)
+        await async_crud.create_session(db, session_id=session_id, bug_report_id=bug_report.id)
+
+        # Recurring bug: reuse its verified fix without calling the LLM or the sandbox
+        known_fix = None if request_body.bypass_cache else await async_crud.get_verified_fix(db, fingerprint)
+        if known_fix:
+            await async_crud.update_bug_report_status(db, bug_report_id=bug_report.id, status="fixed")
+            return BugAnalysisResponse(
+                bug_id=bug_id,
+                root_cause=known_fix['root_cause'],
+                fixed_code=known_fix['fixed_code'],
+                explanation=known_fix['explanation'],
+                confidence=known_fix['confidence'],
+                original_error=request_body.error_message,
+                language=request_body.language,
+                timestamp=datetime.now().isoformat(),
+                attempt_number=0,
+                usage={"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
+                       "estimated_cost": "0.000000", "session_id": session_id},
+                referenced_files=known_fix.get('referenced_files') or [],
+                fingerprint=fingerprint,
+                known_fix=True
+            )
         
         # Get RAG instance from app state
         rag = getattr(request.app.state, "rag", None)
@@ -216,7 +333,8 @@ async def analyze_bug(request_body: BugAnalysisRequest, request: Request, db: Se
             bug_id=bug_id, 
             openai_api_key=request_body.openai_api_key,
             project_path=request_body.project_path or ".",
-            rag=rag
+            rag=rag,
+            use_cache=not request_body.bypass_cache
         )
         
         if request_body.use_retry:
@@ -227,38 +345,28 @@ async def analyze_bug(request_body: BugAnalysisRequest, request: Request, db: Se
                 file_path=request_body.file_path,
                 additional_context=request_body.additional_context,
                 max_attempts=request_body.max_attempts,
-                language=request_body.language
+                language=request_body.language,
+                race=request_body.race,
+                max_cost=request_body.max_cost
             )
             
-            # Accumulate usage from all attempts
-            total_prompt_tokens = 0
-            total_completion_tokens = 0
-            total_cost = 0.0
-            
-            for attempt in retry_result.get('all_attempts', []):
-                fix_res = attempt.get('fix_result', {})
-                usage = fix_res.get('usage', {})
-                total_prompt_tokens += usage.get('prompt_tokens', 0)
-                total_completion_tokens += usage.get('completion_tokens', 0)
-                total_cost += usage.get('estimated_cost', 0.0)
-            
-            # Update session usage in DB
-            crud.update_session_usage(
-                db=db, 
-                session_id=session_id, 
-                prompt_tokens=total_prompt_tokens, 
-                completion_tokens=total_completion_tokens, 
-                estimated_cost=total_cost
+            # Record usage of every attempt (and the referenced files of a fix) in one write
+            usage_records = attempt_usage(retry_result)
+            total_prompt_tokens = sum(u['prompt_tokens'] for u in usage_records)
+            total_completion_tokens = sum(u['completion_tokens'] for u in usage_records)
+            total_cost = sum(u['estimated_cost'] for u in usage_records)
+            await async_crud.apply_session_updates(
+                db,
+                session_id=session_id,
+                usage=usage_records,
+                files=retry_result['final_fix'].get('referenced_files') if retry_result['success'] else None
             )
             
             # Update bug report status based on result
             if retry_result['success']:
-                crud.update_bug_report_status(db=db, bug_report_id=bug_report.id, status="fixed")
+                await async_crud.update_bug_report_status(db, bug_report_id=bug_report.id, status="fixed")
                 final_fix = retry_result['final_fix']
-                
-                # Update referenced files in DB
-                if final_fix.get('referenced_files'):
-                    crud.update_session_referenced_files(db=db, session_id=session_id, files=final_fix['referenced_files'])
+                await async_crud.save_verified_fix(db, fingerprint, final_fix)
                 
                 return BugAnalysisResponse(
                     bug_id=bug_id,
@@ -277,10 +385,11 @@ async def analyze_bug(request_body: BugAnalysisRequest, request: Request, db: Se
                         "estimated_cost": f"{total_cost:.6f}",
                         "session_id": session_id
                     },
-                    referenced_files=final_fix.get('referenced_files', [])
+                    referenced_files=final_fix.get('referenced_files', []),
+                    fingerprint=fingerprint
                 )
             else:
-                crud.update_bug_report_status(db=db, bug_report_id=bug_report.id, status="failed")
+                await async_crud.update_bug_report_status(db, bug_report_id=bug_report.id, status="failed")
                 
                 # If fallback response is available, return it as structured error
                 if 'fallback_response' in retry_result:
@@ -311,20 +420,22 @@ async def analyze_bug(request_body: BugAnalysisRequest, request: Request, db: Se
             
             # Update session usage in DB
             usage = result.get('usage', {})
-            crud.update_session_usage(
-                db=db, 
+            await async_crud.update_session_usage(
+                db,
                 session_id=session_id, 
                 prompt_tokens=usage.get('prompt_tokens', 0), 
                 completion_tokens=usage.get('completion_tokens', 0), 
-                estimated_cost=usage.get('estimated_cost', 0.0)
+                estimated_cost=usage.get('estimated_cost', 0.0),
+                model=usage.get('model'),
+                attempt=result.get('attempt_number')
             )
             
             # Update bug report status
-            crud.update_bug_report_status(db=db, bug_report_id=bug_report.id, status="analyzed")
+            await async_crud.update_bug_report_status(db, bug_report_id=bug_report.id, status="analyzed")
             
             # Update referenced files in DB
             if result.get('referenced_files'):
-                crud.update_session_referenced_files(db=db, session_id=session_id, files=result['referenced_files'])
+                await async_crud.update_session_referenced_files(db, session_id=session_id, files=result['referenced_files'])
             
             return BugAnalysisResponse(
                 bug_id=bug_id,
@@ -339,7 +450,8 @@ async def analyze_bug(request_body: BugAnalysisRequest, request: Request, db: Se
                     **usage,
                     "session_id": session_id
                 },
-                referenced_files=result.get('referenced_files', [])
+                referenced_files=result.get('referenced_files', []),
+                fingerprint=fingerprint
             )
         
     except HTTPException:
@@ -349,18 +461,183 @@ async def analyze_bug(request_body: BugAnalysisRequest, request: Request, db: Se
         raise HTTPException(status_code=500, detail="An unexpected error occurred during bug analysis. Please try again.")
 
 
+async def _analyze_cluster(
+    request_body: BatchAnalysisRequest,
+    bug: BatchBugItem,
+    bug_report_id: int,
+    rag: Optional[Any]
+) -> Dict[str, Any]:
+    """Analyze the representative of a cluster; returns status, fix and usage."""
+    agent = BugExorcistAgent(
+        bug_id=f"BUG-{bug_report_id}",
+        openai_api_key=request_body.openai_api_key,
+        project_path=request_body.project_path or ".",
+        rag=rag,
+        use_cache=not request_body.bypass_cache
+    )
+    try:
+        if request_body.use_retry:
+            result = await agent.analyze_and_fix_with_retry(
+                error_message=bug.error_message,
+                code_snippet=bug.code_snippet,
+                file_path=bug.file_path,
+                additional_context=bug.additional_context,
+                max_attempts=request_body.max_attempts,
+                language=bug.language
+            )
+            usages = [a.get('fix_result', {}).get('usage', {}) for a in result.get('all_attempts', [])]
+            fix = result['final_fix'] if result['success'] else None
+            if fix:
+                fix = {**fix, "attempt_number": result['total_attempts']}
+            status = "fixed" if result['success'] else "failed"
+        else:
+            fix = await agent.analyze_error(
+                error_message=bug.error_message,
+                code_snippet=bug.code_snippet,
+                file_path=bug.file_path,
+                additional_context=bug.additional_context,
+                language=bug.language
+            )
+            usages = [fix.get('usage', {})]
+            status = "analyzed"
+    finally:
+        await agent.close()
+
+    return {
+        "status": status,
+        "fix": {
+            key: fix.get(key) for key in
+            ("root_cause", "fixed_code", "explanation", "confidence", "timestamp", "attempt_number", "referenced_files")
+        } if fix else None,
+        "usage": {
+            "prompt_tokens": sum(u.get('prompt_tokens', 0) for u in usages),
+            "completion_tokens": sum(u.get('completion_tokens', 0) for u in usages),
+            "estimated_cost": sum(u.get('estimated_cost', 0.0) for u in usages)
+        }
+    }
+
+
+@router.post("/analyze/batch")
+async def analyze_bug_batch(request_body: BatchAnalysisRequest, request: Request) -> StreamingResponse:
+    """
+    Analyze many bugs at once. Bugs are clustered by normalized error signature
+    (see core/error_signature.py); one representative per cluster is analyzed,
+    with at most `concurrency` clusters in flight, and its result is reported for
+    every member. Results stream as NDJSON in completion order: one "result"
+    line per bug (with its request `index`), then a "summary" line.
+    """
+    from core.error_signature import group_by_signature
+
+    bugs = request_body.bugs
+    clusters = group_by_signature((b.error_message, b.code_snippet, b.language) for b in bugs)
+
+    async with AsyncSessionLocal() as db:
+        # Cluster keys are error signatures, so they double as bug fingerprints
+        bug_report_ids = [None] * len(bugs)
+        known_fixes: Dict[str, Dict[str, Any]] = {}
+        for signature, members in clusters.items():
+            for index in members:
+                bug_report = await async_crud.create_bug_report(
+                    db, description=f"{bugs[index].error_message[:200]}...",
+                    fingerprint=signature, language=bugs[index].language
+                )
+                bug_report_ids[index] = bug_report.id
+            known_fix = None if request_body.bypass_cache else await async_crud.get_verified_fix(db, signature)
+            if known_fix:
+                known_fixes[signature] = known_fix
+
+    rag = getattr(request.app.state, "rag", None)
+    semaphore = asyncio.Semaphore(request_body.concurrency or int(os.getenv("BATCH_CONCURRENCY", "4")))
+
+    async def run_cluster(signature: str, members: List[int]) -> Tuple[str, List[int], Dict[str, Any]]:
+        representative = members[0]
+        if signature in known_fixes:
+            outcome = {"status": "fixed", "fix": {**known_fixes[signature], "attempt_number": 0},
+                       "usage": None, "known_fix": True}
+        else:
+            async with semaphore:
+                try:
+                    outcome = await _analyze_cluster(request_body, bugs[representative], bug_report_ids[representative], rag)
+                except Exception:
+                    logger.exception(f"Batch analysis failed for BUG-{bug_report_ids[representative]}")
+                    outcome = {"status": "error", "fix": None, "usage": None,
+                               "error": "An unexpected error occurred during bug analysis."}
+
+        async with AsyncSessionLocal() as db:
+            if outcome["usage"]:
+                session_id = str(uuid.uuid4())
+                await async_crud.create_session(db, session_id=session_id, bug_report_id=bug_report_ids[representative])
+                await async_crud.update_session_usage(db, session_id=session_id, **outcome["usage"])
+                outcome["usage"]["session_id"] = session_id
+                if outcome["fix"] and outcome["fix"].get("referenced_files"):
+                    await async_crud.update_session_referenced_files(db, session_id=session_id, files=outcome["fix"]["referenced_files"])
+            if outcome["status"] == "fixed" and not outcome.get("known_fix"):
+                await async_crud.save_verified_fix(db, signature, outcome["fix"])
+            for index in members:
+                await async_crud.update_bug_report_status(db, bug_report_id=bug_report_ids[index],
+                                                          status="failed" if outcome["status"] == "error" else outcome["status"])
+        return signature, members, outcome
+
+    async def stream() -> AsyncGenerator[str, None]:
+        tasks = [asyncio.create_task(run_cluster(sig, members)) for sig, members in clusters.items()]
+        statuses: Dict[str, int] = {}
+        try:
+            for finished in asyncio.as_completed(tasks):
+                signature, members, outcome = await finished
+                for index in members:
+                    statuses[outcome["status"]] = statuses.get(outcome["status"], 0) + 1
+                    line = {
+                        "type": "result",
+                        "index": index,
+                        "bug_id": f"BUG-{bug_report_ids[index]}",
+                        "signature": signature,
+                        "cluster_size": len(members),
+                        "representative": index == members[0],
+                        "status": outcome["status"],
+                        "known_fix": outcome.get("known_fix", False),
+                        "fix": outcome["fix"],
+                        # Usage is accounted once, on the representative
+                        "usage": outcome["usage"] if index == members[0] else None
+                    }
+                    if "error" in outcome:
+                        line["error"] = outcome["error"]
+                    yield json.dumps(line, default=str) + "\n"
+            yield json.dumps({
+                "type": "summary",
+                "total": len(bugs),
+                "clusters": len(clusters),
+                "analyzed": len(tasks) - len(known_fixes),
+                "statuses": statuses
+            }) + "\n"
+        finally:
+            # Client disconnected mid-stream: stop analyses nobody will read
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.post("/fix-with-retry", response_model=RetryFixResponse)
-async def fix_bug_with_retry(request_body: RetryFixRequest, request: Request, db: Session = Depends(get_db)) -> RetryFixResponse:
+async def fix_bug_with_retry(request_body: RetryFixRequest, request: Request, db: AsyncSession = Depends(get_async_db)) -> RetryFixResponse:
     """
     Analyze and fix a bug with automatic retry logic.
     """
     try:
         # Create bug report in database
-        bug_report = crud.create_bug_report(
-            db=db,
-            description=f"{request_body.error_message[:200]}..."
+        fingerprint = error_signature(request_body.error_message, request_body.code_snippet, request_body.language)
+        bug_report = await async_crud.create_bug_report(
+            db,
+            description=f"{request_body.error_message[:200]}...",
+            fingerprint=fingerprint,
+            language=request_body.language
         )
         bug_id = f"BUG-{bug_report.id}"
+
+        known_fix = None if request_body.bypass_cache else await async_crud.get_verified_fix(db, fingerprint)
+        if known_fix:
+            await async_crud.update_bug_report_status(db, bug_report_id=bug_report.id, status="fixed")
+            return RetryFixResponse(language=request_body.language, fingerprint=fingerprint,
+                                    **known_fix_result(known_fix))
         
         # Get RAG instance from app state
         rag = getattr(request.app.state, "rag", None)
@@ -370,7 +647,8 @@ async def fix_bug_with_retry(request_body: RetryFixRequest, request: Request, db
             bug_id=bug_id, 
             openai_api_key=request_body.openai_api_key,
             project_path=".", # Default to current dir if not specified in request model
-            rag=rag
+            rag=rag,
+            use_cache=not request_body.bypass_cache
         )
         result = await agent.analyze_and_fix_with_retry(
             error_message=request_body.error_message,
@@ -378,22 +656,86 @@ async def fix_bug_with_retry(request_body: RetryFixRequest, request: Request, db
             file_path=request_body.file_path,
             additional_context=request_body.additional_context,
             max_attempts=request_body.max_attempts,
-            language=request_body.language
+            language=request_body.language,
+            race=request_body.race,
+            max_cost=request_body.max_cost
         )
         
         # Update database status
         if result['success']:
-            crud.update_bug_report_status(db=db, bug_report_id=bug_report.id, status="fixed")
+            await async_crud.update_bug_report_status(db, bug_report_id=bug_report.id, status="fixed")
+            await async_crud.save_verified_fix(db, fingerprint, result['final_fix'])
         else:
-            crud.update_bug_report_status(db=db, bug_report_id=bug_report.id, status="failed")
+            await async_crud.update_bug_report_status(db, bug_report_id=bug_report.id, status="failed")
         
-        return RetryFixResponse(language=request_body.language, **result)
+        return RetryFixResponse(language=request_body.language, fingerprint=fingerprint, **result)
         
     except Exception as e:
         logger.exception(f"Retry fix failed for {bug_id if 'bug_id' in locals() else 'unknown'}")
         raise HTTPException(status_code=500, detail="Retry fix process failed. Please check server logs.")
 
 
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_fix_job(request_body: JobSubmitRequest) -> JobResponse:
+    """
+    Queue a fix-with-retry run and return its job id immediately.
+    Poll GET /jobs/{job_id} or subscribe to WS /jobs/{job_id}/events for the result.
+    Returns 429 when too many jobs are already waiting.
+    """
+    from app.jobs import get_job_queue, QueueFullError
+
+    queue = get_job_queue()
+    payload = request_body.dict(exclude={"openai_api_key"})
+    secrets = {"openai_api_key": request_body.openai_api_key} if request_body.openai_api_key else None
+    try:
+        job = await queue.submit("fix_with_retry", payload, secrets=secrets)
+    except QueueFullError:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many queued jobs. Please retry later.",
+            headers={"Retry-After": os.getenv("JOB_RETRY_AFTER", "30")}
+        )
+    return JobResponse(**job)
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_fix_job(job_id: str) -> JobResponse:
+    """Current state of a background job, including its result once finished."""
+    from app.jobs import get_job_queue
+
+    job = await get_job_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobResponse(**job)
+
+
+@router.websocket("/jobs/{job_id}/events")
+async def job_events(websocket: WebSocket, job_id: str) -> None:
+    """Push the job's state on connect and on every change until it finishes."""
+    from app.jobs import get_job_queue, TERMINAL_STATES
+
+    await websocket.accept()
+    queue = get_job_queue()
+    updates = queue.subscribe(job_id)
+    try:
+        job = await queue.get(job_id)
+        if not job:
+            await websocket.send_json({"type": "error", "message": "Job not found"})
+            return
+        await websocket.send_json({"type": "job", "data": job})
+        while job["status"] not in TERMINAL_STATES:
+            job = await updates.get()
+            await websocket.send_json({"type": "job", "data": job})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        queue.unsubscribe(job_id, updates)
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+
 @router.post("/quick-fix", response_model=QuickFixResponse)
 async def quick_fix_endpoint(request: QuickFixRequest) -> QuickFixResponse:
     """
@@ -433,6 +775,7 @@ async def agent_health() -> AgentHealthResponse:
     """
     from core.gemini_agent import is_gemini_enabled, is_gemini_available
     from core.ollama_provider import is_ollama_available
+    from core.llm_cache import get_llm_cache
     
     api_key_set = bool(os.getenv("OPENAI_API_KEY"))
     gemini_key_set = bool(os.getenv("GEMINI_API_KEY"))
@@ -442,6 +785,8 @@ async def agent_health() -> AgentHealthResponse:
     
     primary_agent = os.getenv("PRIMARY_AGENT", "gpt-4o")
     secondary_agent = os.getenv("SECONDARY_AGENT", "gemini-1.5-pro")
+    llm_cache = await asyncio.to_thread(get_llm_cache)
+    llm_cache_stats = await asyncio.to_thread(llm_cache.stats) if llm_cache else None
     
     return AgentHealthResponse(
         status="operational",
@@ -471,12 +816,13 @@ async def agent_health() -> AgentHealthResponse:
         ai_fallback_chain=[
             f"{primary_agent} (primary)",
             f"{secondary_agent} (secondary)" if secondary_agent else "manual guidance (fallback)"
-        ]
+        ],
+        llm_cache=llm_cache_stats
     )
 
 
 @router.get("/bugs/{bug_id}/status", response_model=BugStatusResponse)
-async def get_bug_status(bug_id: str, db: Session = Depends(get_db)) -> BugStatusResponse:
+async def get_bug_status(bug_id: str, db: AsyncSession = Depends(get_async_db)) -> BugStatusResponse:
     """
     Get the status of a bug report.
     
@@ -494,47 +840,110 @@ async def get_bug_status(bug_id: str, db: Session = Depends(get_db)) -> BugStatu
         # If no prefix, try to parse as int directly
         numeric_id = int(bug_id)
     
-    bug_report = crud.get_bug_report(db, numeric_id)
+    bug_report = await async_crud.get_bug_report(db, numeric_id)
     
     if not bug_report:
         raise HTTPException(status_code=404, detail="Bug not found")
     
+    bug_fingerprint = await async_crud.get_bug_fingerprint(db, bug_report.fingerprint) if bug_report.fingerprint else None
     return BugStatusResponse(
         id=bug_report.id,
         description=bug_report.description,
         status=bug_report.status,
-        created_at=bug_report.created_at.isoformat()
+        created_at=bug_report.created_at.isoformat(),
+        fingerprint=bug_report.fingerprint,
+        occurrences=bug_fingerprint.occurrences if bug_fingerprint else None
     )
 
 
+def _encode_bug_cursor(cursor: Tuple[str, int]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode()).decode()
+
+
+def _decode_bug_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        created_at, bug_report_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), int(bug_report_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """created_at is stored as naive UTC; drop the offset of aware query parameters."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
 @router.get("/bugs", response_model=BugListResponse)
-async def list_bugs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)) -> BugListResponse:
+async def list_bugs(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    fingerprint: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    include_count: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+) -> BugListResponse:
     """
-    List all bug reports.
+    List bug reports, newest first.
+
+    Pages are keyset-paginated: pass the `next_cursor` of a response as
+    `cursor` to get the following page. Each page costs the same however deep
+    it is; `skip` still works without a cursor but scans the skipped rows.
     
     Args:
-        skip: Number of records to skip
-        limit: Maximum number of records to return
+        skip: Number of records to skip (ignored when a cursor is given)
+        limit: Maximum number of records to return (capped by BUGS_PAGE_MAX)
+        cursor: Opaque cursor from a previous page
+        status: Only bugs with this status
+        fingerprint: Only bugs with this error fingerprint
+        created_after: Only bugs created at or after this time
+        created_before: Only bugs created before this time
+        include_count: Add an estimate of the number of matching bugs
         db: Database session
         
     Returns:
         List of bug reports
     """
-    bugs = crud.get_bug_reports(db, skip=skip, limit=limit)
+    limit = max(1, min(limit, int(os.getenv("BUGS_PAGE_MAX", "500"))))
+    filters = {
+        "status": status,
+        "fingerprint": fingerprint,
+        "created_after": _as_utc(created_after),
+        "created_before": _as_utc(created_before)
+    }
+    bugs, next_cursor = await async_crud.get_bug_reports(
+        db,
+        skip=skip,
+        limit=limit,
+        cursor=_decode_bug_cursor(cursor) if cursor else None,
+        **filters
+    )
     
     bug_responses = [
         BugStatusResponse(
             id=bug.id,
             description=bug.description,
             status=bug.status,
-            created_at=bug.created_at.isoformat()
+            created_at=bug.created_at.isoformat(),
+            fingerprint=bug.fingerprint
         )
         for bug in bugs
     ]
+
+    total_estimate = total_is_exact = None
+    if include_count:
+        total_estimate, total_is_exact = await async_crud.estimate_bug_report_count(db, **filters)
     
     return BugListResponse(
         bugs=bug_responses,
-        count=len(bug_responses)
+        count=len(bug_responses),
+        next_cursor=_encode_bug_cursor(next_cursor) if next_cursor else None,
+        total_estimate=total_estimate,
+        total_is_exact=total_is_exact
     )
 
 @router.post("/verify", response_model=VerificationResponse)
@@ -544,16 +953,20 @@ async def verify_fix(request: VerifyFixRequest) -> VerificationResponse:
     """
     try:
         # Use default project path for verification if not specified
-        agent = BugExorcistAgent(bug_id="verification-only", project_path=".")
-        result = await agent.verify_fix(
-            fixed_code=request.fixed_code,
-            language=request.language
-        )
+        agent = BugExorcistAgent(bug_id="verification-only", project_path=".", use_cache=not request.bypass_cache)
+        try:
+            result = await agent.verify_fix(
+                fixed_code=request.fixed_code,
+                language=request.language
+            )
+        finally:
+            await agent.close()
         
         return VerificationResponse(
             verified=result['verified'],
             output=result['output'],
-            error=result.get('new_error')
+            error=result.get('new_error'),
+            cached=result.get('cached', False)
         )
     except Exception as e:
         logger.error(f"Verification endpoint failed: {str(e)}", exc_info=True)
@@ -564,7 +977,7 @@ async def verify_fix(request: VerifyFixRequest) -> VerificationResponse:
 
 
 @router.post("/bugs/{bug_id}/verify", response_model=VerificationResponse)
-async def verify_bug_fix(bug_id: str, request: VerifyFixRequest, db: Session = Depends(get_db)) -> VerificationResponse:
+async def verify_bug_fix(bug_id: str, request: VerifyFixRequest, db: AsyncSession = Depends(get_async_db)) -> VerificationResponse:
     """
     Verify a bug fix by running it in a sandbox.
     
@@ -589,22 +1002,25 @@ async def verify_bug_fix(bug_id: str, request: VerifyFixRequest, db: Session = D
             detail=f"Invalid bug_id format: '{bug_id}'. Expected format: 'BUG-{{numeric_id}}' or plain numeric ID"
         )
     
-    bug_report = crud.get_bug_report(db, numeric_id)
+    bug_report = await async_crud.get_bug_report(db, numeric_id)
     
     if not bug_report:
         raise HTTPException(status_code=404, detail="Bug not found")
     
     # Initialize agent
-    agent = BugExorcistAgent(bug_id=f"BUG-{numeric_id}", project_path=".")
+    agent = BugExorcistAgent(bug_id=f"BUG-{numeric_id}", project_path=".", use_cache=not request.bypass_cache)
     
     # Verify the fix
-    verification = await agent.verify_fix(request.fixed_code, language=request.language)
+    try:
+        verification = await agent.verify_fix(request.fixed_code, language=request.language)
+    finally:
+        await agent.close()
     
     # Update status if verified
     if verification['verified']:
-        crud.update_bug_report_status(db=db, bug_report_id=bug_report.id, status="verified")
+        await async_crud.update_bug_report_status(db, bug_report_id=bug_report.id, status="verified")
     else:
-        crud.update_bug_report_status(db=db, bug_report_id=bug_report.id, status="verification_failed")
+        await async_crud.update_bug_report_status(db, bug_report_id=bug_report.id, status="verification_failed")
     
     return VerificationResponse(**verification)
 
@@ -621,8 +1037,9 @@ async def test_agent_connection(api_key: Optional[str] = None) -> ConnectionTest
         Connection test results
     """
     try:
-        # Simple test with a minimal agent
-        agent = BugExorcistAgent(bug_id="test", openai_api_key=api_key)
+        # Simple test with a minimal agent. The response cache is keyed by model and
+        # prompt, not credentials, so a cached answer would not prove the key works.
+        agent = BugExorcistAgent(bug_id="test", openai_api_key=api_key, use_cache=False)
         
         # Validate that the primary provider is actually configured and NOT a MockLLM
         # This prevents false-positives where the agent might fallback to a secondary provider or MockLLM
@@ -0,0 +1,96 @@
+"""
+backend/app/async_crud.py - Awaitable CRUD for async request handlers
+
+Each function runs the corresponding function of app.crud on an AsyncSession
+via `run_sync`: the queries and commits go through aiosqlite's worker thread,
+so the event loop keeps serving WebSocket streams while the database works.
+Query logic lives in app.crud only.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, models
+
+
+async def get_bug_report(db: AsyncSession, bug_report_id: int) -> Optional[models.BugReport]:
+    return await db.run_sync(crud.get_bug_report, bug_report_id)
+
+async def get_bug_reports(db: AsyncSession, skip: int = 0, limit: int = 100, status: Optional[str] = None,
+                          fingerprint: Optional[str] = None, created_after: Optional[datetime] = None,
+                          created_before: Optional[datetime] = None, cursor: Optional[Tuple[str, int]] = None
+                          ) -> Tuple[List[models.BugReport], Optional[Tuple[str, int]]]:
+    return await db.run_sync(crud.get_bug_reports, skip, limit, status, fingerprint, created_after, created_before, cursor)
+
+async def estimate_bug_report_count(db: AsyncSession, status: Optional[str] = None, fingerprint: Optional[str] = None,
+                                    created_after: Optional[datetime] = None,
+                                    created_before: Optional[datetime] = None) -> Tuple[int, bool]:
+    return await db.run_sync(crud.estimate_bug_report_count, status, fingerprint, created_after, created_before)
+
+async def create_bug_report(db: AsyncSession, description: str, fingerprint: Optional[str] = None,
+                            language: str = "python") -> models.BugReport:
+    return await db.run_sync(crud.create_bug_report, description, fingerprint, language)
+
+async def update_bug_report_status(db: AsyncSession, bug_report_id: int, status: str) -> Optional[models.BugReport]:
+    return await db.run_sync(crud.update_bug_report_status, bug_report_id, status)
+
+async def get_bug_fingerprint(db: AsyncSession, fingerprint: str) -> Optional[models.BugFingerprint]:
+    return await db.run_sync(crud.get_bug_fingerprint, fingerprint)
+
+async def get_verified_fix(db: AsyncSession, fingerprint: str) -> Optional[Dict[str, Any]]:
+    return await db.run_sync(crud.get_verified_fix, fingerprint)
+
+async def save_verified_fix(db: AsyncSession, fingerprint: str, fix: Dict[str, Any]) -> None:
+    await db.run_sync(crud.save_verified_fix, fingerprint, fix)
+
+async def create_session(db: AsyncSession, session_id: str, bug_report_id: int):
+    return await db.run_sync(crud.create_session, session_id, bug_report_id)
+
+async def get_session(db: AsyncSession, session_id: str):
+    return await db.run_sync(crud.get_session, session_id)
+
+async def update_session_usage(db: AsyncSession, session_id: str, prompt_tokens: int, completion_tokens: int,
+                               estimated_cost: float, model: Optional[str] = None, attempt: Optional[int] = None):
+    return await db.run_sync(crud.update_session_usage, session_id, prompt_tokens, completion_tokens, estimated_cost,
+                             model, attempt)
+
+async def update_session_approval(db: AsyncSession, session_id: str, is_approved: int, fixed_code: str = None,
+                                  repo_path: str = None, file_path: str = None):
+    return await db.run_sync(crud.update_session_approval, session_id, is_approved, fixed_code, repo_path, file_path)
+
+async def update_session_referenced_files(db: AsyncSession, session_id: str, files: List[str]):
+    return await db.run_sync(crud.update_session_referenced_files, session_id, files)
+
+async def get_session_files(db: AsyncSession, session_id: str) -> List[str]:
+    return await db.run_sync(crud.get_session_files, session_id)
+
+async def get_sessions_for_file(db: AsyncSession, file_path: str) -> List[str]:
+    return await db.run_sync(crud.get_sessions_for_file, file_path)
+
+async def get_session_usage(db: AsyncSession, session_id: str) -> Dict[str, Any]:
+    return await db.run_sync(crud.get_session_usage, session_id)
+
+async def get_usage_summary(db: AsyncSession, since: Optional[datetime] = None,
+                            until: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    return await db.run_sync(crud.get_usage_summary, since, until)
+
+async def apply_session_updates(db: AsyncSession, session_id: str, usage: Optional[List[Dict[str, Any]]] = None,
+                                files: Optional[List[str]] = None) -> Optional[bool]:
+    return await db.run_sync(crud.apply_session_updates, session_id, usage, files)
+
+async def create_job(db: AsyncSession, job_id: str, kind: str, payload: Dict[str, Any],
+                     bug_report_id: Optional[int] = None) -> models.Job:
+    return await db.run_sync(crud.create_job, job_id, kind, payload, bug_report_id)
+
+async def get_job(db: AsyncSession, job_id: str) -> Optional[models.Job]:
+    return await db.run_sync(crud.get_job, job_id)
+
+async def get_jobs_by_status(db: AsyncSession, statuses: List[str]) -> List[models.Job]:
+    return await db.run_sync(crud.get_jobs_by_status, statuses)
+
+async def update_job(db: AsyncSession, job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+                     error: Optional[str] = None, started_at: Optional[datetime] = None,
+                     finished_at: Optional[datetime] = None) -> Optional[models.Job]:
+    return await db.run_sync(crud.update_job, job_id, status, result, error, started_at, finished_at)
@@ -0,0 +1,383 @@
+"""
+backend/app/container_pool.py - Warm container pool for the sandbox
+
+Keeps a bounded set of pre-started sandbox containers per image so that
+verification runs reuse an already-running container (docker exec) instead
+of paying the full create/start/remove cycle on every call.
+"""
+
+import os
+import json
+import time
+import socket
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from docker.utils.socket import frames_iter
+
+logger = logging.getLogger(__name__)
+
+# Scratch directory inside pooled containers. Mounted as tmpfs and wiped between uses.
+# Code runs in the image's working directory (like one-off containers); this is the
+# fallback for images that do not set one.
+POOL_WORKDIR = "/sandbox"
+
+# Pooled containers have a read-only root filesystem; these tmpfs mounts (plus any
+# manifest volumes) are the only writable paths (HOME points into /tmp), and all of
+# them are wiped between uses. Compiled binaries are built into and run from the
+# scratch mounts, so those allow exec.
+POOL_TMPFS = {
+    POOL_WORKDIR: "size=64m,mode=1777,exec",
+    "/tmp": "size=64m,mode=1777,exec",
+    "/var/tmp": "size=16m,mode=1777",
+    "/run": "size=1m,mode=755",
+}
+POOL_HOME = "/tmp"
+
+# Wipes the writable tmpfs mounts and kills every process except the container init (PID 1).
+RESET_COMMAND = ["/bin/sh", "-c", f"kill -9 -1 2>/dev/null; find {' '.join(POOL_TMPFS)} -mindepth 1 -delete"]
+
+
+class ExecTimeout(Exception):
+    """Raised when a command executed in a pooled container exceeds its deadline."""
+
+
+class PooledContainer:
+    """A running container owned by the pool, plus bookkeeping for eviction."""
+
+    def __init__(self, container, key: Tuple[str, str], workdir: str = POOL_WORKDIR):
+        self.container = container
+        self.key = key
+        self.workdir = workdir
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+
+
+class ContainerPool:
+    """
+    Size-bounded pool of idle sandbox containers keyed by (image, spec hash).
+
+    Containers run `tail -f /dev/null` and user code is executed with
+    `docker exec`. The root filesystem is read-only; between uses the tmpfs
+    mounts are wiped and stray processes are killed. Containers idle for longer
+    than `idle_ttl` seconds or used more than `max_uses` times are removed;
+    `maintain()` does this periodically and tops up recently used keys.
+    """
+
+    def __init__(
+        self,
+        client,
+        max_size: int = 4,
+        min_idle: int = 1,
+        idle_ttl: float = 300.0,
+        max_uses: int = 50
+    ):
+        self.client = client
+        self.max_size = max_size
+        self.min_idle = min(min_idle, max_size)
+        self.idle_ttl = idle_ttl
+        self.max_uses = max_uses
+
+        self._idle: Dict[Tuple[str, str], List[PooledContainer]] = {}
+        self._in_use: Dict[Tuple[str, str], int] = {}
+        # (image, spec) and last acquire time per key, for refilling in maintain()
+        self._specs: Dict[Tuple[str, str], Tuple[str, Dict[str, Any]]] = {}
+        self._last_acquired: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "created": 0,
+            "reused": 0,
+            "discarded": 0,
+            "evicted": 0,
+            "rejected": 0
+        }
+
+    @staticmethod
+    def make_key(image: str, spec: Dict[str, Any]) -> Tuple[str, str]:
+        """Build a pool key from the image tag and the container configuration."""
+        spec_hash = hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()[:12]
+        return (image, spec_hash)
+
+    def _size(self, key: Tuple[str, str]) -> int:
+        return len(self._idle.get(key, [])) + self._in_use.get(key, 0)
+
+    def _create(self, image: str, spec: Dict[str, Any], key: Tuple[str, str]) -> PooledContainer:
+        container = self.client.containers.run(
+            image,
+            command=["tail", "-f", "/dev/null"],
+            detach=True,
+            environment={"HOME": POOL_HOME, **(spec.get("environment") or {})},
+            volumes=spec.get("volumes") or {},
+            network_disabled=True,
+            mem_limit=spec.get("mem_limit"),
+            nano_cpus=spec.get("nano_cpus"),
+            cap_drop=["ALL"],
+            read_only=True,
+            tmpfs=POOL_TMPFS,
+            labels={"com.exorcist.pool": key[1]}
+        )
+        with self._lock:
+            self._stats["created"] += 1
+        workdir = ((container.attrs or {}).get("Config") or {}).get("WorkingDir") or POOL_WORKDIR
+        return PooledContainer(container, key, workdir=workdir)
+
+    def _destroy(self, pooled: PooledContainer) -> None:
+        try:
+            pooled.container.remove(force=True)
+        except Exception as e:
+            logger.debug(f"Failed to remove pooled container: {e}")
+
+    def _is_healthy(self, pooled: PooledContainer) -> bool:
+        try:
+            pooled.container.reload()
+            return pooled.container.status == "running"
+        except Exception:
+            return False
+
+    def acquire(self, image: str, spec: Dict[str, Any]) -> Optional[PooledContainer]:
+        """
+        Check out a warm container for the given image and spec.
+        Creates one if the pool has spare capacity. Returns None when the pool
+        for this key is exhausted so the caller can fall back to a one-off container.
+        """
+        key = self.make_key(image, spec)
+        self.evict_idle()
+        with self._lock:
+            self._specs[key] = (image, spec)
+            self._last_acquired[key] = time.monotonic()
+
+        while True:
+            with self._lock:
+                idle = self._idle.get(key, [])
+                pooled = idle.pop() if idle else None
+                if pooled is None:
+                    if self._size(key) >= self.max_size:
+                        self._stats["rejected"] += 1
+                        return None
+                    self._stats["misses"] += 1
+                # Reserve the slot before doing any Docker I/O
+                self._in_use[key] = self._in_use.get(key, 0) + 1
+
+            if pooled is None:
+                try:
+                    pooled = self._create(image, spec, key)
+                except Exception as e:
+                    logger.error(f"Failed to start pooled container for {image}: {e}")
+                    with self._lock:
+                        self._in_use[key] -= 1
+                    return None
+                break
+
+            if self._is_healthy(pooled):
+                with self._lock:
+                    self._stats["hits"] += 1
+                    self._stats["reused"] += 1
+                break
+
+            # Dead container: drop it and try the next one
+            with self._lock:
+                self._in_use[key] -= 1
+                self._stats["discarded"] += 1
+            self._destroy(pooled)
+
+        pooled.uses += 1
+        return pooled
+
+    def release(self, pooled: PooledContainer, healthy: bool = True) -> None:
+        """Return a container to the pool, resetting it first. Unhealthy containers are removed."""
+        if healthy and pooled.uses < self.max_uses:
+            healthy = self._reset(pooled)
+        else:
+            healthy = False
+
+        with self._lock:
+            self._in_use[pooled.key] = max(0, self._in_use.get(pooled.key, 0) - 1)
+            if healthy:
+                pooled.last_used = time.monotonic()
+                self._idle.setdefault(pooled.key, []).append(pooled)
+            else:
+                self._stats["discarded"] += 1
+
+        if not healthy:
+            self._destroy(pooled)
+
+    def _reset(self, pooled: PooledContainer) -> bool:
+        try:
+            result = pooled.container.exec_run(RESET_COMMAND)
+            return result.exit_code == 0
+        except Exception as e:
+            logger.warning(f"Failed to reset pooled container: {e}")
+            return False
+
+    def warm(self, image: str, spec: Dict[str, Any], count: Optional[int] = None) -> int:
+        """Pre-start containers until `count` (default: min_idle) are idle. Returns the number started."""
+        key = self.make_key(image, spec)
+        target = self.min_idle if count is None else count
+        started = 0
+        while True:
+            with self._lock:
+                if len(self._idle.get(key, [])) >= target or self._size(key) >= self.max_size:
+                    break
+                self._in_use[key] = self._in_use.get(key, 0) + 1
+            try:
+                pooled = self._create(image, spec, key)
+            except Exception as e:
+                logger.error(f"Failed to warm container pool for {image}: {e}")
+                with self._lock:
+                    self._in_use[key] -= 1
+                break
+            with self._lock:
+                self._in_use[key] -= 1
+                self._idle.setdefault(key, []).append(pooled)
+            started += 1
+        if started:
+            logger.info(f"Warmed {started} sandbox container(s) for {image}")
+        return started
+
+    def evict_idle(self) -> int:
+        """Remove containers that have been idle longer than idle_ttl. Returns the number evicted."""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, idle in self._idle.items():
+                keep = [p for p in idle if now - p.last_used <= self.idle_ttl]
+                expired.extend(p for p in idle if now - p.last_used > self.idle_ttl)
+                self._idle[key] = keep
+            self._stats["evicted"] += len(expired)
+        for pooled in expired:
+            self._destroy(pooled)
+        return len(expired)
+
+    def maintain(self) -> Tuple[int, int]:
+        """
+        Evict expired idle containers, then top up to `min_idle` the keys that
+        were acquired within the last `idle_ttl` seconds. Keys nobody used for
+        that long drain to zero. Returns (evicted, started).
+        """
+        evicted = self.evict_idle()
+        now = time.monotonic()
+        with self._lock:
+            active = [self._specs[key] for key, at in self._last_acquired.items() if now - at <= self.idle_ttl]
+            for key in [key for key, at in self._last_acquired.items() if now - at > self.idle_ttl]:
+                del self._last_acquired[key]
+                del self._specs[key]
+        started = sum(self.warm(image, spec) for image, spec in active)
+        return evicted, started
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of pool counters and per-key occupancy."""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "idle": sum(len(v) for v in self._idle.values()),
+                "in_use": sum(self._in_use.values()),
+                "max_size": self.max_size,
+                "pools": {
+                    f"{image}@{spec_hash}": {
+                        "idle": len(self._idle.get((image, spec_hash), [])),
+                        "in_use": self._in_use.get((image, spec_hash), 0)
+                    }
+                    for image, spec_hash in set(self._idle) | set(self._in_use)
+                }
+            }
+
+    def shutdown(self) -> None:
+        """Remove every idle container. In-use containers are removed when released."""
+        with self._lock:
+            idle = [p for pool in self._idle.values() for p in pool]
+            self._idle.clear()
+            self.max_uses = 0
+        for pooled in idle:
+            self._destroy(pooled)
+
+
+def exec_with_stdin(client, container, command: List[str], stdin_data: bytes, timeout: float,
+                    workdir: str = POOL_WORKDIR) -> Tuple[int, str]:
+    """
+    Run `command` in `workdir` inside a running container, feeding `stdin_data` on stdin.
+    Returns (exit_code, combined output). Raises ExecTimeout if the deadline passes.
+    """
+    exec_id = client.api.exec_create(
+        container.id,
+        command,
+        stdin=True,
+        stdout=True,
+        stderr=True,
+        workdir=workdir
+    )["Id"]
+    sock = client.api.exec_start(exec_id, socket=True)
+    raw = getattr(sock, "_sock", sock)
+    deadline = time.monotonic() + timeout
+    output = []
+    try:
+        raw.settimeout(timeout)
+        raw.sendall(stdin_data)
+        raw.shutdown(socket.SHUT_WR)
+        for _stream, data in frames_iter(sock, tty=False):
+            output.append(data)
+            if time.monotonic() > deadline:
+                raise ExecTimeout()
+    except socket.timeout:
+        raise ExecTimeout()
+    finally:
+        try:
+            sock.close()
+        except Exception:
+            pass
+
+    exit_code = client.api.exec_inspect(exec_id).get("ExitCode")
+    return (exit_code if exit_code is not None else -1), b"".join(output).decode("utf-8", errors="replace")
+
+
+# Singleton instance
+_container_pool = None
+_container_pool_lock = threading.Lock()
+
+def get_container_pool(client) -> Optional[ContainerPool]:
+    """
+    Get the process-wide container pool, or None if pooling is disabled.
+    Pooling is enabled by setting SANDBOX_POOL_SIZE to a positive value.
+    """
+    global _container_pool
+    max_size = int(os.getenv("SANDBOX_POOL_SIZE", "0"))
+    if max_size <= 0:
+        return None
+    with _container_pool_lock:
+        if _container_pool is None:
+            _container_pool = ContainerPool(
+                client,
+                max_size=max_size,
+                min_idle=int(os.getenv("SANDBOX_POOL_MIN_IDLE", "1")),
+                idle_ttl=float(os.getenv("SANDBOX_POOL_IDLE_TTL", "300")),
+                max_uses=int(os.getenv("SANDBOX_POOL_MAX_USES", "50"))
+            )
+            logger.info(f"Sandbox container pool enabled (max {max_size} per image)")
+        return _container_pool
+
+
+def get_container_pool_metrics() -> Optional[Dict[str, Any]]:
+    """Metrics of the process-wide pool, or None if it has not been created."""
+    pool = _container_pool
+    return pool.metrics() if pool else None
+
+
+def maintain_container_pool() -> Tuple[int, int]:
+    """Run `maintain()` on the process-wide pool, if one was created."""
+    pool = _container_pool
+    return pool.maintain() if pool else (0, 0)
+
+
+def shutdown_container_pool() -> None:
+    """Tear down the process-wide pool, if one was created."""
+    global _container_pool
+    with _container_pool_lock:
+        pool, _container_pool = _container_pool, None
+    if pool:
+        pool.shutdown()
@@ -1,7 +1,11 @@
 import logging
 import json
+from sqlalchemy import Integer, String, literal, tuple_, type_coerce
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
 from . import models
 
 logger = logging.getLogger(__name__)
@@ -9,16 +13,109 @@ logger = logging.getLogger(__name__)
 def get_bug_report(db: Session, bug_report_id: int) -> Optional[models.BugReport]:
     return db.query(models.BugReport).filter(models.BugReport.id == bug_report_id).first()
 
-def get_bug_reports(db: Session, skip: int = 0, limit: int = 100) -> List[models.BugReport]:
-    return db.query(models.BugReport).offset(skip).limit(limit).all()
+def _stored_datetime(value: datetime):
+    """Bind `value` as text in SQLite's CURRENT_TIMESTAMP format, so whole seconds compare as expected."""
+    fmt = "%Y-%m-%d %H:%M:%S.%f" if value.microsecond else "%Y-%m-%d %H:%M:%S"
+    return literal(value.strftime(fmt), String)
 
-def create_bug_report(db: Session, description: str) -> models.BugReport:
-    db_bug_report = models.BugReport(description=description)
+def _bug_report_filters(query, status: Optional[str] = None, fingerprint: Optional[str] = None,
+                        created_after: Optional[datetime] = None, created_before: Optional[datetime] = None):
+    if status is not None:
+        query = query.filter(models.BugReport.status == status)
+    if fingerprint is not None:
+        query = query.filter(models.BugReport.fingerprint == fingerprint)
+    if created_after is not None:
+        query = query.filter(models.BugReport.created_at >= _stored_datetime(created_after))
+    if created_before is not None:
+        query = query.filter(models.BugReport.created_at < _stored_datetime(created_before))
+    return query
+
+def get_bug_reports(db: Session, skip: int = 0, limit: int = 100, status: Optional[str] = None,
+                    fingerprint: Optional[str] = None, created_after: Optional[datetime] = None,
+                    created_before: Optional[datetime] = None,
+                    cursor: Optional[Tuple[str, int]] = None) -> Tuple[List[models.BugReport], Optional[Tuple[str, int]]]:
+    """
+    Newest bug reports first, ordered by (created_at, id).
+
+    `cursor` is the (created_at, id) key returned by the previous page; the
+    next page is read from the composite indexes starting right after it, so
+    its cost does not grow with depth. `skip` is only honoured without a
+    cursor. Returns the page and the cursor of the next page (None at the end).
+    """
+    # created_at as stored, so the cursor compares equal to its own row
+    created_key = type_coerce(models.BugReport.created_at, String).label("created_key")
+    query = _bug_report_filters(db.query(models.BugReport, created_key), status, fingerprint, created_after, created_before)
+    if cursor is not None:
+        query = query.filter(
+            tuple_(models.BugReport.created_at, models.BugReport.id) < tuple_(literal(cursor[0], String), literal(cursor[1], Integer))
+        )
+    query = query.order_by(models.BugReport.created_at.desc(), models.BugReport.id.desc())
+    if cursor is None and skip:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1].created_key, rows[-1].BugReport.id)
+    return [row.BugReport for row in rows], next_cursor
+
+def estimate_bug_report_count(db: Session, status: Optional[str] = None, fingerprint: Optional[str] = None,
+                              created_after: Optional[datetime] = None, created_before: Optional[datetime] = None,
+                              max_exact: int = 10000) -> Tuple[int, bool]:
+    """
+    Number of bug reports matching the filters, and whether it is exact.
+    Unfiltered, the highest id stands in for the total (one index probe).
+    Filtered counts stop at `max_exact` matches.
+    """
+    if status is None and fingerprint is None and created_after is None and created_before is None:
+        return db.query(func.max(models.BugReport.id)).scalar() or 0, False
+    matches = _bug_report_filters(db.query(models.BugReport.id), status, fingerprint, created_after, created_before)
+    count = db.query(func.count()).select_from(matches.limit(max_exact + 1).subquery()).scalar()
+    return min(count, max_exact), count <= max_exact
+
+def create_bug_report(db: Session, description: str, fingerprint: Optional[str] = None,
+                      language: str = "python") -> models.BugReport:
+    db_bug_report = models.BugReport(description=description, fingerprint=fingerprint)
     db.add(db_bug_report)
+    if fingerprint:
+        # Upsert, so concurrent reports of a new bug cannot collide on the primary key
+        db.execute(
+            sqlite_insert(models.BugFingerprint)
+            .values(fingerprint=fingerprint, language=language, occurrences=1)
+            .on_conflict_do_update(
+                index_elements=[models.BugFingerprint.fingerprint],
+                set_={"occurrences": models.BugFingerprint.occurrences + 1, "last_seen": func.now()}
+            )
+        )
     db.commit()
     db.refresh(db_bug_report)
     return db_bug_report
 
+def get_bug_fingerprint(db: Session, fingerprint: str) -> Optional[models.BugFingerprint]:
+    return db.get(models.BugFingerprint, fingerprint)
+
+def get_verified_fix(db: Session, fingerprint: str) -> Optional[Dict[str, Any]]:
+    """Previously verified fix for a fingerprint, if any (primary key lookup)."""
+    db_fingerprint = db.get(models.BugFingerprint, fingerprint)
+    if db_fingerprint and db_fingerprint.verified_fix:
+        return json.loads(db_fingerprint.verified_fix)
+    return None
+
+def save_verified_fix(db: Session, fingerprint: str, fix: Dict[str, Any]) -> None:
+    db_fingerprint = db.get(models.BugFingerprint, fingerprint)
+    if not db_fingerprint:
+        return
+    try:
+        db_fingerprint.verified_fix = json.dumps({
+            key: fix.get(key) for key in ("root_cause", "fixed_code", "explanation", "confidence", "referenced_files")
+        })
+        db_fingerprint.fixed_at = datetime.now()
+        db.commit()
+    except Exception as e:
+        logger.error(f"Error saving verified fix for {fingerprint}: {e}")
+        db.rollback()
+
 def update_bug_report_status(db: Session, bug_report_id: int, status: str) -> Optional[models.BugReport]:
     db_bug_report = db.query(models.BugReport).filter(models.BugReport.id == bug_report_id).first()
     if db_bug_report:
@@ -47,25 +144,40 @@ def create_session(db: Session, session_id: str, bug_report_id: int):
 def get_session(db: Session, session_id: str):
     return db.query(models.Session).filter(models.Session.id == session_id).first()
 
-def update_session_usage(db: Session, session_id: str, prompt_tokens: int, completion_tokens: int, estimated_cost: float):
+def _add_usage(db: Session, db_session: models.Session, events: List[Dict[str, Any]]) -> None:
+    """
+    Append usage events to a session (caller commits). The legacy token and cost
+    columns on sessions are not updated; totals come from get_session_usage.
+    """
+    db.add_all([
+        models.UsageEvent(
+            session_id=db_session.id,
+            attempt=e.get("attempt"),
+            model=e.get("model"),
+            prompt_tokens=e.get("prompt_tokens", 0),
+            completion_tokens=e.get("completion_tokens", 0),
+            estimated_cost=e.get("estimated_cost", 0.0)
+        )
+        for e in events
+    ])
+
+def _add_session_files(db: Session, session_id: str, files: List[str]) -> None:
+    rows = [{"session_id": session_id, "file_path": f} for f in dict.fromkeys(files) if f]
+    if rows:
+        db.execute(sqlite_insert(models.SessionFile).values(rows).on_conflict_do_nothing())
+
+def update_session_usage(db: Session, session_id: str, prompt_tokens: int, completion_tokens: int, estimated_cost: float,
+                         model: Optional[str] = None, attempt: Optional[int] = None):
     db_session = db.query(models.Session).filter(models.Session.id == session_id).first()
     if not db_session:
         logger.warning(f"Session {session_id} not found for usage update")
         return None
         
     try:
-        db_session.prompt_tokens += prompt_tokens
-        db_session.completion_tokens += completion_tokens
-        db_session.total_tokens = db_session.prompt_tokens + db_session.completion_tokens
-        
-        # Robust cost parsing with fallback
-        try:
-            current_cost = float(db_session.estimated_cost or 0)
-        except (ValueError, TypeError) as e:
-            logger.error(f"Failed to parse current cost '{db_session.estimated_cost}' for session {session_id}: {e}")
-            current_cost = 0.0
-            
-        db_session.estimated_cost = f"{current_cost + estimated_cost:.6f}"
+        _add_usage(db, db_session, [{
+            "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "estimated_cost": estimated_cost, "model": model, "attempt": attempt
+        }])
         db.commit()
         db.refresh(db_session)
         return db_session
@@ -94,20 +206,143 @@ def update_session_approval(db: Session, session_id: str, is_approved: int, fixe
         db.rollback()
         return None
 
-def update_session_referenced_files(db: Session, session_id: str, files: List[str]):
-    """Update the list of files referenced by the AI for this session."""
+def update_session_referenced_files(db: Session, session_id: str, files: List[str]) -> bool:
+    """Record files referenced by the AI for this session."""
+    try:
+        _add_session_files(db, session_id, files)
+        db.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error updating referenced files for {session_id}: {e}")
+        db.rollback()
+        return False
+
+def get_session_files(db: Session, session_id: str) -> List[str]:
+    return [row.file_path for row in
+            db.query(models.SessionFile.file_path).filter(models.SessionFile.session_id == session_id).order_by(models.SessionFile.file_path)]
+
+def get_sessions_for_file(db: Session, file_path: str) -> List[str]:
+    """IDs of sessions that referenced `file_path` (index lookup on session_files)."""
+    return [row.session_id for row in
+            db.query(models.SessionFile.session_id).filter(models.SessionFile.file_path == file_path).order_by(models.SessionFile.session_id)]
+
+def get_session_usage(db: Session, session_id: str) -> Dict[str, Any]:
+    """Token and cost totals of one session, summed from its usage events."""
+    calls, prompt, completion, cost = db.query(
+        func.count(models.UsageEvent.id),
+        func.sum(models.UsageEvent.prompt_tokens),
+        func.sum(models.UsageEvent.completion_tokens),
+        func.sum(models.UsageEvent.estimated_cost)
+    ).filter(models.UsageEvent.session_id == session_id).one()
+    return {
+        "calls": calls,
+        "prompt_tokens": prompt or 0,
+        "completion_tokens": completion or 0,
+        "total_tokens": (prompt or 0) + (completion or 0),
+        "estimated_cost": cost or 0.0
+    }
+
+def get_usage_summary(db: Session, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Token and cost totals per model, optionally within [since, until)."""
+    query = db.query(
+        models.UsageEvent.model,
+        func.count(models.UsageEvent.id),
+        func.sum(models.UsageEvent.prompt_tokens),
+        func.sum(models.UsageEvent.completion_tokens),
+        func.sum(models.UsageEvent.estimated_cost)
+    )
+    if since is not None:
+        query = query.filter(models.UsageEvent.created_at >= since)
+    if until is not None:
+        query = query.filter(models.UsageEvent.created_at < until)
+    return [
+        {"model": model, "calls": calls, "prompt_tokens": prompt or 0, "completion_tokens": completion or 0,
+         "estimated_cost": cost or 0.0}
+        for model, calls, prompt, completion, cost in query.group_by(models.UsageEvent.model).order_by(models.UsageEvent.model)
+    ]
+
+def apply_session_updates(db: Session, session_id: str, usage: Optional[List[Dict[str, Any]]] = None,
+                          files: Optional[List[str]] = None) -> Optional[bool]:
+    """
+    Add buffered usage events and referenced files to a session in one transaction.
+    Returns True on success, False if the write failed and None if the session does not exist.
+    """
     db_session = db.query(models.Session).filter(models.Session.id == session_id).first()
     if not db_session:
+        logger.warning(f"Session {session_id} not found for batched update")
         return None
     try:
-        # Merge with existing files if any
-        existing = json.loads(db_session.referenced_files) if db_session.referenced_files else []
-        updated = list(set(existing + files))
-        db_session.referenced_files = json.dumps(updated)
+        if usage:
+            _add_usage(db, db_session, usage)
+        if files:
+            _add_session_files(db, session_id, files)
         db.commit()
-        db.refresh(db_session)
-        return db_session
+        return True
     except Exception as e:
-        logger.error(f"Error updating referenced files for {session_id}: {e}")
+        logger.error(f"Error applying batched updates for session {session_id}: {e}")
+        db.rollback()
+        return False
+
+def get_verification_result(db: Session, key: str) -> Optional[models.VerificationResult]:
+    return db.query(models.VerificationResult).filter(models.VerificationResult.key == key).first()
+
+def save_verification_result(db: Session, key: str, image: str, language: str, output: str):
+    """Store the sandbox output for a verified code/image combination."""
+    try:
+        db.merge(models.VerificationResult(key=key, image=image, language=language, output=output))
+        db.commit()
+    except Exception as e:
+        logger.error(f"Error saving verification result {key[:12]}: {e}")
+        db.rollback()
+
+def invalidate_verification_results(db: Session, image_repository: str, keep_image: str) -> int:
+    """Drop memoized verifications for every tag of image_repository except keep_image."""
+    try:
+        deleted = db.query(models.VerificationResult).filter(
+            models.VerificationResult.image.like(f"{image_repository}:%"),
+            models.VerificationResult.image != keep_image
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    except Exception as e:
+        logger.error(f"Error invalidating verification results for {image_repository}: {e}")
+        db.rollback()
+        return 0
+
+def create_job(db: Session, job_id: str, kind: str, payload: Dict[str, Any], bug_report_id: Optional[int] = None) -> models.Job:
+    db_job = models.Job(id=job_id, kind=kind, status="queued", payload=json.dumps(payload), bug_report_id=bug_report_id)
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_job(db: Session, job_id: str) -> Optional[models.Job]:
+    return db.query(models.Job).filter(models.Job.id == job_id).first()
+
+def get_jobs_by_status(db: Session, statuses: List[str]) -> List[models.Job]:
+    """Jobs in any of the given states, oldest first."""
+    return db.query(models.Job).filter(models.Job.status.in_(statuses)).order_by(models.Job.created_at, models.Job.id).all()
+
+def update_job(db: Session, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None,
+               started_at: Optional[datetime] = None, finished_at: Optional[datetime] = None) -> Optional[models.Job]:
+    db_job = get_job(db, job_id)
+    if not db_job:
+        logger.warning(f"Job {job_id} not found for status update")
+        return None
+    try:
+        db_job.status = status
+        if result is not None:
+            db_job.result = json.dumps(result, default=str)
+        if error is not None:
+            db_job.error = error
+        if started_at is not None:
+            db_job.started_at = started_at
+        if finished_at is not None:
+            db_job.finished_at = finished_at
+        db.commit()
+        db.refresh(db_job)
+        return db_job
+    except Exception as e:
+        logger.error(f"Error updating job {job_id}: {e}")
         db.rollback()
         return None
@@ -1,13 +1,52 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from typing import Final
+from typing import Final, AsyncGenerator, Dict
 
 SQLALCHEMY_DATABASE_URL: Final[str] = "sqlite:///./bug_exorcist.db"
+ASYNC_SQLALCHEMY_DATABASE_URL: Final[str] = "sqlite+aiosqlite:///./bug_exorcist.db"
+
+# Applied to every new connection of both engines. WAL lets readers proceed
+# while a writer commits; synchronous=NORMAL is durable across crashes of the
+# process (not of the OS) in WAL mode and avoids an fsync per commit.
+SQLITE_PRAGMAS: Final[Dict[str, str]] = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "temp_store": "MEMORY",
+}
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Per-connection pragma hook (SQLAlchemy "connect" event)."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
+event.listen(engine, "connect", apply_sqlite_pragmas)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for request handlers: queries run on aiosqlite's worker thread
+# instead of blocking the event loop
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+# Objects stay usable after commit without an implicit (blocking) refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI dependency yielding an AsyncSession."""
+    async with AsyncSessionLocal() as db:
+        yield db
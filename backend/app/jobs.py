@@ -0,0 +1,251 @@
+"""
+backend/app/jobs.py - Background job queue for long-running analyses
+
+Fix requests are persisted as jobs and executed by a bounded pool of worker
+tasks, so the HTTP request returns a job id immediately instead of staying
+open through several LLM calls and sandbox runs. Job state lives in SQLite:
+jobs that were queued or running when the process stopped are queued again on
+the next start. Subscribers (WebSocket clients) receive every state change.
+"""
+
+import os
+import json
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.database import AsyncSessionLocal
+from app import async_crud
+from app.usage_buffer import attempt_usage
+from core.error_signature import error_signature
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ("succeeded", "failed")
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+def job_to_dict(job) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "bug_id": f"BUG-{job.bug_report_id}" if job.bug_report_id else None,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+async def run_fix_job(payload: Dict[str, Any], secrets: Dict[str, Any], rag: Optional[Any] = None) -> Dict[str, Any]:
+    """Run analyze_and_fix_with_retry for a job and record usage and bug status."""
+    from core.agent import BugExorcistAgent
+    from app.api.agent import known_fix_result
+
+    fingerprint = payload.get("fingerprint")
+    if fingerprint and not payload.get("bypass_cache", False):
+        async with AsyncSessionLocal() as db:
+            known_fix = await async_crud.get_verified_fix(db, fingerprint)
+            if known_fix:
+                await async_crud.update_bug_report_status(db, payload["bug_report_id"], "fixed")
+                return {"language": payload.get("language", "python"), "session_id": payload["session_id"],
+                        **known_fix_result(known_fix)}
+
+    agent = BugExorcistAgent(
+        bug_id=f"BUG-{payload['bug_report_id']}",
+        openai_api_key=secrets.get("openai_api_key"),
+        project_path=payload.get("project_path") or ".",
+        rag=rag,
+        use_cache=not payload.get("bypass_cache", False)
+    )
+    result = await agent.analyze_and_fix_with_retry(
+        error_message=payload["error_message"],
+        code_snippet=payload["code_snippet"],
+        file_path=payload.get("file_path"),
+        additional_context=payload.get("additional_context"),
+        max_attempts=payload.get("max_attempts", 3),
+        language=payload.get("language", "python"),
+        race=payload.get("race", False),
+        max_cost=payload.get("max_cost")
+    )
+
+    files = result["final_fix"].get("referenced_files") if result["success"] else None
+    async with AsyncSessionLocal() as db:
+        await async_crud.apply_session_updates(db, payload["session_id"], usage=attempt_usage(result), files=files)
+        await async_crud.update_bug_report_status(db, payload["bug_report_id"], "fixed" if result["success"] else "failed")
+        if result["success"] and fingerprint:
+            await async_crud.save_verified_fix(db, fingerprint, result["final_fix"])
+    return {"language": payload.get("language", "python"), "session_id": payload["session_id"], **result}
+
+
+class JobQueue:
+    """
+    Persistent FIFO of jobs drained by `concurrency` worker tasks.
+
+    At most `max_queued` jobs may wait at a time; `submit` raises QueueFullError
+    beyond that so the API can answer 429. Secrets such as API keys are kept in
+    memory only, so jobs recovered after a restart use the server's configured keys.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 2,
+        max_queued: int = 100,
+        runner: Callable[..., Awaitable[Dict[str, Any]]] = run_fix_job
+    ):
+        self.concurrency = concurrency
+        self.max_queued = max_queued
+        self.runner = runner
+        self.rag = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._secrets: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._running = 0
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self, rag: Optional[Any] = None) -> int:
+        """Re-queue jobs left over from a previous run and start the workers. Returns the number recovered."""
+        self.rag = rag
+        async with AsyncSessionLocal() as db:
+            pending = await async_crud.get_jobs_by_status(db, ["queued", "running"])
+            for job in pending:
+                if job.status == "running":
+                    await async_crud.update_job(db, job.id, status="queued")
+                self._queue.put_nowait(job.id)
+        if pending:
+            logger.info(f"Recovered {len(pending)} unfinished job(s)")
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+        return len(pending)
+
+    async def stop(self) -> None:
+        """Cancel the workers. Interrupted jobs stay 'running' in the database and are recovered on start."""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def submit(self, kind: str, payload: Dict[str, Any], secrets: Optional[Dict[str, Any]] = None,
+               description: str = "") -> Dict[str, Any]:
+        """Persist a job with its bug report and usage session, and queue it."""
+        if self._queue.qsize() >= self.max_queued:
+            raise QueueFullError(f"Job queue is full ({self.max_queued} waiting)")
+
+        job_id = uuid.uuid4().hex
+        language = payload.get("language", "python")
+        fingerprint = error_signature(payload.get("error_message", ""), payload.get("code_snippet", ""), language)
+        async with AsyncSessionLocal() as db:
+            bug_report = await async_crud.create_bug_report(
+                db,
+                description=description or f"{payload.get('error_message', '')[:200]}...",
+                fingerprint=fingerprint,
+                language=language
+            )
+            session_id = str(uuid.uuid4())
+            await async_crud.create_session(db, session_id=session_id, bug_report_id=bug_report.id)
+            payload = {**payload, "bug_report_id": bug_report.id, "session_id": session_id, "fingerprint": fingerprint}
+            job = await async_crud.create_job(db, job_id, kind, payload, bug_report_id=bug_report.id)
+            info = job_to_dict(job)
+
+        if secrets:
+            self._secrets[job_id] = secrets
+        self._queue.put_nowait(job_id)
+        return {**info, "queue_depth": self._queue.qsize()}
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        async with AsyncSessionLocal() as db:
+            job = await async_crud.get_job(db, job_id)
+            return job_to_dict(job) if job else None
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        """Queue that receives the job's state changes until unsubscribed."""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    def _publish(self, info: Dict[str, Any]) -> None:
+        for queue in list(self._subscribers.get(info["job_id"], ())):
+            queue.put_nowait(info)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "running": self._running,
+            "concurrency": self.concurrency,
+            "max_queued": self.max_queued
+        }
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {index} failed on {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _update(self, job_id: str, **fields) -> Optional[Dict[str, Any]]:
+        async with AsyncSessionLocal() as db:
+            job = await async_crud.update_job(db, job_id, **fields)
+            return job_to_dict(job) if job else None
+
+    async def _run(self, job_id: str) -> None:
+        async with AsyncSessionLocal() as db:
+            job = await async_crud.get_job(db, job_id)
+            payload = json.loads(job.payload) if job else None
+        if payload is None:
+            return
+
+        info = await self._update(job_id, status="running", started_at=datetime.now(timezone.utc))
+        if info:
+            self._publish(info)
+        self._running += 1
+        try:
+            result = await self.runner(payload, self._secrets.get(job_id, {}), rag=self.rag)
+            info = await self._update(job_id, status="succeeded", result=result, finished_at=datetime.now(timezone.utc))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"Job {job_id} failed")
+            # Details stay in the server log, as with the synchronous endpoints
+            info = await self._update(job_id, status="failed", error="Job failed due to an internal error. Please check server logs.",
+                                      finished_at=datetime.now(timezone.utc))
+        finally:
+            self._running -= 1
+        self._secrets.pop(job_id, None)
+        if info:
+            self._publish(info)
+
+
+# Singleton instance
+_job_queue = None
+
+def get_job_queue() -> JobQueue:
+    """Get the process-wide job queue."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            concurrency=int(os.getenv("JOB_WORKERS", "2")),
+            max_queued=int(os.getenv("JOB_QUEUE_MAX", "100"))
+        )
+    return _job_queue
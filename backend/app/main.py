@@ -107,43 +107,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api.logs import router as logs_router
 from app.api.agent import router as agent_router
 from app.database import engine, Base
-from sqlalchemy import text
+from app import migrations
 
 # Load environment variables from .env file
 load_dotenv()
 
 def run_migrations():
-    """Lightweight startup migration routine to add missing columns to sessions table."""
+    """Bring an existing database up to the current schema (see app/migrations.py)."""
     logger.info("Checking for database migrations...")
     try:
         with engine.connect() as conn:
-            # Check existing columns in sessions table
-            result = conn.execute(text("PRAGMA table_info(sessions)"))
-            columns = [row[1] for row in result.fetchall()]
-            
-            # Add missing columns if they don't exist
-            if "is_approved" not in columns:
-                logger.info("Adding 'is_approved' column to sessions table")
-                conn.execute(text("ALTER TABLE sessions ADD COLUMN is_approved INTEGER DEFAULT 0"))
-            
-            if "fixed_code" not in columns:
-                logger.info("Adding 'fixed_code' column to sessions table")
-                conn.execute(text("ALTER TABLE sessions ADD COLUMN fixed_code TEXT"))
-            
-            if "repo_path" not in columns:
-                logger.info("Adding 'repo_path' column to sessions table")
-                conn.execute(text("ALTER TABLE sessions ADD COLUMN repo_path TEXT"))
-                
-            if "file_path" not in columns:
-                logger.info("Adding 'file_path' column to sessions table")
-                conn.execute(text("ALTER TABLE sessions ADD COLUMN file_path TEXT"))
-
-            if "referenced_files" not in columns:
-                logger.info("Adding 'referenced_files' column to sessions table")
-                conn.execute(text("ALTER TABLE sessions ADD COLUMN referenced_files TEXT"))
-            
-            conn.commit()
-            logger.info("Database migrations completed successfully")
+            version = migrations.upgrade(conn)
+            logger.info(f"Database schema is at version {version}")
     except Exception as e:
         logger.error(f"Error during database migration: {e}")
 
@@ -163,6 +138,11 @@ app = FastAPI(
 # Health check endpoint
 @app.get("/health")
 def health_check() -> Dict[str, Any]:
+    from app.container_pool import get_container_pool_metrics
+    from app.network_pool import get_network_pool_metrics
+    from core.embedding_cache import get_embedding_cache_stats
+    from core.provider_registry import get_provider_registry
+    from app.jobs import get_job_queue
     return {
         "status": "active",
         "service": "Bug Exorcist",
@@ -174,7 +154,12 @@ def health_check() -> Dict[str, Any]:
             "git_operations",
             "websocket_logging",
             "realtime_thought_stream"
-        ]
+        ],
+        "sandbox_pool": get_container_pool_metrics(),
+        "sandbox_networks": get_network_pool_metrics(),
+        "embedding_cache": get_embedding_cache_stats(),
+        "providers": get_provider_registry().stats(),
+        "jobs": get_job_queue().stats()
     }
 
 # Configure CORS (Essential for frontend communication)
@@ -203,7 +188,7 @@ async def startup_event():
             logger.info("RAG is disabled via ENABLE_RAG environment variable.")
             return
 
-        from core.rag_engine import CodebaseRAG
+        from core.provider_registry import get_provider_registry
         project_path = os.getenv("ALLOWED_REPO_ROOT", ".")
         
         # In production, require project_path to be explicitly set if RAG is enabled
@@ -211,20 +196,64 @@ async def startup_event():
         if is_prod and project_path == ".":
              logger.warning("RAG: project_path defaults to '.' in production. Ensure ALLOWED_REPO_ROOT is set correctly.")
 
-        rag = CodebaseRAG(project_path=project_path)
-        # Initial indexing in background thread to not block startup
-        asyncio.create_task(asyncio.to_thread(rag.index_project))
-        # Start background indexing with 1-hour interval
+        # Registered so agents created without an injected RAG share this instance
+        rag = get_provider_registry().get_rag(project_path, pin=True)
+        # Every watch mode indexes the project first (off the event loop), then keeps it fresh;
+        # the interval mode rescans hourly
         rag.start_background_indexing(interval_seconds=3600)
         app.state.rag = rag
         logger.info("RAG singleton initialized and background indexing started.")
     except Exception as e:
         logger.error(f"Failed to initialize RAG during startup: {e}")
 
+# Start background job workers and re-queue jobs interrupted by the last shutdown
+@app.on_event("startup")
+async def start_job_queue():
+    from app.jobs import get_job_queue
+    await get_job_queue().start(rag=getattr(app.state, "rag", None))
+
+# Periodically tear down sidecars of sandbox sessions that were never closed,
+# remove sandbox networks nobody holds anymore and evict/refill the container pool
+@app.on_event("startup")
+async def start_sandbox_janitor():
+    from app.sandbox import reap_expired_sessions, reap_orphan_networks
+    from app.container_pool import maintain_container_pool
+    from core.provider_registry import get_provider_registry
+    interval = int(os.getenv("SANDBOX_JANITOR_INTERVAL", "60"))
+
+    async def _janitor_loop():
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                reaped = await asyncio.to_thread(reap_expired_sessions)
+                if reaped:
+                    logger.info(f"Sandbox janitor reaped {reaped} idle session(s)")
+                client = await asyncio.to_thread(get_provider_registry().docker_client)
+                orphans = await asyncio.to_thread(reap_orphan_networks, client)
+                if orphans:
+                    logger.info(f"Sandbox janitor removed {orphans} orphaned network(s)")
+                evicted, started = await asyncio.to_thread(maintain_container_pool)
+                if evicted or started:
+                    logger.info(f"Sandbox janitor evicted {evicted} and started {started} pooled container(s)")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in sandbox janitor: {e}")
+
+    app.state.sandbox_janitor = asyncio.create_task(_janitor_loop())
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Handle application shutdown and cleanup."""
     logger.info("Application shutting down...")
+
+    janitor = getattr(app.state, "sandbox_janitor", None)
+    if janitor:
+        janitor.cancel()
+
+    # Running jobs stay marked as running and are picked up again on the next start
+    from app.jobs import get_job_queue
+    await get_job_queue().stop()
     
     # Cancel RAG background indexing if it exists
     if hasattr(app.state, "rag") and app.state.rag:
@@ -239,6 +268,20 @@ async def shutdown_event():
             except Exception as e:
                 logger.error(f"Error while cancelling RAG indexing task: {e}")
 
+    # Remove warm sandbox containers
+    from app.container_pool import shutdown_container_pool
+    shutdown_container_pool()
+    from app.network_pool import shutdown_network_pool
+    shutdown_network_pool()
+
+    # Close shared LLM HTTP pools and the Docker client
+    from core.provider_registry import get_provider_registry
+    await get_provider_registry().aclose()
+
+    # Release pooled database connections
+    from app.database import async_engine
+    await async_engine.dispose()
+
 
 # NEW: Real-Time Thought Stream WebSocket Endpoint
 @app.websocket("/ws/thought-stream/{session_id}")
@@ -257,7 +300,10 @@ async def thought_stream_websocket(websocket: WebSocket, session_id: str) -> Non
         "file_path": "...",
         "additional_context": "...",
         "use_retry": true,
-        "max_attempts": 3
+        "max_attempts": 3,
+        "race": false,
+        "max_cost": null,
+        "bypass_cache": false
     }
     
     Streamed event format to client:
@@ -327,6 +373,8 @@ async def thought_stream_websocket(websocket: WebSocket, session_id: str) -> Non
         additional_context = request_data.get("additional_context")
         use_retry = request_data.get("use_retry", True)
         max_attempts = request_data.get("max_attempts", 3)
+        race = bool(request_data.get("race", False))
+        max_cost = float(request_data["max_cost"]) if request_data.get("max_cost") is not None else None
         language = sanitize_language(request_data.get("language", "python"))
         require_approval = os.getenv("REQUIRE_APPROVAL", "false").lower() == "true"
         
@@ -343,15 +391,18 @@ async def thought_stream_websocket(websocket: WebSocket, session_id: str) -> Non
         
         # Import agent here to avoid circular imports
         from core.agent import BugExorcistAgent
-        from app import crud
-        from app.database import SessionLocal
+        from core.error_signature import error_signature
+        from app.usage_buffer import SessionUsageBuffer
+        from app import async_crud
+        from app.database import AsyncSessionLocal
         
         # Create database session
-        db = SessionLocal()
+        db = AsyncSessionLocal()
+        usage_buffer = None
         
         try:
             # Check if session already exists to prevent hijacking/overwriting
-            existing_session = crud.get_session(db=db, session_id=session_id)
+            existing_session = await async_crud.get_session(db, session_id=session_id)
             if existing_session:
                 await websocket.send_json({
                     "type": "error",
@@ -363,14 +414,18 @@ async def thought_stream_websocket(websocket: WebSocket, session_id: str) -> Non
                 return
 
             # Create bug report
-            bug_report = crud.create_bug_report(
-                db=db,
-                description=f"{error_message[:200]}..."
+            bug_report = await async_crud.create_bug_report(
+                db,
+                description=f"{error_message[:200]}...",
+                fingerprint=error_signature(error_message, code_snippet, language),
+                language=language
             )
             bug_id = f"BUG-{bug_report.id}"
             
             # Create session for tracking
-            crud.create_session(db=db, session_id=session_id, bug_report_id=bug_report.id)
+            await async_crud.create_session(db, session_id=session_id, bug_report_id=bug_report.id)
+            # Usage and referenced files are written in batches, not once per event
+            usage_buffer = SessionUsageBuffer(session_id)
             
             # Initialize usage tracking
             total_prompt_tokens = 0
@@ -379,7 +434,12 @@ async def thought_stream_websocket(websocket: WebSocket, session_id: str) -> Non
             
             # Initialize agent with streaming capability
             rag = getattr(app.state, "rag", None)
-            agent = BugExorcistAgent(bug_id=bug_id, project_path=project_path, rag=rag)
+            agent = BugExorcistAgent(
+                bug_id=bug_id,
+                project_path=project_path,
+                rag=rag,
+                use_cache=not request_data.get("bypass_cache", False)
+            )
             
             # Start thought stream
             last_result = None
@@ -391,34 +451,33 @@ async def thought_stream_websocket(websocket: WebSocket, session_id: str) -> Non
                 use_retry=use_retry,
                 max_attempts=max_attempts,
                 language=language,
-                session_id=session_id
+                session_id=session_id,
+                race=race,
+                max_cost=max_cost
             ):
                 if event.get("type") == "result":
                     last_result = event.get("data")
                     
-                    # Consolidate DB write for referenced files from the final result
+                    # Referenced files from the final result
                     if last_result and last_result.get('referenced_files'):
-                        crud.update_session_referenced_files(db=db, session_id=session_id, files=last_result['referenced_files'])
+                        await usage_buffer.add(files=last_result['referenced_files'])
 
                 # If this is a thought event with usage, accumulate it
                 if event.get("type") == "thought" and "usage" in event.get("data", {}):
                     usage = event["data"]["usage"]
                     
-                    # Also check for referenced files in thought events (generated per attempt)
-                    if event["data"].get("referenced_files"):
-                        crud.update_session_referenced_files(db=db, session_id=session_id, files=event["data"]["referenced_files"])
-                    
                     total_prompt_tokens += usage.get("prompt_tokens", 0)
                     total_completion_tokens += usage.get("completion_tokens", 0)
                     total_cost += usage.get("estimated_cost", 0.0)
                     
-                    # Update session in DB
-                    crud.update_session_usage(
-                        db=db,
-                        session_id=session_id,
+                    # Referenced files are generated per attempt and travel with the usage
+                    await usage_buffer.add(
                         prompt_tokens=usage.get("prompt_tokens", 0),
                         completion_tokens=usage.get("completion_tokens", 0),
-                        estimated_cost=usage.get("estimated_cost", 0.0)
+                        estimated_cost=usage.get("estimated_cost", 0.0),
+                        files=event["data"].get("referenced_files"),
+                        model=usage.get("model"),
+                        attempt=event["data"].get("attempt")
                     )
                 
                 # If this is the final result, add total usage to it
@@ -465,8 +524,8 @@ async def thought_stream_websocket(websocket: WebSocket, session_id: str) -> Non
                             logger.error(f"Failed to generate diff: {e}")
                             patch = f"Could not generate diff. Previewing fixed code:\n\n{final_fix_code}"
 
-                        crud.update_session_approval(
-                            db=db, 
+                        await async_crud.update_session_approval(
+                            db,
                             session_id=session_id, 
                             is_approved=0, 
                             fixed_code=final_fix_code,
@@ -514,7 +573,7 @@ async def thought_stream_websocket(websocket: WebSocket, session_id: str) -> Non
                                     "stage": "applying_fix"
                                 })
                             
-                            crud.update_session_approval(db=db, session_id=session_id, is_approved=1)
+                            await async_crud.update_session_approval(db, session_id=session_id, is_approved=1)
                         else:
                             await websocket.send_json({
                                 "type": "status",
@@ -522,10 +581,10 @@ async def thought_stream_websocket(websocket: WebSocket, session_id: str) -> Non
                                 "message": "❌ Fix rejected by user.",
                                 "stage": "rejected"
                             })
-                            crud.update_session_approval(db=db, session_id=session_id, is_approved=-1)
+                            await async_crud.update_session_approval(db, session_id=session_id, is_approved=-1)
                     except asyncio.TimeoutError:
                         logger.warning(f"Approval request timed out for session {session_id}")
-                        crud.update_session_approval(db=db, session_id=session_id, is_approved=-1)
+                        await async_crud.update_session_approval(db, session_id=session_id, is_approved=-1)
                         await websocket.send_json({
                             "type": "error",
                             "timestamp": __import__('datetime').datetime.now().isoformat(),
@@ -535,11 +594,11 @@ async def thought_stream_websocket(websocket: WebSocket, session_id: str) -> Non
                         break
                     except WebSocketDisconnect:
                         logger.info(f"Client disconnected during approval for session {session_id}")
-                        crud.update_session_approval(db=db, session_id=session_id, is_approved=-1)
+                        await async_crud.update_session_approval(db, session_id=session_id, is_approved=-1)
                         return # Exit the function immediately
                     except Exception as e:
                         logger.error(f"Error during approval process: {e}")
-                        crud.update_session_approval(db=db, session_id=session_id, is_approved=-1)
+                        await async_crud.update_session_approval(db, session_id=session_id, is_approved=-1)
                         break
             
             # Update bug status in database based on final result
@@ -554,7 +613,13 @@ async def thought_stream_websocket(websocket: WebSocket, session_id: str) -> Non
                 "stage": "error"
             })
         finally:
-            db.close()
+            # Final flush also runs when the client disconnected mid-stream;
+            # the DB session is closed even if the flush raises
+            try:
+                if usage_buffer is not None:
+                    await usage_buffer.close()
+            finally:
+                await db.close()
         
     except WebSocketDisconnect:
         logger.info(f"[WebSocket] Client disconnected from session {session_id}")
@@ -0,0 +1,120 @@
+"""
+backend/app/migrations.py - Versioned schema migrations
+
+`Base.metadata.create_all` creates missing tables but never alters existing
+ones. The steps below bring older databases up to the current models. The
+schema version is stored in SQLite's `PRAGMA user_version`, so each step runs
+exactly once per database; the steps are also safe to re-run on a database
+whose version was never recorded.
+"""
+
+import json
+import logging
+from typing import Callable, List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+
+def _columns(conn: Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(text(f"PRAGMA table_info({table})")).fetchall()]
+
+
+def _add_session_columns(conn: Connection) -> None:
+    """Approval, repository and referenced-file columns on sessions."""
+    columns = _columns(conn, "sessions")
+    for name, ddl in (
+        ("is_approved", "INTEGER DEFAULT 0"),
+        ("fixed_code", "TEXT"),
+        ("repo_path", "TEXT"),
+        ("file_path", "TEXT"),
+        ("referenced_files", "TEXT"),
+    ):
+        if name not in columns:
+            logger.info(f"Adding '{name}' column to sessions table")
+            conn.execute(text(f"ALTER TABLE sessions ADD COLUMN {name} {ddl}"))
+
+
+def _add_bug_fingerprints(conn: Connection) -> None:
+    """Error fingerprint on bug reports, indexed for known-fix lookups."""
+    if "fingerprint" not in _columns(conn, "bug_reports"):
+        logger.info("Adding 'fingerprint' column to bug_reports table")
+        conn.execute(text("ALTER TABLE bug_reports ADD COLUMN fingerprint TEXT"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_bug_reports_fingerprint ON bug_reports (fingerprint)"))
+
+
+def _normalize_session_usage(conn: Connection) -> None:
+    """
+    Move per-session usage and referenced files into usage_events and
+    session_files. Existing totals become one usage event per session (model
+    and attempt unknown); the legacy JSON file lists become rows.
+    """
+    models.UsageEvent.__table__.create(conn, checkfirst=True)
+    models.SessionFile.__table__.create(conn, checkfirst=True)
+
+    sessions = conn.execute(text(
+        "SELECT id, prompt_tokens, completion_tokens, estimated_cost, referenced_files, created_at FROM sessions"
+    )).fetchall()
+    backfilled = set(conn.execute(text("SELECT DISTINCT session_id FROM usage_events")).scalars())
+    usage_rows, file_rows = [], []
+    for session_id, prompt_tokens, completion_tokens, estimated_cost, referenced_files, created_at in sessions:
+        if session_id not in backfilled and (prompt_tokens or completion_tokens):
+            try:
+                cost = float(estimated_cost or 0)
+            except (ValueError, TypeError):
+                cost = 0.0
+            usage_rows.append({
+                "session_id": session_id, "prompt_tokens": prompt_tokens or 0,
+                "completion_tokens": completion_tokens or 0, "estimated_cost": cost, "created_at": created_at
+            })
+        try:
+            files = json.loads(referenced_files) if referenced_files else []
+        except (ValueError, TypeError):
+            logger.warning(f"Skipping unreadable referenced_files of session {session_id}")
+            files = []
+        file_rows.extend({"session_id": session_id, "file_path": f} for f in dict.fromkeys(files) if f)
+
+    if usage_rows:
+        conn.execute(text(
+            "INSERT INTO usage_events (session_id, prompt_tokens, completion_tokens, estimated_cost, created_at) "
+            "VALUES (:session_id, :prompt_tokens, :completion_tokens, :estimated_cost, COALESCE(:created_at, CURRENT_TIMESTAMP))"
+        ), usage_rows)
+    if file_rows:
+        conn.execute(text(
+            "INSERT OR IGNORE INTO session_files (session_id, file_path) VALUES (:session_id, :file_path)"
+        ), file_rows)
+    logger.info(f"Backfilled {len(usage_rows)} usage events and {len(file_rows)} session files")
+
+
+def _add_bug_list_indexes(conn: Connection) -> None:
+    """Composite indexes behind the keyset-paginated bug list."""
+    for index in models.BugReport.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+# Append new steps; never reorder or remove existing ones
+MIGRATIONS: List[Callable[[Connection], None]] = [
+    _add_session_columns,
+    _add_bug_fingerprints,
+    _normalize_session_usage,
+    _add_bug_list_indexes,
+]
+
+
+def get_schema_version(conn: Connection) -> int:
+    return conn.execute(text("PRAGMA user_version")).scalar() or 0
+
+
+def upgrade(conn: Connection) -> int:
+    """Apply pending migrations in order, each in its own transaction. Returns the resulting version."""
+    version = get_schema_version(conn)
+    for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        logger.info(f"Applying migration {number}: {step.__name__}")
+        step(conn)
+        conn.execute(text(f"PRAGMA user_version = {number}"))
+        conn.commit()
+    return get_schema_version(conn)
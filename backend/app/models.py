@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Index, PrimaryKeyConstraint
 from sqlalchemy.sql import func
 from typing import TYPE_CHECKING
 from .database import Base
@@ -8,17 +8,37 @@ if TYPE_CHECKING:
 
 class BugReport(Base):
     __tablename__ = "bug_reports"
+    # Keyset pagination over (created_at, id), optionally narrowed by status or fingerprint
+    __table_args__ = (
+        Index("ix_bug_reports_created_id", "created_at", "id"),
+        Index("ix_bug_reports_status_created_id", "status", "created_at", "id"),
+        Index("ix_bug_reports_fingerprint_created_id", "fingerprint", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     description = Column(String, index=True)
     status = Column(String, default="open")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    fingerprint = Column(String, index=True, nullable=True) # normalized error signature, see core/error_signature.py
+
+class BugFingerprint(Base):
+    __tablename__ = "bug_fingerprints"
+
+    fingerprint = Column(String, primary_key=True, index=True)
+    language = Column(String)
+    occurrences = Column(Integer, default=0)
+    first_seen = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen = Column(DateTime(timezone=True), server_default=func.now())
+    verified_fix = Column(Text, nullable=True) # JSON fix that passed sandbox verification
+    fixed_at = Column(DateTime(timezone=True), nullable=True)
 
 class Session(Base):
     __tablename__ = "sessions"
 
     id = Column(String, primary_key=True, index=True)
     bug_report_id = Column(Integer, index=True)
+    # Deprecated denormalized totals, no longer updated. usage_events is authoritative
+    # (crud.get_session_usage); the migration backfilled these into one event per session.
     prompt_tokens = Column(Integer, default=0)
     completion_tokens = Column(Integer, default=0)
     total_tokens = Column(Integer, default=0)
@@ -29,4 +49,57 @@ class Session(Base):
     fixed_code = Column(Text, nullable=True)
     repo_path = Column(String, nullable=True)
     file_path = Column(String, nullable=True)
-    referenced_files = Column(Text, nullable=True) # JSON list of files used for RAG context
+    referenced_files = Column(Text, nullable=True) # Legacy JSON list, superseded by session_files
+
+class UsageEvent(Base):
+    """Token usage of one LLM call (one attempt) within a session."""
+    __tablename__ = "usage_events"
+    __table_args__ = (
+        Index("ix_usage_events_session_created", "session_id", "created_at"),
+        Index("ix_usage_events_created_model", "created_at", "model"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String, nullable=False)
+    attempt = Column(Integer, nullable=True)
+    model = Column(String, nullable=True)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    estimated_cost = Column(Float, default=0.0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class SessionFile(Base):
+    """Project file referenced by the AI during a session."""
+    __tablename__ = "session_files"
+    __table_args__ = (
+        PrimaryKeyConstraint("session_id", "file_path"),
+        # "Which sessions touched file X"
+        Index("ix_session_files_file_session", "file_path", "session_id"),
+    )
+
+    session_id = Column(String, nullable=False)
+    file_path = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class VerificationResult(Base):
+    __tablename__ = "verification_results"
+
+    key = Column(String, primary_key=True, index=True) # sha256(code, language, image digest, manifest hash)
+    image = Column(String, index=True)
+    language = Column(String)
+    output = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    kind = Column(String)
+    status = Column(String, index=True, default="queued") # queued, running, succeeded, failed
+    bug_report_id = Column(Integer, index=True, nullable=True)
+    payload = Column(Text) # JSON request; API keys are never persisted
+    result = Column(Text, nullable=True) # JSON result
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,223 @@
+"""
+backend/app/network_pool.py - Pooled internal networks for sandbox sessions
+
+Sandbox sessions only need a private bridge network when they start sidecar
+services. Networks are handed out on demand from a small set of pre-created
+internal networks and returned when the session's last user releases them.
+Every network is labelled with its owning process, so a janitor can remove
+networks leaked by crashed workers or sessions that were never closed.
+"""
+
+import os
+import re
+import time
+import uuid
+import socket
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+SESSION_LABEL = "com.exorcist.session"
+OWNER_LABEL = "com.exorcist.owner"
+POOL_SESSION = "pool"
+
+_CREATED_RE = re.compile(r"^(?P<time>\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.\d+)?(?P<offset>Z|[+-]\d\d:\d\d)?$")
+
+# Identifies networks created by this process: "<hostname>:<pid>"
+PROCESS_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def create_session_network(client, session_id: str):
+    """Create an isolated (internal) bridge network labelled for `session_id`."""
+    return client.networks.create(
+        f"net-{session_id}",
+        driver="bridge",
+        internal=True,
+        labels={SESSION_LABEL: session_id, OWNER_LABEL: PROCESS_OWNER}
+    )
+
+
+def _has_endpoints(network) -> bool:
+    try:
+        network.reload()
+    except Exception:
+        return True
+    return bool(network.attrs.get("Containers"))
+
+
+class NetworkPool:
+    """
+    Bounded set of idle internal networks.
+
+    `acquire()` returns an idle network or creates one; `release()` returns it
+    to the pool if nothing is attached anymore and the pool has room, and
+    removes it otherwise.
+    """
+
+    def __init__(self, client, max_idle: int = 2):
+        self.client = client
+        self.max_idle = max_idle
+        self._idle: List[Any] = []
+        self._leased: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "created": 0, "removed": 0}
+
+    def _create(self):
+        network = create_session_network(self.client, f"{POOL_SESSION}-{uuid.uuid4().hex[:12]}")
+        with self._lock:
+            self._stats["created"] += 1
+        return network
+
+    def _remove(self, network) -> None:
+        try:
+            network.remove()
+            with self._lock:
+                self._stats["removed"] += 1
+        except Exception as e:
+            logger.debug(f"Failed to remove network {getattr(network, 'name', '?')}: {e}")
+
+    def acquire(self):
+        with self._lock:
+            network = self._idle.pop() if self._idle else None
+            self._stats["hits" if network else "misses"] += 1
+            if network:
+                self._leased.add(network.id)
+        if network is None:
+            network = self._create()
+            with self._lock:
+                self._leased.add(network.id)
+        return network
+
+    def release(self, network) -> None:
+        with self._lock:
+            self._leased.discard(network.id)
+        if _has_endpoints(network):
+            # Containers are still attached (e.g. a sidecar that failed to stop); do not hand it out again
+            self._remove(network)
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(network)
+                return
+        self._remove(network)
+
+    def fill(self) -> None:
+        """Pre-create idle networks up to `max_idle` (run off the request path)."""
+        while True:
+            with self._lock:
+                if len(self._idle) >= self.max_idle:
+                    return
+            try:
+                network = self._create()
+            except Exception as e:
+                logger.warning(f"Failed to pre-create sandbox network: {e}")
+                return
+            with self._lock:
+                self._idle.append(network)
+
+    def owned_ids(self) -> List[str]:
+        """IDs of networks that are idle or currently leased to a session."""
+        with self._lock:
+            return [network.id for network in self._idle] + list(self._leased)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"idle": len(self._idle), "leased": len(self._leased), "max_idle": self.max_idle, **self._stats}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for network in idle:
+            self._remove(network)
+
+
+def _owner_is_gone(owner: Optional[str]) -> bool:
+    """True if a labelled owner process on this host no longer exists."""
+    if not owner or ":" not in owner:
+        return True
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        # Another host's process; its own janitor is responsible
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except (ValueError, PermissionError):
+        return False
+    return False
+
+
+def _created_at(network) -> float:
+    """Creation time as a Unix timestamp; Docker reports e.g. 2024-01-01T00:00:00.123456789+02:00."""
+    match = _CREATED_RE.match(network.attrs.get("Created", ""))
+    if not match:
+        return 0.0
+    offset = match["offset"] or "Z"
+    tz = timezone.utc if offset == "Z" else datetime.strptime(offset.replace(":", ""), "%z").tzinfo
+    return datetime.strptime(match["time"], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=tz).timestamp()
+
+
+def collect_orphan_networks(client, live_ids: Iterable[str], grace_seconds: float = 60.0) -> int:
+    """
+    Remove sandbox networks that nobody owns anymore: networks of this process
+    that are neither held by a session nor idle in the pool, and networks left
+    behind by dead processes on this host. Networks with attached containers or
+    created within `grace_seconds` are kept. Returns the number removed.
+    """
+    live = set(live_ids)
+    now = time.time()
+    removed = 0
+    for network in client.networks.list(filters={"label": SESSION_LABEL}, greedy=True):
+        if network.id in live or network.attrs.get("Containers"):
+            continue
+        labels = network.attrs.get("Labels") or {}
+        owner = labels.get(OWNER_LABEL)
+        if owner != PROCESS_OWNER and not _owner_is_gone(owner):
+            continue
+        if now - _created_at(network) < grace_seconds:
+            continue
+        try:
+            network.remove()
+            removed += 1
+            logger.info(f"Removed orphaned sandbox network: {network.name}")
+        except Exception as e:
+            logger.debug(f"Failed to remove orphaned network {network.name}: {e}")
+    return removed
+
+
+# Singleton instance
+_network_pool = None
+_network_pool_lock = threading.Lock()
+
+def get_network_pool(client) -> Optional[NetworkPool]:
+    """
+    Get the process-wide network pool, or None if pooling is disabled.
+    SANDBOX_NETWORK_POOL_SIZE sets how many idle networks are kept (0 disables pooling).
+    """
+    global _network_pool
+    max_idle = int(os.getenv("SANDBOX_NETWORK_POOL_SIZE", "2"))
+    if max_idle <= 0:
+        return None
+    with _network_pool_lock:
+        if _network_pool is None:
+            _network_pool = NetworkPool(client, max_idle=max_idle)
+        return _network_pool
+
+
+def get_network_pool_metrics() -> Optional[Dict[str, Any]]:
+    """Metrics of the process-wide pool, or None if it has not been created."""
+    pool = _network_pool
+    return pool.metrics() if pool else None
+
+
+def shutdown_network_pool() -> None:
+    """Remove idle pooled networks, if a pool was created."""
+    global _network_pool
+    with _network_pool_lock:
+        pool, _network_pool = _network_pool, None
+    if pool:
+        pool.shutdown()
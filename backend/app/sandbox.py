@@ -3,17 +3,92 @@ import tarfile
 import io
 import time
 import os
+import json
+import hashlib
 import logging
 import yaml
 import asyncio
+import weakref
+import functools
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, Dict, List, Any, AsyncGenerator
+from typing import Optional, Dict, List, Any, AsyncGenerator, Tuple
 from .sandbox_utils import SandboxManifest, detect_project_type, generate_dynamic_dockerfile
+from .container_pool import get_container_pool, exec_with_stdin, ExecTimeout
+from .network_pool import get_network_pool, create_session_network, collect_orphan_networks
 
 logger = logging.getLogger(__name__)
 
+# Map language to execution command
+LANGUAGE_COMMANDS = {
+    "python": ["/bin/sh", "-c", "python3 -c \"import sys; exec(sys.stdin.read())\""],
+    "javascript": ["/bin/sh", "-c", "node -e \"$(cat)\""],
+    "nodejs": ["/bin/sh", "-c", "node -e \"$(cat)\""],
+    "go": ["/bin/sh", "-c", "cat > main.go && go run main.go"],
+    "go-test": ["/bin/sh", "-c", "cat > main_test.go && go test -v"],
+    # Built in /tmp, which is writable and exec-enabled in pooled and one-off containers alike
+    "rust": ["/bin/sh", "-c", "cat > /tmp/main.rs && rustc /tmp/main.rs -o /tmp/main && /tmp/main"],
+    "cargo-test": ["/bin/sh", "-c", "cargo test"],
+    "npm-test": ["/bin/sh", "-c", "cat > test.js && npm test -- --test-file=test.js"],
+    "bash": ["/bin/bash", "-c", "$(cat)"]
+}
+
+# Languages that can run in a warm pooled container: they read code from stdin or
+# build under /tmp, so the read-only image workdir is enough. Go writes main.go into
+# the workdir (next to the image's go.mod), and project test runners (go-test,
+# cargo-test, npm-test) write into it too, so they use one-off containers.
+POOLABLE_LANGUAGES = {"python", "javascript", "nodejs", "rust", "bash"}
+
+EXECUTION_TIMEOUT = 30
+
+# Sandbox outputs that describe an infrastructure problem rather than the code under test.
+# These are never memoized.
+_UNCACHEABLE_OUTPUT_PREFIXES = ("System Error:", "Error: Execution timed out")
+
+_verification_table_ready = False
+
+# Sandboxes whose sidecars are currently running, so idle sessions can be reaped.
+# Lock order: _ACTIVE_SESSIONS_LOCK before a sandbox's _session_lock.
+_ACTIVE_SESSIONS = weakref.WeakSet()
+_ACTIVE_SESSIONS_LOCK = threading.Lock()
+
+# Sandboxes currently holding a network; anything else labelled as ours is an orphan.
+_NETWORK_HOLDERS = weakref.WeakSet()
+
+# docker-py is synchronous. Every Docker call made from async code goes through this
+# bounded executor so a slow container never blocks the event loop, and the number of
+# concurrent Docker API calls stays capped.
+_DOCKER_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SANDBOX_MAX_WORKERS", "8")),
+    thread_name_prefix="sandbox-docker"
+)
+
+# Cancellation kills the runs that occupy _DOCKER_EXECUTOR, so it must not queue behind them.
+_ABORT_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sandbox-abort")
+
+_END_OF_ITERATION = object()
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking Docker call on the sandbox executor without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_DOCKER_EXECUTOR, functools.partial(func, *args, **kwargs))
+
+
+def _submit_blocking(func, *args, **kwargs) -> None:
+    """Fire-and-forget a blocking call on the sandbox executor."""
+    _DOCKER_EXECUTOR.submit(func, *args, **kwargs)
+
+
+def _submit_abort(func, *args, **kwargs) -> None:
+    """Fire-and-forget a kill on the dedicated abort executor (used while handling cancellation)."""
+    _ABORT_EXECUTOR.submit(func, *args, **kwargs)
+
 class Sandbox:
-    def __init__(self, project_path: str = ".", image: str = "bug-exorcist-sandbox:latest") -> None:
+    def __init__(self, project_path: str = ".", image: str = "bug-exorcist-sandbox:latest", client: Optional[Any] = None) -> None:
+        """`client` is a shared docker-py client; without one a new client is created from the environment."""
         # Resolve and validate project_path immediately to prevent traversal
         try:
             from pathlib import Path
@@ -34,45 +109,81 @@ class Sandbox:
             
         self.use_mock = False
         self.sidecar_containers = []
+        self._sidecar_services = []  # (service config, container) pairs started for this session
+        self._sidecars_started = False
+        self._sidecars_dirty = False
+        self._last_used = time.time()
+        self._active_runs = 0
+        self._session_lock = threading.Lock()
+        self.session_ttl = int(os.getenv("SIDECAR_SESSION_TTL", "600"))
+        # Allocated from the network pool only when sidecars need one, and reference-counted
         self.network = None
-        self.session_id = f"exorcist-{int(time.time())}"
+        self._network_refs = 0
+        self._network_lock = threading.Lock()
+        self._sidecars_hold_network = False
+        self.session_id = f"exorcist-{int(time.time())}-{uuid.uuid4().hex[:8]}"
         self.image = image
+        self._image_ids: Dict[str, str] = {}
         
         # Load manifest from validated path
         manifest_path = os.path.join(self.project_path, ".exorcist.yaml")
         self.manifest = SandboxManifest.from_yaml(manifest_path)
 
+        self.pool = None
         try:
-            self.client = docker.from_env()
+            self.client = client or docker.from_env()
             self.image = image
-            # Create a dedicated network for this session
-            self._create_network()
+            self.pool = get_container_pool(self.client)
         except Exception:
             logger.warning("Docker not found or unreachable. Falling back to Mock Sandbox.")
             self.use_mock = True
 
-    def _create_network(self):
-        """Creates a dedicated bridge network for this sandbox session with restricted internal access."""
-        if self.use_mock: return
+    def _acquire_network(self):
+        """
+        Take a reference on this session's isolated network, allocating it on first use
+        from the network pool (or creating a dedicated one when pooling is disabled).
+        """
+        if self.use_mock:
+            return None
+        with self._network_lock:
+            if self.network is None:
+                try:
+                    pool = get_network_pool(self.client)
+                    self.network = pool.acquire() if pool else create_session_network(self.client, self.session_id)
+                    logger.info(f"Using isolated network: {self.network.name}")
+                except Exception as e:
+                    logger.error(f"Failed to create network: {e}")
+                    return None
+                _NETWORK_HOLDERS.add(self)
+            self._network_refs += 1
+            return self.network
+
+    def _release_network(self):
+        """Drop a reference; the last one returns the network to the pool or removes it."""
+        with self._network_lock:
+            if self.network is None:
+                return
+            self._network_refs -= 1
+            if self._network_refs > 0:
+                return
+            network, self.network = self.network, None
+            self._network_refs = 0
+            _NETWORK_HOLDERS.discard(self)
+        pool = get_network_pool(self.client)
+        if pool:
+            pool.release(network)
+            return
         try:
-            network_name = f"net-{self.session_id}"
-            # Create network with internal=True to isolate from host and internet
-            # Only sidecars and the main execution container will be on this network
-            self.network = self.client.networks.create(
-                network_name, 
-                driver="bridge",
-                internal=True,
-                labels={"com.exorcist.session": self.session_id}
-            )
-            logger.info(f"Created isolated network: {network_name}")
-        except Exception as e:
-            logger.error(f"Failed to create network: {e}")
+            network.remove()
+            logger.info(f"Removed dedicated network: {network.name}")
+        except Exception:
+            pass
 
     async def _wait_for_service_health(self, container, timeout=30):
         """Waits for a container to become healthy if a healthcheck is defined."""
         start_time = time.time()
         while time.time() - start_time < timeout:
-            container.reload()
+            await run_blocking(container.reload)
             health = container.attrs.get('State', {}).get('Health', {}).get('Status')
             if health == 'healthy':
                 return True
@@ -100,7 +211,7 @@ class Sandbox:
         # Check sidecars
         for sidecar in self.sidecar_containers:
             name = sidecar.name.split('-')[1]
-            sidecar.reload()
+            await run_blocking(sidecar.reload)
             diagnostics["services"][name] = {
                 "status": sidecar.status,
                 "health": sidecar.attrs.get('State', {}).get('Health', {}).get('Status', 'unknown')
@@ -134,20 +245,20 @@ print(f"DISK_FREE:{usage.free // (2**20)}MB")
         dockerfile_content = generate_dynamic_dockerfile(self.project_path, self.manifest, self.image)
         
         # Compute a hash for caching
-        import hashlib
         cache_hash = hashlib.sha256(dockerfile_content.encode()).hexdigest()[:12]
         project_id = os.path.basename(os.path.abspath(self.project_path))
         custom_image_tag = f"bug-exorcist-{project_id}:{cache_hash}"
         
         # Check if image already exists in cache
         try:
-            self.client.images.get(custom_image_tag)
+            await run_blocking(self.client.images.get, custom_image_tag)
             logger.info(f"Using cached image: {custom_image_tag}")
             if log_callback:
                 res = log_callback(f"♻️ Using cached environment: {custom_image_tag}")
                 if asyncio.iscoroutine(res):
                     await res
             self.image = custom_image_tag
+            self._warm_pool()
             return custom_image_tag
         except docker.errors.ImageNotFound:
             pass
@@ -162,14 +273,19 @@ print(f"DISK_FREE:{usage.free // (2**20)}MB")
                 if asyncio.iscoroutine(res):
                     await res
                 
-            build_logs = self.client.api.build(
+            build_logs = await run_blocking(
+                self.client.api.build,
                 fileobj=f,
                 tag=custom_image_tag,
                 rm=True,
                 decode=True
             )
             
-            for chunk in build_logs:
+            # Pull each chunk of the streaming build response on the executor
+            while True:
+                chunk = await run_blocking(next, build_logs, _END_OF_ITERATION)
+                if chunk is _END_OF_ITERATION:
+                    break
                 if 'stream' in chunk:
                     log_line = chunk['stream'].strip()
                     if log_line:
@@ -199,18 +315,156 @@ print(f"DISK_FREE:{usage.free // (2**20)}MB")
                     raise Exception(f"Docker build failed: {error_msg}")
 
             self.image = custom_image_tag
+            self._warm_pool()
+            # A fresh build means the environment changed; verifications against older tags are stale
+            await run_blocking(self._invalidate_verifications, custom_image_tag)
             return custom_image_tag
         except Exception as e:
             logger.error(f"Failed to build image: {e}")
             return self.image # Fallback to default image
 
+    def manifest_hash(self) -> str:
+        """Hash of every manifest setting that can change how code behaves in the sandbox."""
+        payload = json.dumps({
+            "env": self.manifest.env,
+            "resources": self.manifest.resources,
+            "setup": self.manifest.setup_scripts,
+            "services": self.manifest.services,
+            "volumes": self.manifest.volumes
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _mounted_inputs_digest(self) -> Optional[str]:
+        """
+        sha256 over the paths and contents of every file in the manifest's host
+        volumes, so edits to mounted files change the verification key. Returns
+        None when the mounts exceed VERIFICATION_CACHE_MAX_MOUNT_BYTES (hashing
+        would cost more than the run). Runs on the sandbox executor.
+        """
+        budget = int(os.getenv("VERIFICATION_CACHE_MAX_MOUNT_BYTES", str(64 * 1024 * 1024)))
+        hasher = hashlib.sha256()
+        for host_path, mount in sorted(self._container_spec()["volumes"].items()):
+            hasher.update(f"{host_path}\x00{mount['bind']}\x00".encode())
+            files = [host_path] if os.path.isfile(host_path) else sorted(
+                os.path.join(root, name) for root, _dirs, names in os.walk(host_path) for name in names
+            )
+            for file_path in files:
+                try:
+                    with open(file_path, "rb") as f:
+                        data = f.read(budget + 1)
+                except OSError:
+                    continue
+                budget -= len(data)
+                if budget < 0:
+                    return None
+                hasher.update(os.path.relpath(file_path, host_path).encode() + b"\x00")
+                hasher.update(hashlib.sha256(data).digest())
+        return hasher.hexdigest()
+
+    async def verification_key(self, code: str, language: str = "python") -> Optional[str]:
+        """
+        Key for memoizing a verification run: sha256(code, language, image digest,
+        manifest hash, project path, digest of mounted files).
+        Returns None when memoization is disabled, no real image is available or
+        the mounted files are too large to digest.
+        """
+        if self.use_mock or os.getenv("ENABLE_VERIFICATION_CACHE", "true").lower() != "true":
+            return None
+        image_id = self._image_ids.get(self.image)
+        if image_id is None:
+            try:
+                image_id = (await run_blocking(self.client.images.get, self.image)).id
+            except Exception as e:
+                logger.debug(f"Cannot resolve image digest for {self.image}: {e}")
+                return None
+            self._image_ids[self.image] = image_id
+        mounts_digest = ""
+        if self.manifest.volumes:
+            mounts_digest = await run_blocking(self._mounted_inputs_digest)
+            if mounts_digest is None:
+                return None
+        payload = json.dumps([code, language.lower(), image_id, self.manifest_hash(), self.project_path, mounts_digest])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _verification_db():
+        """Open an app DB session, creating the verification table if the app has not done so."""
+        global _verification_table_ready
+        from .database import SessionLocal, engine
+        from .models import VerificationResult
+        if not _verification_table_ready:
+            VerificationResult.__table__.create(bind=engine, checkfirst=True)
+            _verification_table_ready = True
+        return SessionLocal()
+
+    def _lookup_verification(self, key: str) -> Optional[str]:
+        from . import crud
+        db = self._verification_db()
+        try:
+            cached = crud.get_verification_result(db, key)
+            return cached.output if cached else None
+        finally:
+            db.close()
+
+    def _store_verification(self, key: str, language: str, output: str) -> None:
+        from . import crud
+        db = self._verification_db()
+        try:
+            crud.save_verification_result(db, key, self.image, language.lower(), output)
+        finally:
+            db.close()
+
+    def _invalidate_verifications(self, image_tag: str) -> None:
+        from . import crud
+        try:
+            db = self._verification_db()
+        except Exception as e:
+            logger.warning(f"Verification cache unavailable: {e}")
+            return
+        try:
+            deleted = crud.invalidate_verification_results(db, image_tag.rsplit(":", 1)[0], image_tag)
+            if deleted:
+                logger.info(f"Invalidated {deleted} memoized verification(s) superseded by {image_tag}")
+        finally:
+            db.close()
+
+    async def get_cached_run(self, key: str) -> Optional[str]:
+        """Output of a previous run with the same verification key, if any."""
+        try:
+            return await run_blocking(self._lookup_verification, key)
+        except Exception as e:
+            logger.warning(f"Verification cache lookup failed: {e}")
+            return None
+
+    async def cache_run(self, key: str, language: str, output: str) -> None:
+        """Memoize the output of a run. Infrastructure failures are not stored."""
+        if output.startswith(_UNCACHEABLE_OUTPUT_PREFIXES):
+            return
+        try:
+            await run_blocking(self._store_verification, key, language, output)
+        except Exception as e:
+            logger.warning(f"Verification cache store failed: {e}")
+
     async def start_sidecars(self):
         """
         Start sidecar containers (e.g., Redis, Postgres) defined in the manifest.
+        Sidecars are session-scoped: once started and health-checked they are reused
+        by every run in this session until cleanup_sidecars() or the idle TTL.
         """
         if self.use_mock or not self.manifest.services:
             return []
 
+        if self._sidecars_started:
+            alive = await run_blocking(self._sidecars_alive)
+            if time.time() - self._last_used <= self.session_ttl and alive:
+                return self.sidecar_containers
+            logger.info(f"Sidecars for session {self.session_id} expired or died. Restarting.")
+            await run_blocking(self.cleanup_sidecars)
+
+        # Sidecars hold a reference on the session network until they are torn down
+        if not self._sidecars_hold_network:
+            self._sidecars_hold_network = await run_blocking(self._acquire_network) is not None
+
         for service in self.manifest.services:
             name = service.get('name')
             image = service.get('image')
@@ -222,16 +476,19 @@ print(f"DISK_FREE:{usage.free // (2**20)}MB")
                 
             try:
                 logger.info(f"Starting sidecar service: {name} ({image})")
-                container = self.client.containers.run(
+                container = await run_blocking(
+                    self.client.containers.run,
                     image,
                     name=f"sidecar-{name}-{self.session_id}",
                     environment=env,
                     detach=True,
                     network=self.network.name if self.network else "none",
                     network_disabled=False if self.network else True,
-                    healthcheck=healthcheck
+                    healthcheck=healthcheck,
+                    labels={"com.exorcist.session": self.session_id}
                 )
                 self.sidecar_containers.append(container)
+                self._sidecar_services.append((service, container))
                 
                 # Wait for service to be ready
                 is_ready = await self._wait_for_service_health(container)
@@ -243,98 +500,182 @@ print(f"DISK_FREE:{usage.free // (2**20)}MB")
             except Exception as e:
                 logger.error(f"Failed to start sidecar {name}: {e}")
 
+        self._sidecars_started = True
+        self._sidecars_dirty = False
+        self._last_used = time.time()
+        with _ACTIVE_SESSIONS_LOCK:
+            _ACTIVE_SESSIONS.add(self)
+        return self.sidecar_containers
+
+    def _sidecars_alive(self) -> bool:
+        for container in self.sidecar_containers:
+            try:
+                container.reload()
+                if container.status != "running":
+                    return False
+            except Exception:
+                return False
+        return True
+
+    async def reset_sidecars(self):
+        """
+        Restore sidecar state between attempts using each service's `reset` hook
+        from .exorcist.yaml. `reset` is either a command executed inside the sidecar
+        (e.g. "redis-cli FLUSHALL") or the literal "restart" to restart the container.
+        Services without a hook are left as they are.
+        """
+        for service, container in self._sidecar_services:
+            reset = service.get('reset')
+            if not reset:
+                continue
+            name = service.get('name')
+            try:
+                if reset == "restart":
+                    await run_blocking(container.restart, timeout=1)
+                    await self._wait_for_service_health(container)
+                else:
+                    result = await run_blocking(container.exec_run, reset)
+                    if result.exit_code != 0:
+                        logger.warning(f"Reset hook for sidecar {name} exited with {result.exit_code}")
+            except Exception as e:
+                logger.error(f"Failed to reset sidecar {name}: {e}")
+        self._sidecars_dirty = False
+
     def cleanup_sidecars(self):
         """
         Stop and remove all sidecar containers and the session network.
+        Called when the agent session ends (or by the idle reaper).
         """
-        for container in self.sidecar_containers:
+        with self._session_lock:
+            detached = self._detach_sidecars_locked()
+        with _ACTIVE_SESSIONS_LOCK:
+            _ACTIVE_SESSIONS.discard(self)
+        self._teardown_sidecars(*detached)
+
+    def _detach_sidecars_locked(self) -> Tuple[List[Any], bool]:
+        """
+        Take ownership of the running sidecars and the network reference they hold,
+        leaving the session ready to start fresh ones. Caller must hold _session_lock.
+        """
+        containers, holds_network = self.sidecar_containers, self._sidecars_hold_network
+        self.sidecar_containers = []
+        self._sidecar_services = []
+        self._sidecars_started = False
+        self._sidecars_dirty = False
+        self._sidecars_hold_network = False
+        return containers, holds_network
+
+    def _teardown_sidecars(self, containers: List[Any], holds_network: bool) -> None:
+        for container in containers:
             try:
                 container.stop(timeout=1)
                 container.remove(force=True)
             except Exception:
                 pass
-        self.sidecar_containers = []
-        
-        if self.network:
-            try:
-                self.network.remove()
-                logger.info(f"Removed dedicated network: {self.network.name}")
-            except Exception:
-                pass
-            self.network = None
+        if holds_network:
+            self._release_network()
 
-    async def run_code(self, code: str, language: str = "python") -> str:
+    async def close(self):
+        """End the sandbox session, tearing down sidecars and the session network."""
+        await run_blocking(self.cleanup_sidecars)
+
+    def _container_spec(self) -> Dict[str, Any]:
+        """Resource limits, environment and volumes shared by every execution container."""
+        # Configure resource limits from manifest or defaults
+        mem_limit = self.manifest.resources.get('memory', "512m")
+        cpu_limit = self.manifest.resources.get('cpu', 0.5)
+
+        # Volume configuration
+        volumes = {}
+        project_root = os.path.abspath(self.project_path)
+        for host_path, container_path in self.manifest.volumes.items():
+            # Ensure paths are absolute for Docker and within project root
+            abs_host_path = os.path.abspath(os.path.join(project_root, host_path))
+            if not abs_host_path.startswith(project_root):
+                logger.warning(f"Security Warning: Blocked volume mount outside project root: {host_path}")
+                continue
+            volumes[abs_host_path] = {'bind': container_path, 'mode': 'rw'}
+
+        return {
+            "mem_limit": mem_limit,
+            "nano_cpus": int(cpu_limit * 1_000_000_000),
+            "environment": self.manifest.env.copy(),
+            "volumes": volumes
+        }
+
+    def _warm_pool(self) -> None:
+        """Pre-start pooled containers for the current image in the background."""
+        if not self.pool:
+            return
+        _submit_blocking(self.pool.warm, self.image, self._container_spec())
+
+    def _run_pooled(self, command: List[str], spec: Dict[str, Any], code: str, handle: Dict[str, Any]) -> Optional[str]:
         """
-        Executes code in a secure Docker sandbox.
+        Execute code in a warm pooled container and hand it back to the pool.
+        Returns None if the pool has no capacity. Runs on the sandbox executor.
         """
-        if self.use_mock:
-            return "Mock execution successful (Docker not available)."
-
-        container = None
+        pooled = self.pool.acquire(self.image, spec)
+        if not pooled:
+            return None
+        handle["pooled"] = pooled
+        if handle.get("aborted"):
+            # Cancelled while acquiring: nothing ran in the container yet
+            self.pool.release(pooled)
+            return "Error: Execution cancelled."
+        healthy = True
         try:
-            # Start sidecars first
-            await self.start_sidecars()
-            
-            # Configure resource limits from manifest or defaults
-            mem_limit = self.manifest.resources.get('memory', "512m")
-            cpu_limit = self.manifest.resources.get('cpu', 0.5)
-            nano_cpus = int(cpu_limit * 1_000_000_000)
-            
-            # Map language to execution command
-            commands = {
-                "python": ["/bin/sh", "-c", "python3 -c \"import sys; exec(sys.stdin.read())\""],
-                "javascript": ["/bin/sh", "-c", "node -e \"$(cat)\""],
-                "nodejs": ["/bin/sh", "-c", "node -e \"$(cat)\""],
-                "go": ["/bin/sh", "-c", "cat > main.go && go run main.go"],
-                "go-test": ["/bin/sh", "-c", "cat > main_test.go && go test -v"],
-                "rust": ["/bin/sh", "-c", "cat > main.rs && rustc main.rs -o main && ./main"],
-                "cargo-test": ["/bin/sh", "-c", "cargo test"],
-                "npm-test": ["/bin/sh", "-c", "cat > test.js && npm test -- --test-file=test.js"],
-                "bash": ["/bin/bash", "-c", "$(cat)"]
-            }
-            
-            command = commands.get(language.lower(), commands["python"])
+            exit_code, logs = exec_with_stdin(
+                self.client, pooled.container, command, code.encode('utf-8'), EXECUTION_TIMEOUT,
+                workdir=pooled.workdir
+            )
+        except ExecTimeout:
+            healthy = False
+            return f"Error: Execution timed out ({EXECUTION_TIMEOUT}s limit)."
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self.pool.release(pooled, healthy=healthy)
 
-            # Set up environment variables
-            env_vars = self.manifest.env.copy()
-            
-            # Volume configuration
-            volumes = {}
-            project_root = os.path.abspath(self.project_path)
-            for host_path, container_path in self.manifest.volumes.items():
-                # Ensure paths are absolute for Docker and within project root
-                abs_host_path = os.path.abspath(os.path.join(project_root, host_path))
-                if not abs_host_path.startswith(project_root):
-                    logger.warning(f"Security Warning: Blocked volume mount outside project root: {host_path}")
-                    continue
-                volumes[abs_host_path] = {'bind': container_path, 'mode': 'rw'}
+        if exit_code != 0:
+            return f"Error (Exit Code {exit_code}):\n{logs}"
+        return logs
 
+    def _run_container(self, command: List[str], spec: Dict[str, Any], code: str, handle: Dict[str, Any]) -> str:
+        """Blocking one-off container execution. Runs on the sandbox executor."""
+        container = None
+        try:
             # Create the container with restrictions
             container = self.client.containers.run(
                 self.image,
                 command=command,
                 stdin_open=True,
                 detach=True,
-                environment=env_vars,
-                volumes=volumes,
+                environment=spec["environment"],
+                volumes=spec["volumes"],
                 # Security restrictions
                 network=self.network.name if self.network else "none",
                 network_disabled=False if self.network else True, # Explicitly disable if no network
-                mem_limit=mem_limit,
-                nano_cpus=nano_cpus,
+                mem_limit=spec["mem_limit"],
+                nano_cpus=spec["nano_cpus"],
                 cap_drop=["ALL"] 
             )
+            handle["container"] = container
+            if handle.get("aborted"):
+                # Cancelled while the container was being created; _abort could not see it
+                container.kill()
+                return "Error: Execution cancelled."
 
             sock = container.attach_socket(params={'stdin': 1, 'stream': 1})
             sock.send(code.encode('utf-8'))
             sock.close() 
 
             try:
-                result = container.wait(timeout=30)
+                result = container.wait(timeout=EXECUTION_TIMEOUT)
                 exit_code = result['StatusCode']
             except Exception:
                 container.kill()
-                return "Error: Execution timed out (30s limit)."
+                return f"Error: Execution timed out ({EXECUTION_TIMEOUT}s limit)."
 
             # Get logs
             logs = container.logs().decode('utf-8')
@@ -343,13 +684,118 @@ print(f"DISK_FREE:{usage.free // (2**20)}MB")
                 return f"Error (Exit Code {exit_code}):\n{logs}"
             
             return logs
-
-        except Exception as e:
-            return f"System Error: {str(e)}"
         finally:
             if container:
                 try:
                     container.remove(force=True)
                 except Exception:
                     pass
-            self.cleanup_sidecars()
+
+    @staticmethod
+    def _abort(handle: Dict[str, Any]) -> None:
+        """
+        Stop whatever a cancelled run_code call left running. A container the
+        executor thread is still creating is killed by that thread once it sees
+        the "aborted" flag.
+        """
+        handle["aborted"] = True
+        container = handle.get("container")
+        if container:
+            _submit_abort(container.kill)
+        pooled = handle.get("pooled")
+        if pooled:
+            # Kill the user process; the executor thread then sees EOF and releases the container
+            _submit_abort(pooled.container.exec_run, ["/bin/sh", "-c", "kill -9 -1"])
+
+    async def run_code(self, code: str, language: str = "python") -> str:
+        """
+        Executes code in a secure Docker sandbox.
+        Uses a warm pooled container when pooling is enabled and the run needs
+        neither sidecars nor the project workdir; otherwise starts a one-off container.
+
+        All Docker I/O runs on a bounded executor, so concurrent sessions verify in
+        parallel. Cancelling the calling task kills the running container.
+        """
+        if self.use_mock:
+            return "Mock execution successful (Docker not available)."
+
+        handle: Dict[str, Any] = {}
+        counted = False
+        try:
+            command = LANGUAGE_COMMANDS.get(language.lower(), LANGUAGE_COMMANDS["python"])
+            spec = self._container_spec()
+
+            if self.pool and not self.manifest.services and language.lower() in POOLABLE_LANGUAGES:
+                result = await run_blocking(self._run_pooled, command, spec, code, handle)
+                if result is not None:
+                    return result
+
+            # Reuse the session's sidecars, restoring their state if a previous run touched them
+            with self._session_lock:
+                self._active_runs += 1
+            counted = True
+            if self._sidecars_started and self._sidecars_dirty:
+                await self.reset_sidecars()
+            await self.start_sidecars()
+            self._sidecars_dirty = bool(self._sidecar_services)
+
+            # Runs without sidecars have nothing to talk to and use no network at all
+            network_ref = self._sidecars_hold_network and await run_blocking(self._acquire_network) is not None
+            try:
+                return await run_blocking(self._run_container, command, spec, code, handle)
+            finally:
+                if network_ref:
+                    self._release_network()
+
+        except asyncio.CancelledError:
+            self._abort(handle)
+            raise
+        except Exception as e:
+            return f"System Error: {str(e)}"
+        finally:
+            if counted:
+                with self._session_lock:
+                    self._active_runs -= 1
+                self._last_used = time.time()
+
+def reap_expired_sessions() -> int:
+    """
+    Tear down sidecars of sandbox sessions that have been idle longer than their TTL.
+    Catches sessions whose owner never called close(). Returns the number reaped.
+    """
+    with _ACTIVE_SESSIONS_LOCK:
+        candidates = list(_ACTIVE_SESSIONS)
+    reaped = 0
+    for sandbox in candidates:
+        # Re-check and claim under both locks, so a run starting (or a close) in the
+        # meantime either keeps the session alive or leaves nothing to tear down
+        with _ACTIVE_SESSIONS_LOCK, sandbox._session_lock:
+            if sandbox not in _ACTIVE_SESSIONS or sandbox._active_runs > 0 \
+                    or time.time() - sandbox._last_used <= sandbox.session_ttl:
+                continue
+            _ACTIVE_SESSIONS.discard(sandbox)
+            detached = sandbox._detach_sidecars_locked()
+        logger.info(f"Reaping idle sidecars for session {sandbox.session_id}")
+        sandbox._teardown_sidecars(*detached)
+        reaped += 1
+    return reaped
+
+
+def reap_orphan_networks(client, grace_seconds: Optional[float] = None) -> int:
+    """
+    Garbage-collect sandbox networks (labelled com.exorcist.session) that are not held by
+    a live session or idle in the network pool, e.g. after a crash or an unclosed session.
+    Also tops the pool back up to its idle size. Returns the number of networks removed.
+    """
+    if client is None:
+        return 0
+    if grace_seconds is None:
+        grace_seconds = float(os.getenv("SANDBOX_NETWORK_GRACE", "60"))
+    pool = get_network_pool(client)
+    live = [sandbox.network.id for sandbox in list(_NETWORK_HOLDERS) if sandbox.network is not None]
+    if pool:
+        live.extend(pool.owned_ids())
+    removed = collect_orphan_networks(client, live, grace_seconds)
+    if pool:
+        pool.fill()
+    return removed
@@ -0,0 +1,148 @@
+"""
+backend/app/usage_buffer.py - Write-behind buffer for session usage
+
+The thought stream reports token usage and referenced files once per attempt
+and stream event. Writing each report immediately costs a SELECT, an INSERT,
+an UPDATE and a commit every time. SessionUsageBuffer keeps the reports in
+memory and writes them in a single transaction every `max_events` reports or
+`max_delay_ms` milliseconds, whichever comes first. `close()` always writes
+what is still pending.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from app import async_crud
+from app.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def attempt_usage(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One usage record per attempt of a retry result, ready for `apply_session_updates`."""
+    records = []
+    for attempt in result.get("all_attempts", []):
+        usage = attempt.get("fix_result", {}).get("usage", {})
+        records.append({
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "estimated_cost": usage.get("estimated_cost", 0.0),
+            "model": usage.get("model"),
+            "attempt": attempt.get("attempt_number")
+        })
+    return records
+
+
+class SessionUsageBuffer:
+    """Coalesces usage and referenced-file updates of one session."""
+
+    def __init__(
+        self,
+        session_id: str,
+        max_events: Optional[int] = None,
+        max_delay_ms: Optional[int] = None,
+        session_factory: Callable[[], Any] = None
+    ):
+        self.session_id = session_id
+        self.max_events = max_events if max_events is not None else int(os.getenv("USAGE_FLUSH_EVENTS", "20"))
+        self.max_delay = (max_delay_ms if max_delay_ms is not None else int(os.getenv("USAGE_FLUSH_INTERVAL_MS", "1000"))) / 1000
+        # Own sessions, so a timed flush never shares an AsyncSession with the request handler
+        self.session_factory = session_factory or AsyncSessionLocal
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._closed = False
+        self._reset()
+        self.stats = {"events": 0, "flushes": 0, "dropped": 0}
+
+    def _reset(self) -> None:
+        self._pending_events = 0
+        self._usage: List[Dict[str, Any]] = []
+        self._files: Set[str] = set()
+
+    @property
+    def pending(self) -> int:
+        return self._pending_events
+
+    async def add(
+        self,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        estimated_cost: float = 0.0,
+        files: Optional[Iterable[str]] = None,
+        model: Optional[str] = None,
+        attempt: Optional[int] = None
+    ) -> None:
+        """Record a usage report; flushes once `max_events` reports are pending."""
+        if prompt_tokens or completion_tokens or estimated_cost:
+            self._usage.append({
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "estimated_cost": estimated_cost,
+                "model": model,
+                "attempt": attempt
+            })
+        if files:
+            self._files.update(files)
+        self._pending_events += 1
+        self.stats["events"] += 1
+
+        if self._pending_events >= self.max_events:
+            await self.flush()
+        elif self._timer is None and not self._closed:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.max_delay)
+            self._timer = None
+            await self.flush()
+        except asyncio.CancelledError:
+            pass
+
+    async def flush(self) -> bool:
+        """
+        Write everything pending in one transaction. Returns False if the write
+        failed (reports stay pending) or the session no longer exists (reports are dropped).
+        """
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+
+        async with self._lock:
+            if not self._pending_events:
+                return True
+            update: Dict[str, Any] = {
+                "usage": self._usage,
+                "files": sorted(self._files)
+            }
+            events = self._pending_events
+            self._reset()
+            try:
+                async with self.session_factory() as db:
+                    ok = await async_crud.apply_session_updates(db, self.session_id, **update)
+            except Exception as e:
+                logger.error(f"Failed to flush usage for session {self.session_id}: {e}")
+                ok = False
+            if ok is None:
+                # The session does not exist, so no retry can succeed
+                logger.warning(f"Dropping {events} buffered usage reports for missing session {self.session_id}")
+                self.stats["dropped"] += events
+                return False
+            if not ok:
+                # Keep the reports for the next flush instead of dropping them
+                self._usage[:0] = update["usage"]
+                self._files.update(update["files"])
+                self._pending_events += events
+                return False
+            self.stats["flushes"] += 1
+            return True
+
+    async def close(self) -> None:
+        """
+        Final flush; call when the session ends or the client disconnects.
+        Shielded, so the write completes even if the handler is being cancelled.
+        """
+        self._closed = True
+        await asyncio.shield(self.flush())
@@ -18,10 +18,15 @@ import asyncio
 from datetime import datetime
 from typing import Dict, Optional, Any, List, AsyncGenerator, Callable, Awaitable
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
 from core.gemini_agent import GeminiFallbackAgent, is_gemini_available
 from core.ollama_provider import get_ollama_llm, is_ollama_available
+from core.llm_cache import get_llm_cache
+from core.provider_registry import get_provider_registry, fingerprint
+from core.traceback_context import collect_traceback_context
+from core.prompt_budget import PromptBuilder
+from core.response_parser import StreamingResponseParser
 
 
 class MockLLM:
@@ -89,7 +94,7 @@ Provide:
 
 Be systematic, thorough, and learn from failures."""
 
-    def __init__(self, bug_id: str, openai_api_key: Optional[str] = None, project_path: str = ".", rag: Optional[Any] = None):
+    def __init__(self, bug_id: str, openai_api_key: Optional[str] = None, project_path: str = ".", rag: Optional[Any] = None, use_cache: bool = True):
         """
         Initialize the Bug Exorcist Agent.
         
@@ -98,9 +103,11 @@ Be systematic, thorough, and learn from failures."""
             openai_api_key: OpenAI API key (uses env var if not provided)
             project_path: Path to the project root
             rag: Injected RAG engine instance
+            use_cache: Consult the LLM response and verification caches (when enabled); False bypasses them
         """
         self.bug_id = bug_id
         self.project_path = project_path
+        self.use_cache = use_cache
         
         # Configuration for agents
         self.primary_agent_type = os.getenv("PRIMARY_AGENT", "gpt-4o").lower()
@@ -114,23 +121,49 @@ Be systematic, thorough, and learn from failures."""
         from core.fallback import get_fallback_handler
         self.fallback_handler = get_fallback_handler()
         
-        # Initialize sandbox
-        from app.sandbox import Sandbox
-        self.sandbox = Sandbox(project_path=project_path)
+        # Sandbox is created on first use; many requests never verify anything
+        self._sandbox = None
         
         # Initialize log queue for async log streaming
         self._temp_log_queue = asyncio.Queue()
 
-        # Use injected RAG or initialize if enabled
+        # Use injected RAG or the shared instance for this project if enabled
         if rag:
             self.rag = rag
         elif os.getenv("ENABLE_RAG", "true").lower() == "true":
-            from core.rag_engine import CodebaseRAG
-            self.rag = CodebaseRAG(project_path=project_path)
+            self.rag = get_provider_registry().get_rag(project_path)
         else:
             self.rag = None
 
+    @property
+    def sandbox(self) -> Any:
+        if self._sandbox is None:
+            self._sandbox = self._create_sandbox()
+        return self._sandbox
+
+    def _create_sandbox(self) -> Any:
+        from app.sandbox import Sandbox
+        return Sandbox(project_path=self.project_path, client=get_provider_registry().docker_client())
+
+    @sandbox.setter
+    def sandbox(self, value: Any) -> None:
+        self._sandbox = value
+
     def _init_provider(self, agent_type: str, api_key: Optional[str] = None) -> Any:
+        """Get a specific AI provider based on type, shared across agents with the same configuration."""
+        config = {
+            "gpt-4o": (api_key or os.getenv("OPENAI_API_KEY"),),
+            "gemini-1.5-pro": (os.getenv("GEMINI_API_KEY"),),
+            "ollama": (os.getenv("OLLAMA_MODEL"), os.getenv("OLLAMA_BASE_URL"))
+        }.get(agent_type, ())
+        # Mock providers are cheap and depend on ALLOW_MOCK_LLM, so they are never shared
+        return get_provider_registry().get_or_create(
+            ("llm", agent_type, fingerprint(*config)),
+            lambda: self._create_provider(agent_type, api_key),
+            cache=lambda provider: not isinstance(provider, MockLLM)
+        )
+
+    def _create_provider(self, agent_type: str, api_key: Optional[str] = None) -> Any:
         """Initialize a specific AI provider based on type."""
         # Check if MockLLM is explicitly enabled via environment flag
         allow_mock = os.getenv("ALLOW_MOCK_LLM", "false").lower() == "true"
@@ -141,11 +174,14 @@ Be systematic, thorough, and learn from failures."""
                 if allow_mock:
                     return MockLLM("mock-gpt-4o")
                 raise ValueError("OPENAI_API_KEY is not configured and ALLOW_MOCK_LLM is false")
+            http_client, http_async_client = get_provider_registry().http_clients()
             return ChatOpenAI(
                 model="gpt-4o",
                 temperature=0.2,
                 api_key=key,
-                max_tokens=2000
+                max_tokens=2000,
+                http_client=http_client,
+                http_async_client=http_async_client
             )
         elif agent_type == "gemini-1.5-pro":
             if is_gemini_available():
@@ -177,11 +213,14 @@ Be systematic, thorough, and learn from failures."""
         on_attempt_start: Optional[Callable[[int, str, bool], Awaitable[None]]] = None,
         on_fix_generated: Optional[Callable[[int, Dict[str, Any]], Awaitable[None]]] = None,
         on_verification_complete: Optional[Callable[[int, Dict[str, Any], bool], Awaitable[None]]] = None,
-        on_attempt_failed: Optional[Callable[[int, str], Awaitable[None]]] = None
+        on_attempt_failed: Optional[Callable[[int, str], Awaitable[None]]] = None,
+        on_stream_event: Optional[Callable[[int, Dict[str, Any]], Awaitable[None]]] = None
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """
         **PRIVATE SHARED HELPER** - Execute retry logic for bug fixing.
         Returns an AsyncGenerator that yields events (if any) and finally yields the result dictionary.
+        With `on_stream_event`, the completion is streamed and the parser's events are
+        forwarded while the model is still writing.
         """
         all_attempts = []
         final_result = None
@@ -219,25 +258,48 @@ Be systematic, thorough, and learn from failures."""
                 event = await on_attempt_start(attempt_num, ai_model, use_secondary)
                 if event: yield event
             
+            early_verification: Dict[str, asyncio.Task] = {}
+            stream_queue: asyncio.Queue = asyncio.Queue()
+
+            async def forward_stream_event(stream_event: Dict[str, Any], attempt_num: int = attempt_num):
+                if stream_event["kind"] == "code_complete" and not early_verification:
+                    # Verification starts as soon as the code fence closes, while the model is still writing
+                    early_verification[stream_event["code"]] = asyncio.create_task(self.verify_fix(
+                        fixed_code=stream_event["code"],
+                        original_error=error_message,
+                        language=language
+                    ))
+                event = await on_stream_event(attempt_num, stream_event)
+                if event:
+                    stream_queue.put_nowait(event)
+
             try:
                 # Perform analysis
-                fix_result = await self.analyze_error(
+                analysis = asyncio.create_task(self.analyze_error(
                     error_message=error_message,
                     code_snippet=code_snippet,
                     file_path=file_path,
                     additional_context=additional_context,
                     previous_attempts=all_attempts,
                     use_secondary=use_secondary,
-                    language=language
-                )
+                    language=language,
+                    stream_callback=forward_stream_event if on_stream_event else None
+                ))
+                try:
+                    async for event in self._drain_events(analysis, stream_queue):
+                        yield event
+                    fix_result = await analysis
+                finally:
+                    analysis.cancel()
                 
                 # Notify: fix generated
                 if on_fix_generated:
                     event = await on_fix_generated(attempt_num, fix_result)
                     if event: yield event
                 
-                # Verify the fix
-                verification = await self.verify_fix(
+                # Verify the fix, reusing the run started while streaming if the code did not change
+                early = early_verification.pop(fix_result['fixed_code'], None)
+                verification = await early if early else await self.verify_fix(
                     fixed_code=fix_result['fixed_code'],
                     original_error=error_message,
                     language=language
@@ -296,37 +358,250 @@ Be systematic, thorough, and learn from failures."""
                 
                 if attempt_num >= max_attempts:
                     break
+            finally:
+                for task in early_verification.values():
+                    task.cancel()
         
         # All attempts exhausted - check for fallback
         if not final_result:
-            if self.fallback_handler.is_enabled():
-                fallback_response = self.fallback_handler.generate_fallback_response(
+            final_result = self._build_failure_result(error_message, code_snippet, all_attempts)
+        
+        yield final_result
+
+    @staticmethod
+    async def _drain_events(task: asyncio.Task, queue: asyncio.Queue) -> AsyncGenerator[Dict[str, Any], None]:
+        """Yield events queued by `task` as they arrive, until the task finishes."""
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({task, getter}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield getter.result()
+                continue
+            getter.cancel()
+            break
+        while not queue.empty():
+            yield queue.get_nowait()
+
+    def _build_failure_result(self, error_message: str, code_snippet: str, all_attempts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the result returned when no attempt produced a verified fix, with fallback guidance if enabled."""
+        last_error = all_attempts[-1].get('new_error') or all_attempts[-1].get('error') if all_attempts else None
+        if self.fallback_handler.is_enabled():
+            fallback_response = self.fallback_handler.generate_fallback_response(
+                error_message=error_message,
+                code_snippet=code_snippet,
+                bug_id=self.bug_id,
+                total_attempts=len(all_attempts),
+                all_attempts=all_attempts
+            )
+            
+            return {
+                "success": False,
+                "final_fix": None,
+                "all_attempts": all_attempts,
+                "total_attempts": len(all_attempts),
+                "message": f"Failed to fix bug after {len(all_attempts)} attempts. Fallback guidance provided.",
+                "last_error": last_error,
+                "fallback_response": fallback_response
+            }
+        return {
+            "success": False,
+            "final_fix": None,
+            "all_attempts": all_attempts,
+            "total_attempts": len(all_attempts),
+            "message": f"Failed to fix bug after {len(all_attempts)} attempts",
+            "last_error": last_error
+        }
+
+    @staticmethod
+    def _get_model_name(provider: Any) -> str:
+        """Best-effort model name of a LangChain chat model for reporting."""
+        if hasattr(provider, "model_name"):
+            return provider.model_name
+        if hasattr(provider, "model"):
+            return provider.model
+        return str(provider)
+
+    async def _execute_race_logic(
+        self,
+        error_message: str,
+        code_snippet: str,
+        file_path: Optional[str] = None,
+        additional_context: Optional[str] = None,
+        max_attempts: int = 3,
+        language: str = "python",
+        max_cost: Optional[float] = None,
+        on_attempt_start: Optional[Callable[[int, str, bool], Awaitable[None]]] = None,
+        on_fix_generated: Optional[Callable[[int, Dict[str, Any]], Awaitable[None]]] = None,
+        on_verification_complete: Optional[Callable[[int, Dict[str, Any], bool], Awaitable[None]]] = None,
+        on_attempt_failed: Optional[Callable[[int, str], Awaitable[None]]] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        **PRIVATE SHARED HELPER** - Race mode counterpart of _execute_retry_logic.
+
+        Requests `max_attempts` candidate fixes concurrently (alternating primary and
+        secondary providers, with rising temperatures once every provider has a
+        candidate), verifies each in its own sandbox run and returns as soon as one
+        passes, cancelling the rest. When the manifest declares services, every
+        candidate verifies in a separate sandbox session so sidecar resets of one
+        run cannot touch another's.
+
+        With `max_cost`, the first candidate is sent alone; its cost (the highest
+        seen so far) is the estimate for each further call, and candidates are only
+        launched while the spend plus the estimate of every call in flight stays
+        within the budget.
+        Yields callback events as they happen and finally yields the result dictionary.
+        """
+        providers = [(p, is_secondary) for p, is_secondary in
+                     ((self.primary_provider, False), (self.secondary_provider, True)) if p is not None]
+        if not providers:
+            raise ValueError("No AI providers are configured. Check your .env file.")
+
+        if not on_attempt_start:
+            await self.sandbox.build_image()
+        # Concurrent runs would share (and reset) one set of sidecars
+        isolate_sandboxes = bool(self.sandbox.manifest.services)
+
+        events: asyncio.Queue = asyncio.Queue()
+        all_attempts: List[Dict[str, Any]] = []
+        awaiting_llm: Dict[int, asyncio.Task] = {}
+        spent = {"cost": 0.0, "ceiling_hit": False, "per_call": None}
+
+        async def emit(callback, *args):
+            if callback:
+                event = await callback(*args)
+                if event:
+                    events.put_nowait(event)
+
+        async def run_candidate(candidate_num: int, provider: Any, use_secondary: bool, temperature: Optional[float]):
+            ai_model = self._get_model_name(provider)
+            await emit(on_attempt_start, candidate_num, ai_model, use_secondary)
+            try:
+                fix_result = await self.analyze_error(
                     error_message=error_message,
                     code_snippet=code_snippet,
-                    bug_id=self.bug_id,
-                    total_attempts=len(all_attempts),
-                    all_attempts=all_attempts
+                    file_path=file_path,
+                    additional_context=additional_context,
+                    use_secondary=use_secondary,
+                    language=language,
+                    temperature=temperature
                 )
-                
-                final_result = {
-                    "success": False,
-                    "final_fix": None,
-                    "all_attempts": all_attempts,
-                    "total_attempts": len(all_attempts),
-                    "message": f"Failed to fix bug after {len(all_attempts)} attempts. Fallback guidance provided.",
-                    "last_error": all_attempts[-1].get('new_error') or all_attempts[-1].get('error') if all_attempts else None,
-                    "fallback_response": fallback_response
-                }
-            else:
-                final_result = {
-                    "success": False,
-                    "final_fix": None,
-                    "all_attempts": all_attempts,
-                    "total_attempts": len(all_attempts),
-                    "message": f"Failed to fix bug after {len(all_attempts)} attempts",
-                    "last_error": all_attempts[-1].get('new_error') or all_attempts[-1].get('error') if all_attempts else None
+            except Exception as e:
+                awaiting_llm.pop(candidate_num, None)
+                record = {
+                    "attempt_number": candidate_num,
+                    "ai_agent": ai_model,
+                    "verification_result": "ERROR",
+                    "error": str(e),
+                    "timestamp": datetime.now().isoformat()
                 }
-        
+                await emit(on_attempt_failed, candidate_num, str(e))
+                return record
+            awaiting_llm.pop(candidate_num, None)
+
+            call_cost = fix_result.get('usage', {}).get('estimated_cost', 0.0) or 0.0
+            spent["cost"] += call_cost
+            spent["per_call"] = max(spent["per_call"] or 0.0, call_cost)
+            # Launches are budgeted, but a call may cost more than estimated
+            if max_cost is not None and spent["cost"] >= max_cost and awaiting_llm:
+                spent["ceiling_hit"] = True
+                for task in awaiting_llm.values():
+                    task.cancel()
+
+            await emit(on_fix_generated, candidate_num, fix_result)
+            sandbox = self._create_sandbox() if isolate_sandboxes else None
+            if sandbox is not None:
+                sandbox.image = self.sandbox.image
+            try:
+                verification = await self.verify_fix(
+                    fixed_code=fix_result['fixed_code'],
+                    original_error=error_message,
+                    language=language,
+                    sandbox=sandbox
+                )
+            finally:
+                if sandbox is not None:
+                    await sandbox.close()
+            record = {
+                "attempt_number": candidate_num,
+                "ai_agent": fix_result.get('ai_agent', ai_model),
+                "fix_result": fix_result,
+                "verification": verification,
+                "fixed_code": fix_result['fixed_code'],
+                "verification_result": "PASSED" if verification['verified'] else "FAILED",
+                "new_error": verification.get('new_error'),
+                "timestamp": datetime.now().isoformat()
+            }
+            await emit(on_verification_complete, candidate_num, verification, verification['verified'])
+            if not verification['verified']:
+                await emit(on_attempt_failed, candidate_num, verification.get('new_error', 'Verification failed'))
+            return record
+
+        launched = 0
+        pending: set = set()
+
+        def within_budget() -> bool:
+            if max_cost is None:
+                return True
+            if spent["per_call"] is None:
+                # No cost observed yet: one call at a time
+                return not awaiting_llm and spent["cost"] < max_cost
+            return spent["cost"] + (len(awaiting_llm) + 1) * spent["per_call"] <= max_cost
+
+        def launch_candidates() -> None:
+            nonlocal launched
+            while launched < max_attempts and within_budget():
+                provider, use_secondary = providers[launched % len(providers)]
+                round_num = launched // len(providers)
+                # First round uses each provider's configured temperature; later rounds diversify
+                temperature = None if round_num == 0 else min(0.2 + 0.3 * round_num, 1.0)
+                launched += 1
+                task = asyncio.create_task(run_candidate(launched, provider, use_secondary, temperature))
+                awaiting_llm[launched] = task
+                pending.add(task)
+            if launched < max_attempts and not awaiting_llm:
+                # Nothing in flight can free budget: the remaining candidates are never sent
+                spent["ceiling_hit"] = True
+
+        winner = None
+        launch_candidates()
+        try:
+            while pending and not winner:
+                done, pending = await asyncio.wait(pending, timeout=0.1, return_when=asyncio.FIRST_COMPLETED)
+                while not events.empty():
+                    yield events.get_nowait()
+                for task in done:
+                    if task.cancelled():
+                        continue
+                    record = task.result()
+                    all_attempts.append(record)
+                    if record["verification_result"] == "PASSED" and not winner:
+                        winner = record
+                if not winner and not spent["ceiling_hit"]:
+                    launch_candidates()
+        finally:
+            # First verified fix wins: cancel everything still generating or verifying
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        while not events.empty():
+            yield events.get_nowait()
+
+        all_attempts.sort(key=lambda a: a["attempt_number"])
+        if winner:
+            final_result = {
+                "success": True,
+                "final_fix": winner["fix_result"],
+                "all_attempts": all_attempts,
+                "total_attempts": len(all_attempts),
+                "message": f"Bug fixed by candidate {winner['attempt_number']} of {max_attempts}",
+                "ai_model": winner["ai_agent"]
+            }
+        else:
+            final_result = self._build_failure_result(error_message, code_snippet, all_attempts)
+        final_result["mode"] = "race"
+        final_result["estimated_cost"] = spent["cost"]
+        final_result["cost_ceiling_hit"] = spent["ceiling_hit"]
         yield final_result
 
     async def analyze_and_fix_with_retry(
@@ -337,7 +612,9 @@ Be systematic, thorough, and learn from failures."""
         additional_context: Optional[str] = None,
         max_attempts: int = 3,
         language: str = "python",
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        race: bool = False,
+        max_cost: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Analyze and fix a bug with automatic retry logic (REST API interface).
@@ -353,6 +630,8 @@ Be systematic, thorough, and learn from failures."""
             max_attempts: Maximum retry attempts (default: 3, max: 5)
             language: The programming language of the code (default: "python")
             session_id: Optional session ID for tracking
+            race: Generate max_attempts candidates concurrently and keep the first verified one
+            max_cost: Per-request cost ceiling (USD) for race mode
             
         Returns:
             Dictionary containing detailed results of all attempts:
@@ -364,16 +643,23 @@ Be systematic, thorough, and learn from failures."""
             - last_error: str (if failed)
         """
         result = None
-        async for event in self._execute_retry_logic(
-            error_message=error_message,
-            code_snippet=code_snippet,
-            file_path=file_path,
-            additional_context=additional_context,
-            max_attempts=min(max_attempts, 5),
-            language=language
-            # No callbacks - REST endpoint doesn't need streaming
-        ):
-            result = event
+        extra = {"max_cost": max_cost} if race else {}
+        retry_logic = self._execute_race_logic if race else self._execute_retry_logic
+        try:
+            async for event in retry_logic(
+                error_message=error_message,
+                code_snippet=code_snippet,
+                file_path=file_path,
+                additional_context=additional_context,
+                max_attempts=min(max_attempts, 5),
+                language=language,
+                **extra
+                # No callbacks - REST endpoint doesn't need streaming
+            ):
+                result = event
+        finally:
+            # The retry session is over: tear down session-scoped sidecars
+            await self.close()
         return result
 
     async def stream_thought_process(
@@ -385,7 +671,9 @@ Be systematic, thorough, and learn from failures."""
         use_retry: bool = True,
         max_attempts: int = 3,
         language: str = "python",
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        race: bool = False,
+        max_cost: Optional[float] = None
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """
         Stream the agent's thought process in real-time (WebSocket interface).
@@ -402,6 +690,8 @@ Be systematic, thorough, and learn from failures."""
             max_attempts: Maximum retry attempts
             language: The programming language
             session_id: Optional session ID for tracking
+            race: Race max_attempts concurrent candidates instead of retrying sequentially
+            max_cost: Per-request cost ceiling (USD) for race mode
             
         Yields:
             Dict containing:
@@ -554,6 +844,28 @@ Be systematic, thorough, and learn from failures."""
                         {"verified": verified, "attempt": attempt_num}
                     )
                 
+                async def on_stream_event(attempt_num: int, stream_event: Dict[str, Any]):
+                    """Called for each incremental parser event while the AI response streams"""
+                    if stream_event["kind"] == "delta":
+                        return emit_thought(
+                            stream_event["text"],
+                            "analysis",
+                            {"attempt": attempt_num, "streaming": True, "section": stream_event["section"]}
+                        )
+                    if stream_event["kind"] == "section" and stream_event["section"]:
+                        return emit_thought(
+                            f"Writing {stream_event['section'].replace('_', ' ')}...",
+                            "analysis",
+                            {"attempt": attempt_num, "streaming": True, "section": stream_event["section"]}
+                        )
+                    if stream_event["kind"] == "code_complete":
+                        return emit_thought(
+                            "Fixed code received, starting verification...",
+                            "verification",
+                            {"attempt": attempt_num, "streaming": True}
+                        )
+                    return None
+
                 async def on_attempt_failed(attempt_num: int, error_msg: str):
                     """Called when an attempt fails"""
                     return emit_thought(
@@ -562,17 +874,21 @@ Be systematic, thorough, and learn from failures."""
                     )
                 
                 # Execute shared retry logic with streaming callbacks
-                async for event in self._execute_retry_logic(
+                extra = {"max_cost": max_cost} if race else {}
+                retry_logic = self._execute_race_logic if race else self._execute_retry_logic
+                async for event in retry_logic(
                     error_message=error_message,
                     code_snippet=code_snippet,
                     file_path=file_path,
                     additional_context=additional_context,
                     max_attempts=max_attempts,
                     language=language,
+                    **extra,
                     on_attempt_start=on_attempt_start,
                     on_fix_generated=on_fix_generated,
                     on_verification_complete=on_verification_complete,
-                    on_attempt_failed=on_attempt_failed
+                    on_attempt_failed=on_attempt_failed,
+                    **({} if race else {"on_stream_event": on_stream_event})
                 ):
                     if isinstance(event, dict) and "success" in event:
                         result = event
@@ -699,6 +1015,9 @@ Be systematic, thorough, and learn from failures."""
                 "stage": "error",
                 "data": {"error": str(e)}
             }
+        finally:
+            # The streaming session is over: tear down session-scoped sidecars
+            await self.close()
 
     async def analyze_error(
         self,
@@ -708,10 +1027,14 @@ Be systematic, thorough, and learn from failures."""
         additional_context: Optional[str] = None,
         previous_attempts: Optional[List[Dict[str, Any]]] = None,
         use_secondary: bool = False,
-        language: str = "python"
+        language: str = "python",
+        temperature: Optional[float] = None,
+        stream_callback: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
         """
         Analyze an error and generate a fix using AI.
+        `temperature` overrides the provider's default sampling temperature (race mode).
+        `stream_callback` receives StreamingResponseParser events while the completion streams.
         """
         # Determine which provider to use
         provider = self.secondary_provider if use_secondary else self.primary_provider
@@ -749,68 +1072,98 @@ Be systematic, thorough, and learn from failures."""
         # Get RAG context for the bug if RAG is enabled
         rag_context = "RAG is disabled."
         referenced_files = []
+
+        # Source windows for stack frames are read straight from disk; semantic search
+        # only covers what the traceback could not point at
+        trace_context = collect_traceback_context(
+            error_message,
+            self.project_path,
+            max_frames=int(os.getenv("TRACEBACK_CONTEXT_MAX_FRAMES", "5")),
+            radius=int(os.getenv("TRACEBACK_CONTEXT_RADIUS", "8"))
+        )
+        trace_windows = trace_context["windows"]
+        referenced_files.extend(trace_context["referenced_files"])
+
         if self.rag:
-            rag_query = f"Fix {error_message} in {file_path if file_path else 'code'}: {code_snippet[:200]}"
-            rag_data = self.rag.get_context_summary(rag_query)
-            rag_context = rag_data["summary"]
-            referenced_files = rag_data["referenced_files"]
+            rag_context = ""
+            if trace_context["unresolved"]:
+                leftovers = ", ".join(
+                    f"{frame.function or 'code'} in {frame.file}" for frame in trace_context["unresolved"]
+                )
+                rag_query = f"Fix {error_message.splitlines()[-1] if error_message.strip() else ''} at {leftovers}"
+            elif not trace_windows:
+                rag_query = f"Fix {error_message} in {file_path if file_path else 'code'}: {code_snippet[:200]}"
+            else:
+                rag_query = None
+            if rag_query:
+                rag_data = self.rag.get_context_summary(rag_query)
+                rag_context = rag_data["summary"]
+                referenced_files.extend(f for f in rag_data["referenced_files"] if f not in referenced_files)
 
-        # Construct the analysis prompt
-        user_prompt = f"""Analyze and fix this bug:
+        if trace_windows:
+            trace_summary = "Source at the stack trace frames (read from disk):\n\n" + "\n\n".join(trace_windows)
+            rag_context = f"{trace_summary}\n\n{rag_context}".rstrip() if self.rag else trace_summary
 
-**Language:** {safe_language}
+        # Get model name for reporting
+        model_name = "unknown"
+        if hasattr(provider, "model_name"):
+            model_name = provider.model_name
+        elif hasattr(provider, "model"):
+            model_name = provider.model
+        elif hasattr(provider, "model_id"):
+            model_name = provider.model_id
 
-**Error Message:**
-```
-{error_message}
-```
+        # Construct the analysis prompt within the token budget
+        prompt_builder = PromptBuilder(
+            model=model_name,
+            budget=int(os.getenv("PROMPT_TOKEN_BUDGET", "16000")),
+            rag_max_tokens=int(os.getenv("PROMPT_RAG_MAX_TOKENS", "4000")),
+            full_attempts=int(os.getenv("PROMPT_FULL_ATTEMPTS", "1"))
+        )
+        user_prompt, prompt_tokens_breakdown = prompt_builder.build(
+            system_prompt=self.SYSTEM_PROMPT,
+            error_message=error_message,
+            code_snippet=code_snippet,
+            language=safe_language,
+            rag_context=rag_context,
+            file_path=file_path,
+            additional_context=additional_context,
+            previous_attempts=previous_attempts
+        )
 
-**Original Code:**
-```{safe_language}
-{code_snippet}
-```
+        # Identical prompts to the same model are answered from the response cache.
+        # The cache is synchronous SQLite, so lookups and writes run off the event loop.
+        cache = await asyncio.to_thread(get_llm_cache) if self.use_cache else None
+        cache_key = None
+        if cache:
+            cache_key = cache.make_key(
+                model=model_name,
+                temperature=temperature,
+                system_prompt=self.SYSTEM_PROMPT,
+                user_prompt=user_prompt
+            )
+            cached = await asyncio.to_thread(cache.get, cache_key)
+            if cached:
+                return {
+                    "ai_agent": model_name,
+                    "provider_mode": "cached",
+                    **cached["result"],
+                    "original_error": error_message,
+                    "timestamp": datetime.now().isoformat(),
+                    "attempt_number": attempt_number,
+                    "usage": {
+                        "prompt_tokens": 0,
+                        "completion_tokens": 0,
+                        "total_tokens": 0,
+                        "estimated_cost": 0.0,
+                        "model": model_name,
+                        "cached": True,
+                        "cached_usage": cached["usage"],
+                        "prompt_breakdown": prompt_tokens_breakdown
+                    },
+                    "referenced_files": referenced_files
+                }
 
-**Project Context (RAG):**
-{rag_context}
-"""
-        
-        if file_path:
-            user_prompt += f"\n**File Path:** `{file_path}`\n"
-        
-        if additional_context:
-            user_prompt += f"\n**Additional Context:**\n{additional_context}\n"
-        
-        # Add retry context if this is not the first attempt
-        if previous_attempts:
-            user_prompt += f"\n**RETRY ATTEMPT #{attempt_number}**\n"
-            user_prompt += f"**Previous attempts have failed. Learn from these mistakes:**\n\n"
-            
-            for i, attempt in enumerate(previous_attempts, 1):
-                user_prompt += f"--- Attempt {i} ---\n"
-                user_prompt += f"**Fix Attempted:**\n```{language}\n{attempt['fixed_code']}\n```\n"
-                user_prompt += f"**Result:** {attempt['verification_result']}\n"
-                if attempt.get('new_error'):
-                    user_prompt += f"**New Error:** {attempt['new_error']}\n"
-                user_prompt += "\n"
-            
-            user_prompt += f"""
-**CRITICAL:** 
-- Analyze why the previous fix(es) failed
-- Do NOT repeat the same approach
-- Generate a MORE ROBUST solution
-- Consider edge cases that were missed
-"""
-        
-        user_prompt += """
-Please provide:
-1. Root Cause Analysis
-2. The complete fixed code
-3. Explanation of your changes
-"""
-        
-        if previous_attempts:
-            user_prompt += "4. What was wrong with the previous attempt(s) and how this fix is different\n"
-        
         try:
             # Call LLM via LangChain
             messages = [
@@ -819,16 +1172,24 @@ Please provide:
             ]
             
             # Using ainvoke for consistency
-            response = await provider.ainvoke(messages)
+            llm = provider.bind(temperature=temperature) if temperature is not None and hasattr(provider, "bind") else provider
+            streaming = stream_callback is not None and hasattr(llm, "astream") \
+                and os.getenv("ENABLE_LLM_STREAMING", "true").lower() == "true"
+            if streaming:
+                response = await self._stream_completion(llm, messages, stream_callback)
+            else:
+                response = await llm.ainvoke(messages)
             ai_response = response.content
             
             # Extract usage metrics if available
-            usage = {}
-            if hasattr(response, "usage_metadata"):
-                usage = response.usage_metadata
+            usage = getattr(response, "usage_metadata", None) or {}
             
             prompt_tokens = usage.get("prompt_tokens", usage.get("input_tokens", 0))
             completion_tokens = usage.get("completion_tokens", usage.get("output_tokens", 0))
+            if streaming and not usage:
+                # Many providers omit usage on streamed responses; fall back to local counts
+                prompt_tokens = prompt_tokens_breakdown["sections"]["total"]
+                completion_tokens = prompt_builder.counter.count(ai_response)
             
             # Calculate estimated cost for GPT-4o if applicable
             estimated_cost = 0
@@ -838,14 +1199,15 @@ Please provide:
             # Parse the AI response
             result = self._parse_ai_response(ai_response, code_snippet)
             
-            # Get model name for reporting
-            model_name = "unknown"
-            if hasattr(provider, "model_name"):
-                model_name = provider.model_name
-            elif hasattr(provider, "model"):
-                model_name = provider.model
-            elif hasattr(provider, "model_id"):
-                model_name = provider.model_id
+            if cache:
+                await asyncio.to_thread(cache.set, cache_key, {
+                    "result": result,
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "estimated_cost": estimated_cost
+                    }
+                })
             
             return {
                 "ai_agent": model_name,
@@ -863,7 +1225,8 @@ Please provide:
                     "completion_tokens": completion_tokens,
                     "total_tokens": prompt_tokens + completion_tokens,
                     "estimated_cost": estimated_cost,
-                    "model": model_name
+                    "model": model_name,
+                    "prompt_breakdown": prompt_tokens_breakdown
                 },
                 "referenced_files": referenced_files
             }
@@ -883,127 +1246,58 @@ Please provide:
                     additional_context=additional_context,
                     previous_attempts=previous_attempts,
                     use_secondary=True,
-                    language=language
+                    language=language,
+                    temperature=temperature,
+                    stream_callback=stream_callback
                 )
             
             # Provide a user-friendly error message without leaking internal details
             raise Exception("AI analysis failed due to an internal provider error. Please check server logs for details.")
 
+    @staticmethod
+    async def _stream_completion(llm: Any, messages: List[Any], callback: Callable[[Dict[str, Any]], Awaitable[None]]) -> Any:
+        """Stream a completion through the incremental parser, forwarding its events. Returns the merged message."""
+        parser = StreamingResponseParser()
+        response = None
+        async for chunk in llm.astream(messages):
+            response = chunk if response is None else response + chunk
+            if isinstance(chunk.content, str):
+                for event in parser.feed(chunk.content):
+                    await callback(event)
+        for event in parser.close():
+            await callback(event)
+        return response if response is not None else AIMessage(content="")
+
     def _parse_ai_response(self, ai_response: str, original_code: str) -> Dict[str, Any]:
         """
         Parse AI's response to extract structured components using a state machine.
         Handles inline content in headers and code fences.
         """
-        lines = ai_response.split('\n')
-        
-        root_cause_lines = []
-        fixed_code_lines = []
-        explanation_lines = []
-        retry_analysis_lines = []
-        
-        # States: None, 'root_cause', 'code', 'explanation', 'retry_analysis'
-        current_state = None
-        
-        for line in lines:
-            stripped_line = line.strip()
-            lower_line = stripped_line.lower()
-            
-            # State transitions
-            if '```' in lower_line:
-                if current_state != 'code':
-                    current_state = 'code'
-                    # Check for inline code after the fence: ```python print("hello")
-                    fence_content = stripped_line.split('```', 1)[1]
-                    # Remove language identifier if present
-                    if fence_content.startswith('python'):
-                        fence_content = fence_content[6:].strip()
-                    else:
-                        # Common case: ```python\ncode...
-                        # If there's content after the language ID on the same line, keep it
-                        parts = fence_content.split(None, 1)
-                        if len(parts) > 1:
-                            fence_content = parts[1].strip()
-                        else:
-                            fence_content = ""
-                    
-                    if fence_content:
-                        fixed_code_lines.append(fence_content)
-                    continue 
-                else:
-                    # Closing fence. Check for inline code before the fence: print("done")```
-                    fence_prefix = stripped_line.split('```', 1)[0].strip()
-                    if fence_prefix:
-                        fixed_code_lines.append(fence_prefix)
-                    current_state = None
-                    continue
-            
-            # Check for section headers with potential inline content
-            header_found = False
-            if 'root cause' in lower_line:
-                current_state = 'root_cause'
-                header_found = True
-                content = stripped_line.split(':', 1)[1].strip() if ':' in stripped_line else ""
-            elif 'explanation' in lower_line or 'changes' in lower_line:
-                current_state = 'explanation'
-                header_found = True
-                content = stripped_line.split(':', 1)[1].strip() if ':' in stripped_line else ""
-            elif 'wrong with' in lower_line or 'previous attempt' in lower_line:
-                current_state = 'retry_analysis'
-                header_found = True
-                content = stripped_line.split(':', 1)[1].strip() if ':' in stripped_line else ""
-            
-            if header_found:
-                if content:
-                    if current_state == 'root_cause':
-                        root_cause_lines.append(content)
-                    elif current_state == 'explanation':
-                        explanation_lines.append(content)
-                    elif current_state == 'retry_analysis':
-                        retry_analysis_lines.append(content)
-                continue
-            
-            # State actions for non-header lines
-            if current_state == 'root_cause':
-                root_cause_lines.append(line)
-            elif current_state == 'code':
-                fixed_code_lines.append(line)
-            elif current_state == 'explanation':
-                explanation_lines.append(line)
-            elif current_state == 'retry_analysis':
-                retry_analysis_lines.append(line)
-        
-        fixed_code = '\n'.join(fixed_code_lines).strip()
-        root_cause = '\n'.join(root_cause_lines).strip()
-        explanation = '\n'.join(explanation_lines).strip()
-        retry_analysis = '\n'.join(retry_analysis_lines).strip()
-        
-        # Fallback: if no code found, use original
-        if not fixed_code:
-            fixed_code = original_code
-        
-        # Estimate confidence based on response quality
-        confidence = 0.85 if fixed_code and root_cause else 0.6
-        
-        return {
-            "root_cause": root_cause or "Analysis completed",
-            "fixed_code": fixed_code,
-            "explanation": explanation or "Code has been fixed",
-            "confidence": confidence,
-            "retry_analysis": retry_analysis
-        }
+        parser = StreamingResponseParser()
+        parser.feed(ai_response)
+        parser.close()
+        return parser.result(original_code)
 
     async def verify_fix(
         self,
         fixed_code: str,
         original_error: Optional[str] = None,
-        language: str = "python"
+        language: str = "python",
+        sandbox: Optional[Any] = None
     ) -> Dict[str, Any]:
-        """Verify the fix in the sandbox."""
+        """Verify the fix in the sandbox (the agent's own unless `sandbox` is given)."""
         # Real verification logic with robust exception handling
         try:
-            # Use the existing sandbox instance
-            sandbox = self.sandbox
-            result = await sandbox.run_code(fixed_code, language)
+            sandbox = sandbox or self.sandbox
+            cache_key = None
+            if self.use_cache:
+                cache_key = await sandbox.verification_key(fixed_code, language)
+            result = await sandbox.get_cached_run(cache_key) if cache_key else None
+            cached = result is not None
+            if not cached:
+                result = await sandbox.run_code(fixed_code, language)
+                if cache_key:
+                    await sandbox.cache_run(cache_key, language, result)
             
             # Check if Mock Sandbox is being used
             if getattr(sandbox, "use_mock", False):
@@ -1048,6 +1342,7 @@ Please provide:
             "verified": verified,
             "output": result,
             "new_error": new_error,
+            "cached": cached,
             "timestamp": datetime.now().isoformat()
         }
 
@@ -1079,6 +1374,15 @@ Please provide:
         ):
             yield event
 
+    async def close(self) -> None:
+        """
+        End the agent session.
+        Sidecars and the sandbox network live for the whole session (all retry
+        attempts and diagnostics) and are torn down here.
+        """
+        if self._sandbox is not None:
+            await self._sandbox.close()
+
     async def stream_logs(self) -> AsyncGenerator[str, None]:
         """
         Stream log messages for WebSocket consumption.
@@ -1118,7 +1422,10 @@ async def quick_fix(error: str, code: str, language: str = "python", api_key: Op
         Fixed code as string
     """
     agent = BugExorcistAgent(bug_id="quick-fix", openai_api_key=api_key)
-    result = await agent.analyze_error(error, code, language=language)
+    try:
+        result = await agent.analyze_error(error, code, language=language)
+    finally:
+        await agent.close()
     return result['fixed_code']
 
 
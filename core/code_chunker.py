@@ -0,0 +1,283 @@
+"""
+core/code_chunker.py - Syntax-aware chunking for the RAG indexer
+
+Splits source files on function/class boundaries instead of fixed character
+windows, so every chunk is a semantically whole unit carrying its symbol name
+and line range. Python is parsed with `ast`; JavaScript/TypeScript, Go and Rust
+use declaration patterns. Other files go through a plain text fallback.
+
+Boilerplate is dropped: license headers, chunks that only contain imports or
+comments, and repeated identical chunks within a file.
+"""
+
+import os
+import re
+import ast
+import hashlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Bump when chunk boundaries change so existing indexes are rebuilt
+CHUNKER_VERSION = 1
+
+LANGUAGE_BY_EXTENSION = {
+    ".py": "python",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript",
+    ".go": "go",
+    ".rs": "rust",
+}
+
+# Top-level declarations that start a new chunk, per language. Group 1 is the symbol name.
+_DECLARATIONS = {
+    "javascript": [
+        (re.compile(r"^(?:export\s+)?(?:default\s+)?(?:async\s+)?function\*?\s+(\w+)"), "function"),
+        (re.compile(r"^(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+(\w+)"), "class"),
+        (re.compile(r"^(?:export\s+)?(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s+)?(?:function|\([^)]*\)\s*=>|\w+\s*=>)"), "function"),
+        (re.compile(r"^(?:export\s+)?(?:interface|type|enum)\s+(\w+)"), "type"),
+    ],
+    "go": [
+        (re.compile(r"^func\s+(?:\([^)]*\)\s*)?(\w+)"), "function"),
+        (re.compile(r"^type\s+(\w+)"), "type"),
+    ],
+    "rust": [
+        (re.compile(r"^(?:pub(?:\([\w:]+\))?\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?(?:extern\s+\"\w+\"\s+)?fn\s+(\w+)"), "function"),
+        (re.compile(r"^(?:pub(?:\([\w:]+\))?\s+)?(?:struct|enum|trait|union)\s+(\w+)"), "type"),
+        (re.compile(r"^(?:unsafe\s+)?impl(?:<[^>]*>)?\s+(?:[\w:<>, ]+\s+for\s+)?([\w:]+)"), "impl"),
+        (re.compile(r"^(?:pub(?:\([\w:]+\))?\s+)?mod\s+(\w+)\s*\{"), "module"),
+    ],
+}
+_DECLARATIONS["typescript"] = _DECLARATIONS["javascript"]
+
+# Lines that belong to the declaration below them (comments, decorators, attributes)
+_LEADING_LINE = re.compile(r"^\s*(?:#|//|/\*|\*|@)")
+# Lines that carry no project-specific meaning on their own
+_BOILERPLATE_LINE = re.compile(
+    r"^\s*(?:$|#|//|/\*|\*|\"\"\"|'''|"
+    r"import\s|from\s+\S+\s+import\s|package\s|use\s|extern\s+crate\s|mod\s+\w+;|"
+    r"(?:const|let|var)\s+\w+\s*=\s*require\(|\)$|\"[\w./-]+\"$|'use strict')"
+)
+
+
+def detect_language(path: str) -> Optional[str]:
+    return LANGUAGE_BY_EXTENSION.get(os.path.splitext(path)[1].lower())
+
+
+class CodeChunker:
+    """
+    Language-dispatching chunker.
+
+    Each chunk is a dict with `content`, `symbol`, `kind`, `start_line` and
+    `end_line` (1-based, inclusive). Adjacent small units are merged up to
+    `max_chars`; units larger than that are split on line boundaries.
+    """
+
+    def __init__(self, max_chars: int = 1500, fallback: Optional[Callable[[str], List[str]]] = None):
+        self.max_chars = max_chars
+        self.fallback = fallback
+
+    def chunk(self, text: str, path: str) -> List[Dict[str, Any]]:
+        lines = text.splitlines(keepends=True)
+        language = detect_language(path)
+
+        units = None
+        if language == "python":
+            units = self._python_units(text, lines)
+        elif language in _DECLARATIONS:
+            units = self._declaration_units(lines, _DECLARATIONS[language])
+
+        if units is None:
+            chunks = self._fallback_chunks(text, lines)
+        else:
+            # Import blocks and license headers are not worth embedding
+            units = [u for u in units if u[3] != "module" or not self._is_boilerplate(lines[u[0] - 1:u[1]])]
+            chunks = self._pack(units, lines)
+        return self._dedupe(chunks)
+
+    # -- boundary detection -------------------------------------------------
+
+    def _python_units(self, text: str, lines: List[str]) -> Optional[List[Tuple[int, int, str, str]]]:
+        """(start, end, symbol, kind) for each top-level statement group, or None on a syntax error."""
+        try:
+            tree = ast.parse(text)
+        except (SyntaxError, ValueError):
+            return None
+
+        units = []
+        for node in tree.body:
+            start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+            end = node.end_lineno or node.lineno
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                units.append((start, end, node.name, "function"))
+            elif isinstance(node, ast.ClassDef):
+                if self._span_chars(lines, start, end) > self.max_chars:
+                    units.extend(self._python_class_units(node, start, end, lines))
+                else:
+                    units.append((start, end, node.name, "class"))
+            else:
+                units.append((start, end, "", "module"))
+        return self._attach_leading_lines(units, lines)
+
+    def _python_class_units(self, node: ast.ClassDef, start: int, end: int, lines: List[str]) -> List[Tuple[int, int, str, str]]:
+        """Split an oversized class into its header and one unit per method."""
+        units = []
+        cursor = start
+        for child in node.body:
+            if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            child_start = min([child.lineno] + [d.lineno for d in child.decorator_list])
+            # Class-level code between methods; blank gaps are absorbed by the previous unit
+            if child_start > cursor and any(line.strip() for line in lines[cursor - 1:child_start - 1]):
+                units.append((cursor, child_start - 1, node.name, "class"))
+            units.append((child_start, child.end_lineno or child.lineno, f"{node.name}.{child.name}", "method"))
+            cursor = (child.end_lineno or child.lineno) + 1
+        if cursor <= end and any(line.strip() for line in lines[cursor - 1:end]):
+            units.append((cursor, end, node.name, "class"))
+        return units
+
+    def _declaration_units(self, lines: List[str], patterns) -> List[Tuple[int, int, str, str]]:
+        """Cut before every top-level declaration matched by the language's patterns."""
+        starts = []
+        for number, line in enumerate(lines, start=1):
+            if line[:1].isspace():
+                continue
+            for pattern, kind in patterns:
+                match = pattern.match(line)
+                if match:
+                    starts.append((number, match.group(1), kind))
+                    break
+
+        units = []
+        if not starts or starts[0][0] > 1:
+            first = starts[0][0] - 1 if starts else len(lines)
+            if first:
+                units.append((1, first, "", "module"))
+        for i, (start, symbol, kind) in enumerate(starts):
+            end = starts[i + 1][0] - 1 if i + 1 < len(starts) else len(lines)
+            units.append((start, end, symbol, kind))
+        return self._attach_leading_lines(units, lines)
+
+    @staticmethod
+    def _attach_leading_lines(units, lines):
+        """
+        Extend units so they cover the whole file, then move comments, decorators
+        and attributes that directly precede a declaration into that declaration.
+        """
+        filled = []
+        for i, (start, end, symbol, kind) in enumerate(units):
+            next_start = units[i + 1][0] if i + 1 < len(units) else len(lines) + 1
+            filled.append([start, max(end, next_start - 1), symbol, kind])
+        if filled and filled[0][0] > 1:
+            filled.insert(0, [1, filled[0][0] - 1, "", "module"])
+
+        for previous, current in zip(filled, filled[1:]):
+            if current[3] == "module":
+                continue
+            while current[0] - 1 > previous[0] and _LEADING_LINE.match(lines[current[0] - 2]):
+                current[0] -= 1
+            previous[1] = current[0] - 1
+        return [tuple(unit) for unit in filled]
+
+    # -- packing ------------------------------------------------------------
+
+    @staticmethod
+    def _span_chars(lines: List[str], start: int, end: int) -> int:
+        return sum(len(line) for line in lines[start - 1:end])
+
+    def _pack(self, units, lines: List[str]) -> List[Dict[str, Any]]:
+        """Merge small adjacent units up to max_chars and split oversized ones on lines."""
+        chunks = []
+        current = None
+        for start, end, symbol, kind in units:
+            size = self._span_chars(lines, start, end)
+            if size > self.max_chars:
+                if current:
+                    chunks.append(current)
+                    current = None
+                chunks.extend(self._split_lines(lines, start, end, symbol, kind))
+                continue
+            if current and current["chars"] + size <= self.max_chars:
+                current["end_line"] = end
+                current["chars"] += size
+                if symbol and symbol not in current["symbols"]:
+                    current["symbols"].append(symbol)
+                if current["kind"] != kind:
+                    current["kind"] = "mixed" if current["kind"] != "module" else kind
+                continue
+            if current:
+                chunks.append(current)
+            current = {"start_line": start, "end_line": end, "chars": size,
+                       "symbols": [symbol] if symbol else [], "kind": kind}
+        if current:
+            chunks.append(current)
+
+        result = []
+        for chunk in chunks:
+            content = "".join(lines[chunk["start_line"] - 1:chunk["end_line"]])
+            if not content.strip():
+                continue
+            result.append({
+                "content": content,
+                "symbol": ", ".join(chunk["symbols"]),
+                "kind": chunk["kind"],
+                "start_line": chunk["start_line"],
+                "end_line": chunk["end_line"]
+            })
+        return result
+
+    def _split_lines(self, lines, start, end, symbol, kind) -> List[Dict[str, Any]]:
+        pieces = []
+        piece_start, size = start, 0
+        for number in range(start, end + 1):
+            length = len(lines[number - 1])
+            if size and size + length > self.max_chars:
+                pieces.append((piece_start, number - 1))
+                piece_start, size = number, 0
+            size += length
+        pieces.append((piece_start, end))
+        return [
+            {"start_line": s, "end_line": e, "chars": 0, "symbols": [symbol] if symbol else [], "kind": kind}
+            for s, e in pieces
+        ]
+
+    def _fallback_chunks(self, text: str, lines: List[str]) -> List[Dict[str, Any]]:
+        """Plain text splitting for unsupported languages, with line ranges recovered from offsets."""
+        if self.fallback is None:
+            return self._pack([(1, len(lines), "", "text")], lines) if lines else []
+
+        chunks = []
+        search_from = 0
+        for piece in self.fallback(text):
+            offset = text.find(piece, search_from)
+            if offset < 0:
+                offset = text.find(piece)
+            start_line = text.count("\n", 0, max(offset, 0)) + 1
+            chunks.append({
+                "content": piece,
+                "symbol": "",
+                "kind": "text",
+                "start_line": start_line,
+                "end_line": start_line + piece.count("\n")
+            })
+            if offset >= 0:
+                search_from = offset + 1
+        return chunks
+
+    # -- boilerplate --------------------------------------------------------
+
+    @staticmethod
+    def _is_boilerplate(lines: List[str]) -> bool:
+        return all(_BOILERPLATE_LINE.match(line) for line in lines)
+
+    def _dedupe(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop comment/import-only text chunks and repeated identical chunks within a file."""
+        kept = []
+        seen = set()
+        for chunk in chunks:
+            if chunk["kind"] == "text" and self._is_boilerplate(chunk["content"].splitlines()):
+                continue
+            digest = hashlib.sha256(" ".join(chunk["content"].split()).encode("utf-8")).hexdigest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            kept.append(chunk)
+        return kept
@@ -0,0 +1,145 @@
+"""
+core/embedding_cache.py - Persistent cache for chunk embeddings
+
+Embeddings are stored in SQLite as float32 blobs keyed by
+(embedding model, sha256(chunk text)). CodebaseRAG wraps its embedding
+provider in CachedEmbeddings so renamed or moved files and forced re-indexes
+reuse vectors that were already computed instead of calling the provider again.
+"""
+
+import os
+import time
+import array
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from core.sqlite_cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache(SQLiteCache):
+    """SQLite-backed embedding store with size-based LRU eviction and hit/miss counters."""
+
+    table = "embeddings"
+
+    def __init__(self, path: str, max_entries: int = 200000):
+        super().__init__(path, max_entries, schema=[
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        ])
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Return the cached vector for each text, or None where it is not cached."""
+        hashes = [self.text_hash(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        now = time.time()
+        with self._lock:
+            unique = list(set(hashes))
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(part))})",
+                    [model, *part]
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = array.array("f", blob).tolist()
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found]
+                )
+                self._conn.commit()
+            result = [found.get(text_hash) for text_hash in hashes]
+            hits = sum(1 for vector in result if vector is not None)
+            self._record_lookups(hits, len(result) - hits)
+        return result
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        """Store vectors for texts and evict the least recently used entries beyond the size cap."""
+        now = time.time()
+        rows = [
+            (model, self.text_hash(text), array.array("f", vector).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_access) VALUES (?, ?, ?, ?)",
+                rows
+            ).rowcount
+            if inserted < len(rows):
+                self._conn.executemany(
+                    "UPDATE embeddings SET vector = ?, last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(vector, accessed, model, text_hash) for model, text_hash, vector, accessed in rows]
+                )
+            self._added_locked(inserted)
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves document vectors from an EmbeddingCache and embeds only the misses."""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model: Optional[str] = None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model or getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None) \
+            or type(embeddings).__name__
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.cache.get_many(self.model, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = self.embeddings.embed_documents([texts[i] for i in missing])
+            self.cache.put_many(self.model, [texts[i] for i in missing], computed)
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+def is_embedding_cache_enabled() -> bool:
+    """Check if the embedding cache is enabled via environment variable."""
+    return os.getenv("ENABLE_EMBEDDING_CACHE", "true").lower() == "true"
+
+
+# Singleton instance
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Get the singleton embedding cache, or None if it is disabled or cannot be opened."""
+    global _embedding_cache
+    if not is_embedding_cache_enabled():
+        return None
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            try:
+                _embedding_cache = EmbeddingCache(
+                    path=os.getenv("EMBEDDING_CACHE_PATH", "./.exorcist_cache/embeddings.db"),
+                    max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+                )
+            except Exception as e:
+                logger.error(f"Failed to open embedding cache: {e}")
+                return None
+        return _embedding_cache
+
+
+def get_embedding_cache_stats() -> Optional[Dict[str, Any]]:
+    """Stats of the process-wide cache, or None if it has not been opened."""
+    cache = _embedding_cache
+    return cache.stats() if cache else None
@@ -0,0 +1,66 @@
+"""
+core/error_signature.py - Normalized error signatures
+
+Two crashes of the same bug rarely produce byte-identical tracebacks: memory
+addresses, line numbers, temp file names, absolute checkout paths, timestamps
+and ids differ between runs and machines. `normalize_error` removes those parts
+so that `error_signature` hashes recurring bugs to the same value.
+"""
+
+import re
+import hashlib
+from typing import Dict, Iterable, List, Tuple
+
+# Order matters: timestamps and ids are replaced before bare numbers are touched
+_RULES: List[Tuple[re.Pattern, str]] = [
+    # 2024-01-31T12:00:00.123Z, 2024-01-31 12:00:00,123
+    (re.compile(r"\d{4}-\d\d-\d\d[T ]\d\d:\d\d:\d\d(?:[.,]\d+)?(?:Z|[+-]\d\d:?\d\d)?"), "<ts>"),
+    (re.compile(r"\b\d\d:\d\d:\d\d(?:[.,]\d+)?\b"), "<ts>"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<uuid>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "0x?"),
+    # Directory part of absolute paths: /home/ci/work/app.py, C:\Users\dev\app.py -> app.py
+    (re.compile(r"(?:[A-Za-z]:)?[\\/](?:[^\s\"'():,\\/]+[\\/])+"), ""),
+    # tempfile names: tmpa1b2c3d4.py
+    (re.compile(r"\btmp[a-z0-9_]{6,}"), "tmp?"),
+    (re.compile(r"\bline \d+"), "line ?"),
+    # file.js:12:5 and file.py:12
+    (re.compile(r"(\.\w+):\d+(?::\d+)?"), r"\1:?"),
+    (re.compile(r"[ \t]+"), " "),
+]
+
+
+def normalize_error(error_message: str) -> str:
+    """Error text with run-specific details replaced by placeholders."""
+    text = error_message or ""
+    for pattern, replacement in _RULES:
+        text = pattern.sub(replacement, text)
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def normalize_code(code_snippet: str) -> str:
+    """Code with line endings and trailing whitespace normalized."""
+    lines = (code_snippet or "").replace("\r\n", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def error_signature(error_message: str, code_snippet: str = "", language: str = "python") -> str:
+    """
+    Stable hex digest identifying a bug. The code is part of the signature
+    because a fix is only reusable for the code it was generated for.
+    """
+    digest = hashlib.sha256()
+    for part in (language.lower(), normalize_error(error_message), normalize_code(code_snippet)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def group_by_signature(bugs: Iterable[Tuple[str, str, str]]) -> Dict[str, List[int]]:
+    """
+    Cluster (error_message, code_snippet, language) tuples by signature.
+    Returns signature -> member indices, in order of first appearance.
+    """
+    clusters: Dict[str, List[int]] = {}
+    for index, (error_message, code_snippet, language) in enumerate(bugs):
+        clusters.setdefault(error_signature(error_message, code_snippet, language), []).append(index)
+    return clusters
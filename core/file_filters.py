@@ -0,0 +1,46 @@
+"""
+core/file_filters.py - Which project files may be read into a prompt
+
+Shared by the RAG index and the stack-trace context reader, so a file that
+is never indexed (secrets, dependencies, binaries) is never read either.
+"""
+
+import re
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Directories to ignore
+IGNORED_DIRS = {'node_modules', '.git', '__pycache__', '.chroma_db', '.exorcist_cache', 'venv', 'env', 'dist', 'build'}
+
+# Extensions for non-text/binary files that should always be skipped
+BINARY_EXTENSIONS = {
+    '.pyc', '.exe', '.dll', '.so', '.dylib', '.bin', '.obj', '.o', '.a', '.lib',
+    '.png', '.jpg', '.jpeg', '.gif', '.ico', '.svg', '.pdf', '.zip', '.tar', '.gz', 
+    '.7z', '.rar', '.woff', '.woff2', '.ttf', '.eot', '.mp4', '.mp3', '.wav'
+}
+
+# Explicit deny list for sensitive files and patterns
+DENY_PATTERNS = [
+    r'.*secret.*', r'.*key.*', r'.*\.pem$', r'.*\.crt$', r'.*\.env.*', 
+    r'.*token.*', r'.*password.*', r'.*credential.*', r'.*\.db$', r'.*\.sqlite$'
+]
+
+
+def is_indexable_path(file_path: Path) -> bool:
+    """
+    False for files in ignored directories, binaries and files matching
+    DENY_PATTERNS. Anything outside the index (e.g. source read for a stack
+    trace) should pass this check before it reaches a prompt.
+    """
+    if any(ignored in str(file_path) for ignored in IGNORED_DIRS):
+        return False
+    # Skip binary/non-text files
+    if file_path.suffix.lower() in BINARY_EXTENSIONS:
+        return False
+    # Check against deny patterns
+    if any(re.match(pattern, file_path.name, re.IGNORECASE) for pattern in DENY_PATTERNS):
+        logger.debug(f"Skipping sensitive file: {file_path}")
+        return False
+    return True
@@ -0,0 +1,123 @@
+"""
+core/lexical_index.py - In-memory BM25 index over RAG chunks
+
+Complements the Chroma vector store with exact term matching so symbols from
+stack traces (function names, exception classes, file paths) are found even
+when embeddings rank them poorly. Identifiers are indexed whole and split into
+their snake_case / camelCase parts.
+"""
+
+import re
+import math
+import heapq
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple, Iterable
+
+_TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased identifier tokens plus their snake_case and camelCase parts."""
+    tokens = []
+    for word in _TOKEN_RE.findall(text):
+        lowered = word.lower()
+        tokens.append(lowered)
+        parts = [p.lower() for piece in word.split("_") for p in _CAMEL_RE.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class LexicalIndex:
+    """Inverted index with BM25 scoring, keyed by chunk ID."""
+
+    COMMON_TERM_RATIO = 0.05
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ready = False
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._total_len = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def add(self, chunk_id: str, text: str, source: str = "") -> None:
+        """Index a chunk. The source path is indexed with the text so file names are searchable."""
+        counts = Counter(tokenize(f"{source}\n{text}"))
+        with self._lock:
+            if chunk_id in self._doc_len:
+                self._remove(chunk_id)
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[chunk_id] = tf
+            self._doc_terms[chunk_id] = tuple(counts)
+            length = sum(counts.values())
+            self._doc_len[chunk_id] = length
+            self._total_len += length
+
+    def remove(self, chunk_ids: Iterable[str]) -> None:
+        with self._lock:
+            for chunk_id in chunk_ids:
+                if chunk_id in self._doc_len:
+                    self._remove(chunk_id)
+
+    def _remove(self, chunk_id: str) -> None:
+        for term in self._doc_terms.pop(chunk_id):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(chunk_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_len.clear()
+            self._total_len = 0
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Return up to `limit` (chunk_id, score) pairs ranked by BM25.
+
+        Terms are scored rarest first. Once rare terms have produced candidates,
+        common terms (in more than COMMON_TERM_RATIO of chunks) only rescore those
+        candidates instead of walking their long posting lists.
+        """
+        scores: Dict[str, float] = {}
+        with self._lock:
+            n_docs = len(self._doc_len)
+            if not n_docs:
+                return []
+            avg_len = self._total_len / n_docs
+            postings_by_term = sorted(
+                (postings for postings in map(self._postings.get, set(tokenize(query))) if postings),
+                key=len
+            )
+            for postings in postings_by_term:
+                df = len(postings)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                if scores and df > self.COMMON_TERM_RATIO * n_docs:
+                    matches = [(chunk_id, postings[chunk_id]) for chunk_id in scores if chunk_id in postings]
+                else:
+                    matches = postings.items()
+                for chunk_id, tf in matches:
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len[chunk_id] / avg_len)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[str]:
+    """Fuse several ranked ID lists: score(d) = sum over lists of 1 / (k + rank)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
@@ -0,0 +1,105 @@
+"""
+core/llm_cache.py - Content-addressed cache for LLM analysis responses
+
+Stores the parsed result of BugExorcistAgent.analyze_error keyed by a hash of
+everything that shapes the completion (model, temperature, system and user
+prompt). Identical bug reports are answered from disk without calling the
+provider. Entries expire after a TTL and the least recently used entries are
+evicted once the cache grows past its size cap.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+from core.sqlite_cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache(SQLiteCache):
+    """SQLite-backed response cache with TTL expiry, LRU eviction and hit/miss counters."""
+
+    table = "llm_cache"
+
+    def __init__(self, path: str, ttl_seconds: int = 86400, max_entries: int = 5000):
+        super().__init__(path, max_entries, schema=[
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        ], ttl_seconds=ttl_seconds)
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """Hash the request parts into a stable cache key."""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value for key, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or self._is_expired(row[1], now):
+                if row is not None:
+                    self._removed_locked(self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,)).rowcount)
+                    self._conn.commit()
+                self._record_lookups(0, 1)
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._record_lookups(1, 0)
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store value under key and evict least recently used entries beyond the size cap."""
+        now = time.time()
+        payload = json.dumps(value, default=str)
+        with self._lock:
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO llm_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            ).rowcount
+            if not inserted:
+                self._conn.execute(
+                    "UPDATE llm_cache SET value = ?, created_at = ?, last_access = ? WHERE key = ?",
+                    (payload, now, now, key)
+                )
+            self._added_locked(inserted)
+            self._conn.commit()
+
+
+def is_llm_cache_enabled() -> bool:
+    """Check if the LLM response cache is enabled via environment variable."""
+    return os.getenv("ENABLE_LLM_CACHE", "false").lower() == "true"
+
+
+# Singleton instance
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Get the singleton response cache, or None if caching is disabled."""
+    global _llm_cache
+    if not is_llm_cache_enabled():
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            try:
+                _llm_cache = LLMResponseCache(
+                    path=os.getenv("LLM_CACHE_PATH", "./.exorcist_cache/llm_cache.db"),
+                    ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400")),
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+                )
+            except Exception as e:
+                logger.error(f"Failed to open LLM response cache: {e}")
+                return None
+        return _llm_cache
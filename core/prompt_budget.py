@@ -0,0 +1,334 @@
+"""
+core/prompt_budget.py - Token-budgeted assembly of the analysis prompt
+
+The analysis prompt is built from sections (error, code, project context,
+retry history, ...). Each section is counted with tiktoken and, when the total
+exceeds the budget, sections are shrunk in priority order:
+
+1. older attempts are summarized to their result and final error line
+2. tracebacks are trimmed to project frames and the exception lines
+3. project context is cut back to whole file windows that fit
+4. the latest attempt is summarized too
+5. the code snippet is cut in the middle
+
+Below the budget the prompt is rendered unchanged. When the tiktoken encoding
+cannot be loaded (offline, unknown model) tokens are estimated from length.
+"""
+
+import re
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.traceback_context import is_external
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken is in backend/requirements.txt
+    tiktoken = None
+
+# Roughly four characters per token for code and English text
+_CHARS_PER_TOKEN = 4
+_TRACE_FILE_LINE = re.compile(r'^\s*File "(?P<file>[^"]+)", line \d+')
+_STACK_AT_LINE = re.compile(r'^\s+at .*?(?P<file>[^\s()]+?):\d+(?::\d+)?\)?\s*$')
+_CONTEXT_BLOCK = re.compile(r"(?=^--- File: )", re.MULTILINE)
+
+_encodings: Dict[str, Any] = {}
+_encodings_lock = threading.Lock()
+
+
+def _get_encoding(model: Optional[str]):
+    """tiktoken encoding for a model, cached per model name; None if unavailable."""
+    key = model or ""
+    with _encodings_lock:
+        if key in _encodings:
+            return _encodings[key]
+        encoding = None
+        if tiktoken is not None:
+            try:
+                encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+            except KeyError:
+                try:
+                    encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    logger.warning(f"tiktoken encoding unavailable, estimating tokens: {e}")
+            except Exception as e:
+                logger.warning(f"tiktoken encoding unavailable, estimating tokens: {e}")
+        _encodings[key] = encoding
+        return encoding
+
+
+class TokenCounter:
+    """Counts and truncates text in model tokens."""
+
+    def __init__(self, model: Optional[str] = None):
+        self.encoding = _get_encoding(model)
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+    def truncate_middle(self, text: str, max_tokens: int) -> str:
+        """Keep the head and tail of `text` within `max_tokens`, marking the cut."""
+        if self.count(text) <= max_tokens:
+            return text
+        lines = text.splitlines()
+        head: List[str] = []
+        tail: List[str] = []
+        used = self.count("... [00000 lines trimmed] ...")
+        i, j = 0, len(lines) - 1
+        # Alternate between both ends; the tail usually holds the failing line or the exception
+        while i <= j:
+            take_tail = len(tail) <= len(head)
+            line = lines[j] if take_tail else lines[i]
+            cost = self.count(line) + 1
+            if used + cost > max_tokens:
+                break
+            used += cost
+            if take_tail:
+                tail.insert(0, line)
+                j -= 1
+            else:
+                head.append(line)
+                i += 1
+        trimmed = j - i + 1
+        return "\n".join(head + [f"... [{trimmed} lines trimmed] ..."] + tail)
+
+
+def trim_traceback(text: str) -> str:
+    """
+    Drop stack frames that belong to runtimes or third-party packages, keeping
+    project frames, headers and the exception lines.
+    """
+    if not text:
+        return text
+    kept: List[str] = []
+    skip_source_line = False
+    dropped = 0
+    for line in text.splitlines():
+        if skip_source_line:
+            skip_source_line = False
+            # Python prints the frame's source line indented below the File line
+            if line.startswith("    ") and not _TRACE_FILE_LINE.match(line):
+                continue
+        match = _TRACE_FILE_LINE.match(line) or _STACK_AT_LINE.match(line)
+        if match and (is_external(match["file"]) or match["file"].startswith("node:")):
+            dropped += 1
+            skip_source_line = bool(_TRACE_FILE_LINE.match(line))
+            continue
+        kept.append(line)
+    if dropped:
+        kept.append(f"[{dropped} library frames omitted]")
+    return "\n".join(kept)
+
+
+def summarize_attempt(number: int, attempt: Dict[str, Any]) -> str:
+    """One-line-per-field summary of a failed attempt."""
+    error = attempt.get("new_error") or attempt.get("error") or ""
+    error_lines = [line for line in str(error).splitlines() if line.strip()]
+    summary = f"--- Attempt {number} (summarized) ---\n**Result:** {attempt.get('verification_result', 'UNKNOWN')}\n"
+    if error_lines:
+        summary += f"**Final Error:** {error_lines[-1].strip()}\n"
+    return summary + "\n"
+
+
+def render_attempt(number: int, attempt: Dict[str, Any], language: str) -> str:
+    text = f"--- Attempt {number} ---\n"
+    if attempt.get("fixed_code"):
+        text += f"**Fix Attempted:**\n```{language}\n{attempt['fixed_code']}\n```\n"
+    text += f"**Result:** {attempt.get('verification_result', 'UNKNOWN')}\n"
+    if attempt.get("new_error"):
+        text += f"**New Error:** {attempt['new_error']}\n"
+    elif attempt.get("error"):
+        text += f"**Error:** {attempt['error']}\n"
+    return text + "\n"
+
+
+def cap_context(context: str, max_tokens: int, counter: TokenCounter) -> str:
+    """Keep leading `--- File:` blocks of a context summary that fit in `max_tokens`."""
+    if counter.count(context) <= max_tokens:
+        return context
+    blocks = [block for block in _CONTEXT_BLOCK.split(context) if block]
+    kept: List[str] = []
+    used = 0
+    for block in blocks:
+        cost = counter.count(block)
+        if used + cost > max_tokens:
+            break
+        kept.append(block)
+        used += cost
+    omitted = len(blocks) - len(kept)
+    if not kept and max_tokens > 0:
+        # A single oversized block is cut instead of dropped entirely
+        return counter.truncate_middle(blocks[0], max_tokens)
+    note = f"[{omitted} context block(s) omitted to fit the token budget]" if omitted else ""
+    return ("".join(kept).rstrip() + ("\n\n" + note if note else "")).strip()
+
+
+class PromptBuilder:
+    """
+    Builds the user prompt for `analyze_error` within a token budget.
+
+    `budget` covers the system prompt and the user prompt. `rag_max_tokens`
+    caps the project context regardless of the budget; `full_attempts` is the
+    number of most recent attempts kept verbatim once summarizing kicks in.
+    """
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        budget: int = 16000,
+        rag_max_tokens: int = 4000,
+        full_attempts: int = 1
+    ):
+        self.counter = TokenCounter(model)
+        self.budget = budget
+        self.rag_max_tokens = rag_max_tokens
+        self.full_attempts = full_attempts
+
+    def build(
+        self,
+        system_prompt: str,
+        error_message: str,
+        code_snippet: str,
+        language: str,
+        rag_context: str,
+        file_path: Optional[str] = None,
+        additional_context: Optional[str] = None,
+        previous_attempts: Optional[List[Dict[str, Any]]] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Return (user_prompt, token breakdown)."""
+        attempts = list(previous_attempts or [])
+        state = {
+            "error": error_message,
+            "code": code_snippet,
+            "context": rag_context,
+            "attempts": attempts,
+            "summarized": 0,
+            "new_errors": None
+        }
+        steps: List[str] = []
+
+        capped = cap_context(rag_context, self.rag_max_tokens, self.counter)
+        if capped != rag_context:
+            state["context"] = capped
+            steps.append("context_capped")
+
+        system_tokens = self.counter.count(system_prompt)
+
+        def render() -> Dict[str, str]:
+            return self._render_sections(state, language, file_path, additional_context)
+
+        def total(sections: Dict[str, str]) -> int:
+            return system_tokens + sum(self.counter.count(text) for text in sections.values())
+
+        sections = render()
+        if total(sections) > self.budget and len(attempts) > self.full_attempts:
+            state["summarized"] = len(attempts) - self.full_attempts
+            steps.append("older_attempts_summarized")
+            sections = render()
+
+        if total(sections) > self.budget:
+            trimmed_error = trim_traceback(error_message)
+            trimmed_error = self.counter.truncate_middle(trimmed_error, max(self.budget // 8, 64))
+            new_errors = [trim_traceback(a.get("new_error") or "") for a in attempts]
+            if trimmed_error != error_message or any(n != (a.get("new_error") or "") for n, a in zip(new_errors, attempts)):
+                state["error"] = trimmed_error
+                state["new_errors"] = new_errors
+                steps.append("tracebacks_trimmed")
+                sections = render()
+
+        if total(sections) > self.budget and state["context"]:
+            available = self.budget - (total(sections) - self.counter.count(sections["context"]))
+            state["context"] = cap_context(state["context"], max(available - 16, 0), self.counter)
+            steps.append("context_reduced")
+            sections = render()
+
+        if total(sections) > self.budget and state["summarized"] < len(attempts):
+            state["summarized"] = len(attempts)
+            steps.append("all_attempts_summarized")
+            sections = render()
+
+        if total(sections) > self.budget:
+            available = self.budget - (total(sections) - self.counter.count(state["code"]))
+            state["code"] = self.counter.truncate_middle(code_snippet, max(available, 64))
+            steps.append("code_truncated")
+            sections = render()
+
+        user_prompt = "".join(sections.values())
+        breakdown = {name: self.counter.count(text) for name, text in sections.items() if text}
+        breakdown["system"] = system_tokens
+        breakdown["total"] = system_tokens + self.counter.count(user_prompt)
+        return user_prompt, {
+            "sections": breakdown,
+            "budget": self.budget,
+            "truncation": steps,
+            "exact": self.counter.exact
+        }
+
+    @staticmethod
+    def _render_sections(state, language, file_path, additional_context) -> Dict[str, str]:
+        attempts = state["attempts"]
+        sections = {
+            "error": f"""Analyze and fix this bug:
+
+**Language:** {language}
+
+**Error Message:**
+```
+{state["error"]}
+```
+
+""",
+            "code": f"""**Original Code:**
+```{language}
+{state["code"]}
+```
+
+""",
+            "context": f"""**Project Context (RAG):**
+{state["context"]}
+""",
+            "file_path": f"\n**File Path:** `{file_path}`\n" if file_path else "",
+            "additional_context": f"\n**Additional Context:**\n{additional_context}\n" if additional_context else "",
+            "attempts": ""
+        }
+
+        if attempts:
+            history = f"\n**RETRY ATTEMPT #{len(attempts) + 1}**\n"
+            history += f"**Previous attempts have failed. Learn from these mistakes:**\n\n"
+            for i, attempt in enumerate(attempts, 1):
+                if state["new_errors"] is not None and attempt.get("new_error"):
+                    attempt = {**attempt, "new_error": state["new_errors"][i - 1]}
+                if i <= state["summarized"]:
+                    history += summarize_attempt(i, attempt)
+                else:
+                    history += render_attempt(i, attempt, language)
+            history += f"""
+**CRITICAL:**
+- Analyze why the previous fix(es) failed
+- Do NOT repeat the same approach
+- Generate a MORE ROBUST solution
+- Consider edge cases that were missed
+"""
+            sections["attempts"] = history
+
+        instructions = """
+Please provide:
+1. Root Cause Analysis
+2. The complete fixed code
+3. Explanation of your changes
+"""
+        if attempts:
+            instructions += "4. What was wrong with the previous attempt(s) and how this fix is different\n"
+        sections["instructions"] = instructions
+        return sections
@@ -0,0 +1,205 @@
+"""
+core/provider_registry.py - Application-scoped LLM, Docker and RAG clients
+
+BugExorcistAgent is constructed per request. Building chat model clients,
+a Docker client and a Chroma-backed CodebaseRAG each time costs hundreds of
+milliseconds and throws away warm HTTP connections. The registry creates
+each of them lazily on first use and hands the same instance to every later
+agent. OpenAI clients share one keep-alive HTTP connection pool.
+
+Keys include request-supplied API keys and project paths, so the instance
+cache is an LRU bounded by PROVIDER_REGISTRY_MAX_INSTANCES; evicted instances
+are closed.
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(*parts: Optional[str]) -> str:
+    """Stable cache key for configuration values such as API keys, without keeping them readable."""
+    return hashlib.sha256("\x00".join(part or "" for part in parts).encode("utf-8")).hexdigest()[:16]
+
+
+class ProviderRegistry:
+    """Lazily created, process-wide clients keyed by their configuration."""
+
+    def __init__(self, max_instances: Optional[int] = None):
+        self.max_instances = max_instances or int(os.getenv("PROVIDER_REGISTRY_MAX_INSTANCES", "32"))
+        self._instances: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._closers: Dict[Hashable, Callable[[Any], None]] = {}
+        self._pinned: Set[Hashable] = set()
+        # Instances being built, so concurrent lookups of one key wait for a single factory call
+        self._building: Dict[Hashable, Future] = {}
+        self._lock = threading.RLock()
+        self._http_clients: Optional[Tuple[Any, Any]] = None
+        self._docker_client = None
+        self._docker_retry_at = 0.0
+
+    def get_or_create(
+        self,
+        key: Hashable,
+        factory: Callable[[], Any],
+        cache: Callable[[Any], bool] = lambda _: True,
+        close: Optional[Callable[[Any], None]] = None,
+        pin: bool = False
+    ) -> Any:
+        """
+        Return the instance registered under `key`, creating it with `factory` on first use.
+        Instances for which `cache(instance)` is False are returned but not kept.
+
+        `factory` runs outside the registry lock; other lookups of the same key
+        wait for it, lookups of other keys do not. When the cache is full the least
+        recently used unpinned instance is dropped and passed to its `close`.
+        """
+        with self._lock:
+            if key in self._instances:
+                self._instances.move_to_end(key)
+                if pin:
+                    self._pinned.add(key)
+                return self._instances[key]
+            future = self._building.get(key)
+            owner = future is None
+            if owner:
+                future = self._building[key] = Future()
+
+        if not owner:
+            instance, cached = future.result()
+            # Uncached instances are never shared, not even with concurrent callers
+            return instance if cached else self.get_or_create(key, factory, cache, close, pin)
+
+        try:
+            instance = factory()
+        except BaseException as e:
+            with self._lock:
+                del self._building[key]
+            future.set_exception(e)
+            raise
+
+        evicted: List[Tuple[Any, Optional[Callable[[Any], None]]]] = []
+        cached = cache(instance)
+        with self._lock:
+            del self._building[key]
+            if cached:
+                self._instances[key] = instance
+                if close:
+                    self._closers[key] = close
+                if pin:
+                    self._pinned.add(key)
+                evicted = self._evict_locked()
+        future.set_result((instance, cached))
+        for old, closer in evicted:
+            self._close_instance(old, closer)
+        return instance
+
+    def _evict_locked(self) -> List[Tuple[Any, Optional[Callable[[Any], None]]]]:
+        evicted = []
+        for key in list(self._instances):
+            if len(self._instances) <= self.max_instances:
+                break
+            if key in self._pinned:
+                continue
+            evicted.append((self._instances.pop(key), self._closers.pop(key, None)))
+            logger.info(f"Provider registry evicted {key[0] if isinstance(key, tuple) else key} instance")
+        return evicted
+
+    @staticmethod
+    def _close_instance(instance: Any, closer: Optional[Callable[[Any], None]]) -> None:
+        if closer is None:
+            return
+        try:
+            closer(instance)
+        except Exception as e:
+            logger.debug(f"Error closing evicted instance: {e}")
+
+    def http_clients(self) -> Tuple[Any, Any]:
+        """(sync, async) httpx clients with a bounded keep-alive pool, shared by all OpenAI models."""
+        with self._lock:
+            if self._http_clients is None:
+                import httpx
+                limits = httpx.Limits(
+                    max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20")),
+                    max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "10")),
+                    keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+                )
+                timeout = httpx.Timeout(float(os.getenv("LLM_HTTP_TIMEOUT", "120")), connect=10.0)
+                self._http_clients = (
+                    httpx.Client(limits=limits, timeout=timeout),
+                    httpx.AsyncClient(limits=limits, timeout=timeout)
+                )
+            return self._http_clients
+
+    def docker_client(self) -> Optional[Any]:
+        """
+        Shared docker-py client, or None while Docker is unreachable.
+        Failed connections are retried at most every DOCKER_RETRY_INTERVAL seconds.
+        """
+        with self._lock:
+            if self._docker_client is None and time.time() >= self._docker_retry_at:
+                try:
+                    import docker
+                    self._docker_client = docker.from_env()
+                except Exception as e:
+                    logger.warning(f"Docker client unavailable: {e}")
+                    self._docker_retry_at = time.time() + float(os.getenv("DOCKER_RETRY_INTERVAL", "30"))
+            return self._docker_client
+
+    def get_rag(self, project_path: str, pin: bool = False) -> Any:
+        """Shared CodebaseRAG for a project directory. Pinned instances are never evicted."""
+        from core.rag_engine import CodebaseRAG
+        key = ("rag", os.path.realpath(project_path))
+        return self.get_or_create(key, lambda: CodebaseRAG(project_path=project_path), close=CodebaseRAG.close, pin=pin)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            kinds: Dict[str, int] = {}
+            for key in self._instances:
+                kind = key[0] if isinstance(key, tuple) else str(key)
+                kinds[kind] = kinds.get(kind, 0) + 1
+            return {
+                "instances": kinds,
+                "max_instances": self.max_instances,
+                "http_pool": self._http_clients is not None,
+                "docker": self._docker_client is not None
+            }
+
+    async def aclose(self) -> None:
+        """Close pooled connections (application shutdown)."""
+        with self._lock:
+            clients, self._http_clients = self._http_clients, None
+            docker_client, self._docker_client = self._docker_client, None
+            instances = [(instance, self._closers.get(key)) for key, instance in self._instances.items()]
+            self._instances.clear()
+            self._closers.clear()
+            self._pinned.clear()
+        for instance, closer in instances:
+            self._close_instance(instance, closer)
+        if clients:
+            clients[0].close()
+            await clients[1].aclose()
+        if docker_client:
+            try:
+                docker_client.close()
+            except Exception as e:
+                logger.debug(f"Error closing Docker client: {e}")
+
+
+# Singleton instance
+_provider_registry = None
+_provider_registry_lock = threading.Lock()
+
+def get_provider_registry() -> ProviderRegistry:
+    """Get the process-wide provider registry."""
+    global _provider_registry
+    with _provider_registry_lock:
+        if _provider_registry is None:
+            _provider_registry = ProviderRegistry()
+        return _provider_registry
@@ -3,18 +3,70 @@ import logging
 import asyncio
 import hashlib
 import json
+import time
+import functools
 import threading
-from typing import List, Dict, Any, Optional
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Callable, Tuple, Set
 from pathlib import Path
 from datetime import datetime
 
 from langchain_community.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from core.embedding_cache import CachedEmbeddings, get_embedding_cache
+from core.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from core.code_chunker import CodeChunker, CHUNKER_VERSION, detect_language
+from core.file_filters import IGNORED_DIRS, BINARY_EXTENSIONS, is_indexable_path
 
 logger = logging.getLogger(__name__)
 
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _bounded_map(executor: ThreadPoolExecutor, func: Callable, items: Iterable, window: int) -> Iterator[Any]:
+    """Like executor.map, but keeps at most `window` tasks outstanding so results never pile up in memory."""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class _LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Any, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
 class CodebaseRAG:
     """
     Retrieval-Augmented Generation (RAG) system for codebase awareness.
@@ -23,6 +75,7 @@ class CodebaseRAG:
     def __init__(self, project_path: str, persist_directory: str = "./.chroma_db"):
         self.project_path = Path(project_path).resolve()
         self.persist_directory = persist_directory
+        self._persist_path = Path(persist_directory).resolve()
         
         # Configure embeddings
         embedding_provider = os.getenv("RAG_EMBEDDING_PROVIDER", "openai").lower()
@@ -38,16 +91,46 @@ class CodebaseRAG:
             self.embeddings = OpenAIEmbeddings()
             logger.info("Using OpenAI embeddings (remote)")
 
+        # Serve previously computed chunk vectors from the local embedding cache
+        embedding_cache = get_embedding_cache()
+        if embedding_cache:
+            self.embeddings = CachedEmbeddings(self.embeddings, embedding_cache)
+
+        # Plain text splitting for files the syntax-aware chunker has no grammar for
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
-            chunk_overlap=100,
-            add_start_index=True,
-            language="python" # Default, can be improved per file type
+            chunk_overlap=100
+        )
+        self.chunker = CodeChunker(
+            max_chars=int(os.getenv("RAG_CHUNK_MAX_CHARS", "1500")),
+            fallback=self.text_splitter.split_text
         )
         self.vector_store = None
         self.hash_file = Path(self.persist_directory) / "file_hashes.json"
+        self.version_file = Path(self.persist_directory) / "chunker_version"
         self.indexing_task = None
         self._lock = threading.Lock()
+        # (mtime_ns, size) of each file when it was last hashed; lets rescans skip unchanged files
+        self._file_stats: Dict[str, Tuple[int, int]] = {}
+
+        # Indexing pipeline limits
+        self.read_workers = int(os.getenv("RAG_READ_WORKERS", "8"))
+        self.embed_batch_size = int(os.getenv("RAG_EMBED_BATCH_SIZE", "64"))
+        self.embed_concurrency = int(os.getenv("RAG_EMBED_CONCURRENCY", "4"))
+        self.embed_max_retries = int(os.getenv("RAG_EMBED_MAX_RETRIES", "3"))
+        self.embed_retry_backoff = float(os.getenv("RAG_EMBED_RETRY_BACKOFF", "1.0"))
+
+        # BM25 index kept in sync with the vector store, fused with vector results at query time
+        self.hybrid_search = os.getenv("RAG_HYBRID_SEARCH", "true").lower() == "true"
+        self.rrf_k = int(os.getenv("RAG_RRF_K", "60"))
+        self.lexical = LexicalIndex()
+
+        # Retries and duplicate bugs repeat the same query. Query vectors only depend on the
+        # embedding model; results are keyed by index generation, which every index change bumps.
+        self.index_generation = 0
+        query_cache_size = int(os.getenv("RAG_QUERY_CACHE_SIZE", "256"))
+        self._query_embeddings = _LRUCache(query_cache_size)
+        self._search_results = _LRUCache(query_cache_size)
         self._initialize_db()
 
     def _initialize_db(self):
@@ -76,8 +159,8 @@ class CodebaseRAG:
         """Calculate SHA256 hash of file content."""
         hasher = hashlib.sha256()
         with open(file_path, 'rb') as f:
-            buf = f.read()
-            hasher.update(buf)
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                hasher.update(block)
         return hasher.hexdigest()
 
     def _load_hashes(self) -> Dict[str, str]:
@@ -90,6 +173,13 @@ class CodebaseRAG:
                 return {}
         return {}
 
+    def _index_version(self) -> Optional[int]:
+        """Chunker version the stored chunks were produced with."""
+        try:
+            return int(self.version_file.read_text().strip())
+        except (OSError, ValueError):
+            return None
+
     def _save_hashes(self, hashes: Dict[str, str]):
         """Save file hashes to disk."""
         try:
@@ -99,7 +189,15 @@ class CodebaseRAG:
             logger.error(f"Failed to save file hashes: {e}")
 
     def start_background_indexing(self, interval_seconds: int = 3600):
-        """Start a background task to periodically index the project."""
+        """
+        Start a background task that keeps the index fresh.
+
+        RAG_WATCH_MODE selects the change feed:
+        - "auto" (default): filesystem events via watchfiles, or polling if it is not installed
+        - "poll": compare (mtime, size) snapshots every RAG_POLL_INTERVAL seconds
+        - "interval": legacy full rescan every `interval_seconds`
+        Events are debounced for RAG_WATCH_DEBOUNCE_MS and only touched paths are re-indexed.
+        """
         if self.indexing_task and not self.indexing_task.done():
             logger.info("Background indexing task already running.")
             return
@@ -123,144 +221,494 @@ class CodebaseRAG:
                     logger.info("Background indexing task cancelled during sleep.")
                     break
 
-        self.indexing_task = asyncio.create_task(_indexer_loop())
-        logger.info(f"Background indexing started with interval {interval_seconds}s")
+        mode = os.getenv("RAG_WATCH_MODE", "auto").lower()
+        if mode == "interval":
+            self.indexing_task = asyncio.create_task(_indexer_loop())
+            logger.info(f"Background indexing started with interval {interval_seconds}s")
+        else:
+            self.indexing_task = asyncio.create_task(self._watch_loop(mode))
+
+    def close(self) -> None:
+        """Stop background indexing and drop the vector store handle (registry eviction, shutdown)."""
+        task, self.indexing_task = self.indexing_task, None
+        if task and not task.done():
+            # May be called from a worker thread; cancel on the task's own loop
+            task.get_loop().call_soon_threadsafe(task.cancel)
+        # Not under self._lock, which an in-flight index run may hold for a long time
+        self.vector_store = None
+        self._query_embeddings.clear()
+        self._search_results.clear()
+
+    async def _watch_loop(self, mode: str):
+        """Reconcile once, then re-index paths reported by the change feed."""
+        debounce_ms = int(os.getenv("RAG_WATCH_DEBOUNCE_MS", "1000"))
+        watchfiles = None
+        if mode != "poll":
+            try:
+                import watchfiles
+            except ImportError:
+                logger.info("watchfiles not installed; falling back to polling for RAG updates")
+
+        try:
+            if watchfiles:
+                logger.info(f"Watching {self.project_path} for changes (debounce {debounce_ms}ms)")
+                await asyncio.to_thread(self.index_project, force=False)
+                async for changes in watchfiles.awatch(
+                    self.project_path,
+                    debounce=debounce_ms,
+                    watch_filter=lambda change, path: self._is_watched(Path(path))
+                ):
+                    await self._index_changed_paths(path for _, path in changes)
+            else:
+                await self._poll_loop(float(os.getenv("RAG_POLL_INTERVAL", "2")), debounce_ms / 1000)
+        except asyncio.CancelledError:
+            logger.info("Background indexing task cancelled.")
+
+    async def _poll_loop(self, poll_interval: float, debounce: float):
+        """Polling change feed: diff (mtime, size) snapshots and index paths once they settle."""
+        logger.info(f"Polling {self.project_path} for changes every {poll_interval}s")
+        previous = await asyncio.to_thread(self._snapshot)
+        await asyncio.to_thread(self.index_project, force=False)
+        pending: Set[str] = set()
+        last_change = 0.0
+        while True:
+            await asyncio.sleep(poll_interval)
+            try:
+                current = await asyncio.to_thread(self._snapshot)
+            except Exception as e:
+                logger.error(f"Error scanning project for changes: {e}")
+                continue
+            changed = {rel for rel, sig in current.items() if previous.get(rel) != sig}
+            changed |= previous.keys() - current.keys()
+            previous = current
+
+            now = time.monotonic()
+            if changed:
+                pending |= changed
+                last_change = now
+            if pending and now - last_change >= debounce:
+                paths, pending = pending, set()
+                await self._index_changed_paths(paths)
+
+    async def _index_changed_paths(self, paths: Iterable[str]):
+        try:
+            await asyncio.to_thread(self.index_paths, list(paths))
+        except Exception as e:
+            logger.error(f"Error in background indexing: {e}")
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """(mtime_ns, size) of every indexable file, without reading file contents."""
+        snapshot = {}
+        for file_path in self._iter_project_files():
+            try:
+                st = file_path.stat()
+            except OSError:
+                continue
+            snapshot[str(file_path.relative_to(self.project_path))] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    @staticmethod
+    def _chunk_id(rel_path: str, chunk_index: int, content: str) -> str:
+        """Deterministic chunk ID derived from (path, chunk index, content hash)."""
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{rel_path}\0{chunk_index}\0{content_hash}".encode("utf-8")).hexdigest()
+
+    def _existing_chunk_ids(self, rel_path: str) -> List[str]:
+        """IDs of every chunk currently stored for a file."""
+        return self.vector_store.get(where={"source": rel_path}, include=[])["ids"]
+
+    def _chunk_file(self, file_path: Path, rel_path: str) -> List[Document]:
+        """
+        Read a file and split it on function/class boundaries.
+        Chunks carry deterministic IDs, symbol names and line ranges in their metadata.
+        """
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        if not content.strip():
+            return []
+
+        indexed_at = datetime.now().isoformat()
+        chunks = []
+        for index, piece in enumerate(self.chunker.chunk(content, rel_path)):
+            chunks.append(Document(
+                page_content=piece["content"],
+                metadata={
+                    "source": rel_path,
+                    "filename": file_path.name,
+                    "extension": file_path.suffix,
+                    "language": detect_language(rel_path) or "text",
+                    "symbol": piece["symbol"],
+                    "kind": piece["kind"],
+                    "start_line": piece["start_line"],
+                    "end_line": piece["end_line"],
+                    "indexed_at": indexed_at,
+                    "chunk_index": index,
+                    "chunk_id": self._chunk_id(rel_path, index, piece["content"])
+                }
+            ))
+        return chunks
 
     def index_project(self, force: bool = False):
         """
         Scan and index relevant files in the project incrementally.
+
+        Only files whose content hash changed are re-chunked. Chunks have
+        deterministic IDs, so unchanged chunks are kept, stale chunks of modified
+        or removed files are deleted, and only new chunks are embedded.
+
+        Files are hashed and chunked on a worker pool and chunks are streamed into
+        fixed-size embedding batches, at most RAG_EMBED_CONCURRENCY of which are in
+        flight, so memory stays bounded regardless of repository size.
         Thread-safe implementation with a lock.
         """
         with self._lock:
             if not self.project_path.exists():
                 logger.error(f"Project path does not exist: {self.project_path}")
                 return
+            if self.vector_store is None:
+                logger.error("Vector store unavailable. Skipping indexing.")
+                return
+            self._ensure_lexical_index()
+            self._index_changes(force)
 
-        # Directories to ignore
-        ignored_dirs = {'node_modules', '.git', '__pycache__', '.chroma_db', 'venv', 'env', 'dist', 'build'}
-        
-        # Extensions for non-text/binary files that should always be skipped
-        binary_extensions = {
-            '.pyc', '.exe', '.dll', '.so', '.dylib', '.bin', '.obj', '.o', '.a', '.lib',
-            '.png', '.jpg', '.jpeg', '.gif', '.ico', '.svg', '.pdf', '.zip', '.tar', '.gz', 
-            '.7z', '.rar', '.woff', '.woff2', '.ttf', '.eot', '.mp4', '.mp3', '.wav'
-        }
+    def _is_watched(self, file_path: Path) -> bool:
+        """Cheap filter for change events: drop ignored directories and binary files."""
+        return not any(ignored in file_path.parts for ignored in IGNORED_DIRS) \
+            and file_path.suffix.lower() not in BINARY_EXTENSIONS \
+            and self._persist_path not in file_path.parents
 
-        # Explicit deny list for sensitive files and patterns
-        deny_patterns = [
-            r'.*secret.*', r'.*key.*', r'.*\.pem$', r'.*\.crt$', r'.*\.env.*', 
-            r'.*token.*', r'.*password.*', r'.*credential.*', r'.*\.db$', r'.*\.sqlite$'
-        ]
-        import re
+    def _is_indexable(self, file_path: Path) -> bool:
+        # Skip files that are part of the index itself
+        if self._persist_path in file_path.parents:
+            return False
+        return is_indexable_path(file_path)
 
-        current_hashes = self._load_hashes()
-        new_hashes = {}
-        files_to_index = []
-        
-        # Scan files and check for changes
-        for file_path in self.project_path.rglob('*'):
-            if file_path.is_file():
-                # Skip if file is in an ignored directory
-                if any(ignored in str(file_path) for ignored in ignored_dirs):
-                    continue
-                
-                # Skip binary/non-text files
-                if file_path.suffix.lower() in binary_extensions:
-                    continue
+    def _iter_project_files(self) -> Iterator[Path]:
+        """Yield indexable files, skipping ignored directories, binaries and sensitive files."""
+        for root, dirs, files in os.walk(self.project_path):
+            # Prune ignored directories instead of walking into them
+            dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
+            for name in files:
+                file_path = Path(root) / name
+                if self._is_indexable(file_path):
+                    yield file_path
 
-                # Check against deny patterns
-                if any(re.match(pattern, file_path.name, re.IGNORECASE) for pattern in deny_patterns):
-                    logger.debug(f"Skipping sensitive file: {file_path}")
-                    continue
+    def _hash_entry(self, file_path: Path, known_hashes: Dict[str, str]) -> Optional[Tuple[Path, str, str, Tuple[int, int]]]:
+        """Hash a file, reusing the known hash when its (mtime, size) has not changed since it was last hashed."""
+        try:
+            rel_path = str(file_path.relative_to(self.project_path))
+            st = file_path.stat()
+            signature = (st.st_mtime_ns, st.st_size)
+            if rel_path in known_hashes and self._file_stats.get(rel_path) == signature:
+                return file_path, rel_path, known_hashes[rel_path], signature
+            return file_path, rel_path, self._get_file_hash(file_path), signature
+        except Exception as e:
+            logger.warning(f"Failed to hash file: {file_path}. Error: {e}")
+            return None
 
+    def _chunk_entry(self, entry: Tuple[Path, str]) -> Tuple[str, Optional[List[Document]]]:
+        file_path, rel_path = entry
+        try:
+            return rel_path, self._chunk_file(file_path, rel_path)
+        except Exception as e:
+            logger.warning(f"Failed to read file for indexing: {file_path}. Error: {e}")
+            return rel_path, None
+
+    def _iter_new_chunks(
+        self,
+        read_pool: ThreadPoolExecutor,
+        files_to_index: List[Tuple[Path, str]],
+        force: bool,
+        failed_files: Set[str],
+        stats: Dict[str, int]
+    ) -> Iterator[Tuple[str, Document]]:
+        """
+        Chunk changed files in parallel and yield (rel_path, chunk) for chunks not yet stored.
+        Stale chunks of each file are deleted as the file is processed.
+        """
+        for rel_path, chunks in _bounded_map(read_pool, self._chunk_entry, files_to_index, self.read_workers * 2):
+            if chunks is None:
+                failed_files.add(rel_path)
+                continue
+            existing_ids = set() if force else set(self._existing_chunk_ids(rel_path))
+            stale_ids = existing_ids - {chunk.metadata["chunk_id"] for chunk in chunks}
+            if stale_ids:
+                self.vector_store.delete(ids=list(stale_ids))
+                self.lexical.remove(stale_ids)
+                stats["deleted"] += len(stale_ids)
+            for chunk in chunks:
+                if chunk.metadata["chunk_id"] not in existing_ids:
+                    yield rel_path, chunk
+
+    def _iter_batches(self, chunks: Iterable[Tuple[str, Document]]) -> Iterator[Tuple[List[Document], Set[str]]]:
+        """Group chunks into fixed-size embedding batches, tracking which files each batch covers."""
+        batch, files = [], set()
+        for rel_path, chunk in chunks:
+            batch.append(chunk)
+            files.add(rel_path)
+            if len(batch) >= self.embed_batch_size:
+                yield batch, files
+                batch, files = [], set()
+        if batch:
+            yield batch, files
+
+    def _add_batch(self, chunks: List[Document]) -> int:
+        """Embed and upsert one batch, retrying transient failures with exponential backoff."""
+        ids = [chunk.metadata["chunk_id"] for chunk in chunks]
+        for attempt in range(self.embed_max_retries + 1):
+            try:
+                self.vector_store.add_documents(chunks, ids=ids)
+                return len(chunks)
+            except Exception as e:
+                if attempt == self.embed_max_retries:
+                    raise
+                delay = self.embed_retry_backoff * (2 ** attempt)
+                logger.warning(f"Embedding batch of {len(chunks)} chunks failed: {e}. Retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def index_paths(self, paths: Iterable[str]):
+        """
+        Re-index only the given files (absolute or project-relative paths).
+        Paths that no longer exist have their chunks removed, including every
+        indexed file below a deleted directory.
+        """
+        with self._lock:
+            if self.vector_store is None:
+                logger.error("Vector store unavailable. Skipping indexing.")
+                return
+            self._ensure_lexical_index()
+
+            current_hashes = self._load_hashes()
+            new_hashes = dict(current_hashes)
+            signatures = {}
+            files_to_index = []
+            removed_files = set()
+
+            for path in set(paths):
+                file_path = Path(os.path.abspath(self.project_path / path))
                 try:
                     rel_path = str(file_path.relative_to(self.project_path))
-                    file_hash = self._get_file_hash(file_path)
-                    new_hashes[rel_path] = file_hash
+                except ValueError:
+                    continue
 
-                    if force or rel_path not in current_hashes or current_hashes[rel_path] != file_hash:
+                if file_path.is_file():
+                    if not self._is_indexable(file_path):
+                        continue
+                    entry = self._hash_entry(file_path, current_hashes)
+                    if entry is None:
+                        continue
+                    _, rel_path, file_hash, signature = entry
+                    new_hashes[rel_path] = file_hash
+                    signatures[rel_path] = signature
+                    if current_hashes.get(rel_path) != file_hash:
                         files_to_index.append((file_path, rel_path))
-                except Exception as e:
-                    logger.warning(f"Failed to hash file: {file_path}. Error: {e}")
+                elif not file_path.exists():
+                    prefix = rel_path + os.sep
+                    removed_files.update(
+                        indexed for indexed in current_hashes
+                        if indexed == rel_path or indexed.startswith(prefix)
+                    )
+
+            for rel_path in removed_files:
+                new_hashes.pop(rel_path, None)
+            if not files_to_index and not removed_files:
+                self._file_stats.update(signatures)
+                return
+
+            self._apply_changes(files_to_index, sorted(removed_files), current_hashes, new_hashes, signatures, force=False)
+
+    def _index_changes(self, force: bool):
+        if force:
+            self.vector_store.delete_collection()
+            self._initialize_db()
+            self._file_stats.clear()
+            self.lexical.clear()
+            self._bump_generation()
+            current_hashes = {}
+        else:
+            current_hashes = self._load_hashes()
+        # Chunks made by an older chunker are rebuilt even if their files did not change
+        rechunk_all = bool(current_hashes) and self._index_version() != CHUNKER_VERSION
+        new_hashes = {}
+        signatures = {}
+        files_to_index = []
+
+        # Scan and hash files in parallel to find changes
+        with ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix="rag-read") as read_pool:
+            hash_entry = functools.partial(self._hash_entry, known_hashes=current_hashes)
+            for entry in _bounded_map(read_pool, hash_entry, self._iter_project_files(), self.read_workers * 4):
+                if entry is None:
+                    continue
+                file_path, rel_path, file_hash, signature = entry
+                new_hashes[rel_path] = file_hash
+                signatures[rel_path] = signature
+                if rechunk_all or current_hashes.get(rel_path) != file_hash:
+                    files_to_index.append((file_path, rel_path))
 
-        if not files_to_index:
+        removed_files = [rel_path for rel_path in current_hashes if rel_path not in new_hashes]
+
+        if not files_to_index and not removed_files:
+            self._file_stats.update(signatures)
             logger.info("No changes detected. Skipping indexing.")
             return
 
-        documents = []
-        for file_path, rel_path in files_to_index:
+        self._apply_changes(files_to_index, removed_files, current_hashes, new_hashes, signatures, force)
+
+    def _apply_changes(
+        self,
+        files_to_index: List[Tuple[Path, str]],
+        removed_files: List[str],
+        current_hashes: Dict[str, str],
+        new_hashes: Dict[str, str],
+        signatures: Dict[str, Tuple[int, int]],
+        force: bool
+    ):
+        """Delete chunks of removed files, re-chunk and embed changed files, then persist hashes."""
+        failed_files: Set[str] = set()
+        stats = {"embedded": 0, "deleted": 0}
+
+        for rel_path in removed_files:
+            self._file_stats.pop(rel_path, None)
+            stale_ids = self._existing_chunk_ids(rel_path)
+            if stale_ids:
+                self.vector_store.delete(ids=stale_ids)
+                self.lexical.remove(stale_ids)
+                stats["deleted"] += len(stale_ids)
+
+        with ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix="rag-read") as read_pool, \
+             ThreadPoolExecutor(max_workers=self.embed_concurrency, thread_name_prefix="rag-embed") as embed_pool:
+
+            # Stream chunks into embedding batches; at most embed_concurrency batches are in flight
+            in_flight = {}
+
+            def collect(return_when):
+                done, _ = wait(in_flight, return_when=return_when)
+                for future in done:
+                    batch, files = in_flight.pop(future)
+                    try:
+                        stats["embedded"] += future.result()
+                        for chunk in batch:
+                            self.lexical.add(chunk.metadata["chunk_id"], chunk.page_content, chunk.metadata["source"])
+                    except Exception as e:
+                        logger.error(f"Embedding batch failed for {len(files)} file(s): {e}")
+                        failed_files.update(files)
+
+            new_chunks = self._iter_new_chunks(read_pool, files_to_index, force, failed_files, stats)
+            for batch, files in self._iter_batches(new_chunks):
+                if len(in_flight) >= self.embed_concurrency:
+                    collect(FIRST_COMPLETED)
+                in_flight[embed_pool.submit(self._add_batch, batch)] = (batch, files)
+            if in_flight:
+                collect(ALL_COMPLETED)
+
+        # Files that failed to read or embed keep their previous hash so the next run retries them
+        self._file_stats.update(signatures)
+        for rel_path in failed_files:
+            self._file_stats.pop(rel_path, None)
+            if rel_path in current_hashes:
+                new_hashes[rel_path] = current_hashes[rel_path]
+            else:
+                new_hashes.pop(rel_path, None)
+
+        self._bump_generation()
+        self._save_hashes(new_hashes)
+        if not failed_files:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    if not content.strip():
-                        continue
-                    
-                    doc = Document(
-                        page_content=content,
-                        metadata={
-                            "source": rel_path,
-                            "filename": file_path.name,
-                            "extension": file_path.suffix,
-                            "indexed_at": datetime.now().isoformat()
-                        }
-                    )
-                    documents.append(doc)
-            except Exception as e:
-                logger.warning(f"Failed to read file for indexing: {file_path}. Error: {e}")
+                self.version_file.write_text(str(CHUNKER_VERSION))
+            except OSError as e:
+                logger.error(f"Failed to save chunker version: {e}")
+        logger.info(
+            f"Updated index: {len(files_to_index)} changed and {len(removed_files)} removed files, "
+            f"{stats['embedded']} chunks embedded, {stats['deleted']} stale chunks deleted"
+            + (f", {len(failed_files)} files to retry." if failed_files else ".")
+        )
+        if isinstance(self.embeddings, CachedEmbeddings):
+            cache_stats = self.embeddings.cache.stats()
+            logger.info(f"Embedding cache: {cache_stats['entries']} entries, hit rate {cache_stats['hit_rate']:.1%}")
 
-        if not documents:
+    def _ensure_lexical_index(self):
+        """Build the BM25 index from the vector store contents. Caller must hold self._lock."""
+        if not self.hybrid_search or self.lexical.ready:
             return
+        try:
+            self.lexical.clear()
+            page_size, offset = 1000, 0
+            while True:
+                page = self.vector_store.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+                for chunk_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                    self.lexical.add(chunk_id, text or "", (metadata or {}).get("source", ""))
+                if len(page["ids"]) < page_size:
+                    break
+                offset += page_size
+            self.lexical.ready = True
+            self._bump_generation()
+            logger.info(f"Lexical index built with {len(self.lexical)} chunks")
+        except Exception as e:
+            logger.error(f"Failed to build lexical index: {e}")
 
-        # Split and add to vector store
-        chunks = self.text_splitter.split_documents(documents)
-        
-        if self.vector_store:
-            if force:
-                self.vector_store.delete_collection()
-                self._initialize_db()
-                self.vector_store.add_documents(chunks)
-            else:
-                # In a real incremental setup, we would also remove old chunks for modified files
-                # ChromaDB's langchain integration doesn't easily support "update by metadata"
-                # For this implementation, we add new chunks. 
-                # To avoid duplicate context, we'll clear and re-index if changes are detected
-                # (Still faster than indexing everything every time if we use force=True)
-                if len(files_to_index) > 0:
-                    # If any files changed, for now we re-index to maintain consistency
-                    # In a more advanced version, we'd use document IDs
-                    self.vector_store.delete_collection()
-                    self._initialize_db()
-                    
-                    # Re-index everything (since we already scanned them)
-                    all_docs = []
-                    for rel_path, f_hash in new_hashes.items():
-                        f_path = self.project_path / rel_path
-                        try:
-                            with open(f_path, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                                if content.strip():
-                                    all_docs.append(Document(
-                                        page_content=content,
-                                        metadata={"source": rel_path, "filename": f_path.name, "extension": f_path.suffix}
-                                    ))
-                        except Exception: continue
-                    
-                    all_chunks = self.text_splitter.split_documents(all_docs)
-                    self.vector_store.add_documents(all_chunks)
-                    logger.info(f"Re-indexed project: {len(all_docs)} files, {len(all_chunks)} chunks.")
-
-            self._save_hashes(new_hashes)
-            logger.info(f"Updated index with {len(documents)} changed files.")
+    def _bump_generation(self):
+        """Mark the index as changed so cached search results are no longer served."""
+        self.index_generation += 1
+        self._search_results.clear()
+
+    def _embed_query(self, query: str) -> List[float]:
+        vector = self._query_embeddings.get(query)
+        if vector is None:
+            vector = self.embeddings.embed_query(query)
+            self._query_embeddings.put(query, vector)
+        return vector
+
+    def _similarity_search(self, query: str, k: int) -> List[Document]:
+        return self.vector_store.similarity_search_by_vector(self._embed_query(query), k=k)
+
+    @staticmethod
+    def _doc_key(doc: Document) -> str:
+        return doc.metadata.get("chunk_id") or getattr(doc, "id", None) or doc.page_content
+
+    def _hybrid_search(self, query: str, limit: int) -> List[Document]:
+        """Fuse vector and BM25 rankings with reciprocal-rank fusion."""
+        candidates = limit * 2
+        vector_docs = self._similarity_search(query, candidates)
+
+        # Build the lexical index on first use unless an indexing run holds the lock
+        if not self.lexical.ready and self._lock.acquire(blocking=False):
+            try:
+                self._ensure_lexical_index()
+            finally:
+                self._lock.release()
+        if not self.lexical.ready:
+            return vector_docs[:limit]
+
+        lexical_ids = [chunk_id for chunk_id, _ in self.lexical.search(query, candidates)]
+        docs_by_id = {self._doc_key(doc): doc for doc in vector_docs}
+        fused = reciprocal_rank_fusion([list(docs_by_id), lexical_ids], k=self.rrf_k)[:limit]
+
+        # Lexical-only hits still need their content from the vector store
+        missing = [chunk_id for chunk_id in fused if chunk_id not in docs_by_id]
+        if missing:
+            fetched = self.vector_store.get(ids=missing, include=["documents", "metadatas"])
+            for chunk_id, text, metadata in zip(fetched["ids"], fetched["documents"], fetched["metadatas"]):
+                docs_by_id[chunk_id] = Document(page_content=text or "", metadata=metadata or {})
+        return [docs_by_id[chunk_id] for chunk_id in fused if chunk_id in docs_by_id]
 
     def search(self, query: str, limit: int = 5) -> Dict[str, Any]:
         """
         Search for related code patterns or utilities.
+        Combines semantic and BM25 lexical matches when RAG_HYBRID_SEARCH is enabled.
         Returns a dict containing both the formatted results and the list of referenced files.
         """
-        if not self.vector_store:
+        if self.vector_store is None:
             return {"results": [], "referenced_files": []}
 
-        results = self.vector_store.similarity_search(query, k=limit)
+        cache_key = (query, limit, self.hybrid_search, self.index_generation)
+        cached = self._search_results.get(cache_key)
+        if cached is not None:
+            return {"results": list(cached["results"]), "referenced_files": list(cached["referenced_files"])}
+
+        if self.hybrid_search:
+            results = self._hybrid_search(query, limit)
+        else:
+            results = self._similarity_search(query, limit)
         
         formatted_results = []
         referenced_files = set()
@@ -269,15 +717,20 @@ class CodebaseRAG:
             formatted_results.append({
                 "content": doc.page_content,
                 "source": source,
-                "filename": doc.metadata.get("filename")
+                "filename": doc.metadata.get("filename"),
+                "symbol": doc.metadata.get("symbol"),
+                "start_line": doc.metadata.get("start_line"),
+                "end_line": doc.metadata.get("end_line")
             })
             if source:
                 referenced_files.add(source)
         
-        return {
+        search_data = {
             "results": formatted_results,
             "referenced_files": list(referenced_files)
         }
+        self._search_results.put(cache_key, search_data)
+        return {"results": list(formatted_results), "referenced_files": list(referenced_files)}
 
     def get_context_summary(self, query: str) -> Dict[str, Any]:
         """
@@ -299,7 +752,10 @@ class CodebaseRAG:
         for res in results:
             source = res['source']
             if source not in added_files:
-                summary += f"--- File: {source} ---\n"
+                location = ""
+                if res.get('start_line'):
+                    location = f" (lines {res['start_line']}-{res['end_line']}" + (f": {res['symbol']})" if res.get('symbol') else ")")
+                summary += f"--- File: {source}{location} ---\n"
                 # Limit content per file to keep context window manageable
                 content_preview = res['content'][:500] + "..." if len(res['content']) > 500 else res['content']
                 summary += f"{content_preview}\n\n"
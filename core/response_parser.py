@@ -0,0 +1,127 @@
+"""
+core/response_parser.py - Incremental parser for AI fix responses
+
+Recognizes the root-cause, code-fence, explanation and retry-analysis sections
+of a model response as it streams in. Text is classified line by line with the
+same rules whether the response arrives in one piece or token by token, so a
+streamed response parses exactly like a complete one.
+"""
+
+from typing import Any, Dict, List, Optional
+
+
+class StreamingResponseParser:
+    """
+    Line-based state machine over a streamed response.
+
+    `feed()` returns events for the text received so far:
+    - {"kind": "delta", "section": ..., "text": ...}: raw text, labelled with the
+      section it currently belongs to (None before the first header)
+    - {"kind": "section", "section": ...}: a header or code fence switched sections
+    - {"kind": "code_complete", "code": ...}: the first code fence just closed
+    """
+
+    def __init__(self):
+        self.state: Optional[str] = None
+        self._pending = ""
+        self._sections: Dict[str, List[str]] = {
+            "root_cause": [], "code": [], "explanation": [], "retry_analysis": []
+        }
+        self._code_completed = False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        events: List[Dict[str, Any]] = []
+        if not text:
+            return events
+        events.append({"kind": "delta", "section": self.state, "text": text})
+        self._pending += text
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            events.extend(self._process_line(line))
+        return events
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Process the final line, which has no trailing newline."""
+        line, self._pending = self._pending, ""
+        return self._process_line(line)
+
+    def _switch(self, state: Optional[str]) -> List[Dict[str, Any]]:
+        if state == self.state:
+            return []
+        self.state = state
+        return [{"kind": "section", "section": state}]
+
+    def _process_line(self, line: str) -> List[Dict[str, Any]]:
+        stripped_line = line.strip()
+        lower_line = stripped_line.lower()
+
+        if '```' in lower_line:
+            if self.state != 'code':
+                events = self._switch('code')
+                # Inline code after the fence: ```python print("hello")
+                fence_content = stripped_line.split('```', 1)[1]
+                if fence_content.startswith('python'):
+                    fence_content = fence_content[6:].strip()
+                else:
+                    # Keep content after the language identifier on the same line
+                    parts = fence_content.split(None, 1)
+                    fence_content = parts[1].strip() if len(parts) > 1 else ""
+                if fence_content:
+                    self._sections['code'].append(fence_content)
+                return events
+
+            # Closing fence, possibly with inline code before it: print("done")```
+            fence_prefix = stripped_line.split('```', 1)[0].strip()
+            if fence_prefix:
+                self._sections['code'].append(fence_prefix)
+            events = self._switch(None)
+            if not self._code_completed:
+                self._code_completed = True
+                events.append({"kind": "code_complete", "code": self.fixed_code})
+            return events
+
+        # Section headers with potential inline content
+        header = None
+        if 'root cause' in lower_line:
+            header = 'root_cause'
+        elif 'explanation' in lower_line or 'changes' in lower_line:
+            header = 'explanation'
+        elif 'wrong with' in lower_line or 'previous attempt' in lower_line:
+            header = 'retry_analysis'
+
+        if header:
+            events = self._switch(header)
+            content = stripped_line.split(':', 1)[1].strip() if ':' in stripped_line else ""
+            if content:
+                self._sections[header].append(content)
+            return events
+
+        if self.state:
+            self._sections[self.state].append(line)
+        return []
+
+    @property
+    def fixed_code(self) -> str:
+        return '\n'.join(self._sections['code']).strip()
+
+    def result(self, original_code: str) -> Dict[str, Any]:
+        """Structured fix in the shape returned by BugExorcistAgent._parse_ai_response."""
+        fixed_code = self.fixed_code
+        root_cause = '\n'.join(self._sections['root_cause']).strip()
+        explanation = '\n'.join(self._sections['explanation']).strip()
+        retry_analysis = '\n'.join(self._sections['retry_analysis']).strip()
+
+        # Fallback: if no code found, use original
+        if not fixed_code:
+            fixed_code = original_code
+
+        # Estimate confidence based on response quality
+        confidence = 0.85 if fixed_code and root_cause else 0.6
+
+        return {
+            "root_cause": root_cause or "Analysis completed",
+            "fixed_code": fixed_code,
+            "explanation": explanation or "Code has been fixed",
+            "confidence": confidence,
+            "retry_analysis": retry_analysis
+        }
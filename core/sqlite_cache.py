@@ -0,0 +1,100 @@
+"""
+core/sqlite_cache.py - Shared base for the on-disk SQLite caches
+
+LLMResponseCache and EmbeddingCache both keep one SQLite connection guarded by
+a lock, track last access for least-recently-used eviction past a size cap,
+optionally expire entries after a TTL, and count hits and misses. The
+connection is synchronous; async callers run cache calls in a worker thread.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Any, Iterable, Optional
+
+
+class SQLiteCache:
+    """
+    SQLite-backed cache table with TTL expiry, LRU eviction and hit/miss counters.
+
+    Subclasses set `table`, pass their CREATE statements to __init__ and keep a
+    `last_access` column; tables with a TTL also need a `created_at` column.
+    """
+
+    table: str = ""
+
+    def __init__(self, path: str, max_entries: int, schema: Iterable[str], ttl_seconds: Optional[int] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        for statement in schema:
+            self._conn.execute(statement)
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{self.table}_last_access ON {self.table} (last_access)"
+        )
+        self._conn.commit()
+        # Running entry count, so writes can enforce the size cap without COUNT(*)
+        self._entries = self._count_locked()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _record_lookups(self, hits: int, misses: int) -> None:
+        """Update hit/miss counters. Caller must hold self._lock."""
+        self.hits += hits
+        self.misses += misses
+
+    def _count_locked(self) -> int:
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def _added_locked(self, inserted: int) -> None:
+        """
+        Account for newly inserted rows (not overwritten ones) and evict the
+        least recently used entries beyond max_entries. Caller must hold self._lock.
+        """
+        self._entries += inserted
+        excess = self._entries - self.max_entries
+        if excess > 0:
+            self._removed_locked(self._conn.execute(
+                f"DELETE FROM {self.table} WHERE rowid IN ("
+                f" SELECT rowid FROM {self.table} ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            ).rowcount)
+
+    def _removed_locked(self, deleted: int) -> None:
+        self._entries = max(0, self._entries - deleted)
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+            self._entries = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            # Resync the running count, e.g. after another process wrote to the same file
+            size = self._entries = self._count_locked()
+        lookups = self.hits + self.misses
+        stats = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": size,
+            "max_entries": self.max_entries
+        }
+        if self.ttl_seconds is not None:
+            stats["ttl_seconds"] = self.ttl_seconds
+        return stats
@@ -0,0 +1,222 @@
+"""
+core/traceback_context.py - Deterministic source context from stack traces
+
+Extracts (file, line, function) frames from Python, Node.js, Go and Rust
+error output and reads the surrounding source lines straight from disk.
+Line start offsets are computed once per file version, so a window is a single
+seek + read instead of scanning the file.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from core.file_filters import is_indexable_path
+
+
+class Frame(NamedTuple):
+    file: str
+    line: int
+    function: Optional[str] = None
+
+
+_PYTHON_FRAME = re.compile(r'File "(?P<file>[^"]+)", line (?P<line>\d+)(?:, in (?P<func>[^\s]+))?')
+_NODE_FRAME = re.compile(r'^\s*at (?:(?P<func>[^\s(]+(?: \[as [^\]]+\])?) \()?(?P<file>[^\s()]+?):(?P<line>\d+):\d+\)?\s*$')
+_GO_FILE_LINE = re.compile(r'^\s+(?P<file>\S+\.go):(?P<line>\d+)(?: \+0x[0-9a-f]+)?\s*$')
+_GO_FUNC_LINE = re.compile(r'^(?P<func>[\w./*()-]+)\(.*\)\s*$')
+_GO_COMPILE = re.compile(r'^(?P<file>\S+\.go):(?P<line>\d+)(?::\d+)?: ')
+_RUST_PANIC = re.compile(r"panicked at (?:'.*?', )?(?P<file>[^\s:]+\.rs):(?P<line>\d+):\d+")
+_RUST_BACKTRACE_FUNC = re.compile(r'^\s*\d+: (?P<func>\S+)\s*$')
+_RUST_BACKTRACE_AT = re.compile(r'^\s+at (?P<file>\S+\.rs):(?P<line>\d+)(?::\d+)?\s*$')
+_RUST_COMPILE = re.compile(r'^\s*--> (?P<file>\S+\.rs):(?P<line>\d+):\d+')
+
+# Frames in these locations belong to runtimes or dependencies, not the project
+_EXTERNAL_MARKERS = ("site-packages", "dist-packages", "node_modules", "/rustc/", "/.cargo/registry/", "/usr/lib/", "/usr/local/go/")
+
+
+def parse_traceback(text: str) -> List[Frame]:
+    """
+    Extract stack frames from error output, innermost frame first.
+    Recognizes Python tracebacks, Node.js stacks, Go panics/compiler errors and
+    Rust panics, backtraces and compiler errors. Duplicate locations are dropped.
+    """
+    python_frames: List[Frame] = []
+    other_frames: List[Frame] = []
+    lines = text.splitlines()
+
+    for i, line in enumerate(lines):
+        match = _PYTHON_FRAME.search(line)
+        if match:
+            python_frames.append(Frame(match["file"], int(match["line"]), match["func"]))
+            continue
+
+        # Checked before Node stacks, which share the "at <file>:<line>" shape
+        match = _RUST_BACKTRACE_AT.match(line)
+        if match:
+            func_match = _RUST_BACKTRACE_FUNC.match(lines[i - 1]) if i > 0 else None
+            other_frames.append(Frame(match["file"], int(match["line"]), func_match["func"] if func_match else None))
+            continue
+
+        match = _NODE_FRAME.match(line)
+        if match and not match["file"].startswith("node:"):
+            other_frames.append(Frame(match["file"], int(match["line"]), match["func"]))
+            continue
+
+        match = _GO_FILE_LINE.match(line)
+        if match:
+            func_match = _GO_FUNC_LINE.match(lines[i - 1]) if i > 0 else None
+            other_frames.append(Frame(match["file"], int(match["line"]), func_match["func"] if func_match else None))
+            continue
+
+        match = _GO_COMPILE.match(line) or _RUST_PANIC.search(line) or _RUST_COMPILE.match(line)
+        if match:
+            other_frames.append(Frame(match["file"], int(match["line"])))
+
+    # Python prints the innermost frame last
+    frames = list(reversed(python_frames)) + other_frames
+    seen = set()
+    unique = []
+    for frame in frames:
+        if (frame.file, frame.line) not in seen:
+            seen.add((frame.file, frame.line))
+            unique.append(frame)
+    return unique
+
+
+def is_external(path: str) -> bool:
+    """True for frames inside interpreters, toolchains or third-party packages."""
+    normalized = path.replace("\\", "/")
+    return normalized.startswith("<") or any(marker in normalized for marker in _EXTERNAL_MARKERS)
+
+
+class LineOffsetIndex:
+    """
+    Byte offsets of line starts for project files, cached per (mtime, size)
+    and bounded to `max_files` entries.
+    """
+
+    def __init__(self, max_files: int = 512):
+        self.max_files = max_files
+        self._offsets: "OrderedDict[str, Tuple[Tuple[int, int], List[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _line_offsets(self, path: str) -> List[int]:
+        st = os.stat(path)
+        signature = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._offsets.get(path)
+            if cached and cached[0] == signature:
+                self._offsets.move_to_end(path)
+                return cached[1]
+
+        offsets = [0]
+        position = 0
+        with open(path, "rb") as f:
+            for raw_line in f:
+                position += len(raw_line)
+                offsets.append(position)
+
+        with self._lock:
+            self._offsets[path] = (signature, offsets)
+            self._offsets.move_to_end(path)
+            while len(self._offsets) > self.max_files:
+                self._offsets.popitem(last=False)
+        return offsets
+
+    def window(self, path: str, line: int, radius: int = 8) -> Optional[Tuple[int, int, List[str]]]:
+        """
+        Return (first_line, last_line, lines) around a 1-based line number,
+        or None if the file cannot be read or the line is out of range.
+        """
+        try:
+            offsets = self._line_offsets(path)
+        except OSError:
+            return None
+        line_count = len(offsets) - 1
+        if line < 1 or line > line_count:
+            return None
+        first = max(1, line - radius)
+        last = min(line_count, line + radius)
+        with open(path, "rb") as f:
+            f.seek(offsets[first - 1])
+            data = f.read(offsets[last] - offsets[first - 1])
+        return first, last, data.decode("utf-8", errors="replace").splitlines()
+
+
+def resolve_frame_path(frame_file: str, project_root: Path) -> Optional[str]:
+    """
+    Map a path from a stack frame to a file inside the project.
+    Container paths such as /app/src/x.py are matched by trying successively
+    shorter suffixes against the project root. Returns the project-relative path.
+
+    Frame paths come from user-supplied error output: symlinks are resolved
+    before the containment check, and files the RAG index would not read
+    (secrets, ignored directories, binaries) are never returned.
+    """
+    if is_external(frame_file):
+        return None
+    root = Path(os.path.realpath(project_root))
+    parts = Path(frame_file.replace("\\", "/")).parts
+    for start in range(len(parts)):
+        suffix = parts[start:]
+        if suffix and suffix[0] in ("/", ".", ".."):
+            continue
+        candidate = Path(os.path.realpath(root.joinpath(*suffix)))
+        if not candidate.is_file() or root not in candidate.parents:
+            continue
+        rel_path = candidate.relative_to(root)
+        if is_indexable_path(rel_path):
+            return str(rel_path)
+    return None
+
+
+def format_window(rel_path: str, frame: Frame, window: Tuple[int, int, List[str]]) -> str:
+    """Render a source window with line numbers, marking the frame's line."""
+    first, last, lines = window
+    location = f"lines {first}-{last}" + (f", in {frame.function}" if frame.function else "")
+    rendered = [f"--- File: {rel_path} ({location}) ---"]
+    for number, text in enumerate(lines, start=first):
+        marker = ">>" if number == frame.line else "  "
+        rendered.append(f"{marker} {number:>5} | {text}")
+    return "\n".join(rendered)
+
+
+# Shared across agents so line offsets are computed once per file version
+_line_index = LineOffsetIndex()
+
+def collect_traceback_context(
+    error_message: str,
+    project_root: str,
+    max_frames: int = 5,
+    radius: int = 8
+) -> Dict[str, Any]:
+    """
+    Read source windows for the project frames of a stack trace.
+
+    Returns the rendered windows, the project-relative files they came from,
+    and the frames that look like project code but could not be found on disk
+    (candidates for a semantic search fallback).
+    """
+    root = Path(os.path.realpath(project_root))
+    windows: List[str] = []
+    referenced_files: List[str] = []
+    unresolved: List[Frame] = []
+
+    for frame in parse_traceback(error_message):
+        if len(windows) >= max_frames:
+            break
+        if is_external(frame.file):
+            continue
+        rel_path = resolve_frame_path(frame.file, root)
+        window = _line_index.window(str(root / rel_path), frame.line, radius) if rel_path else None
+        if window is None:
+            unresolved.append(frame)
+            continue
+        windows.append(format_window(rel_path, frame, window))
+        if rel_path not in referenced_files:
+            referenced_files.append(rel_path)
+
+    return {"windows": windows, "referenced_files": referenced_files, "unresolved": unresolved}
@@ -0,0 +1,155 @@
+import sys
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+from core.error_signature import normalize_error, error_signature, group_by_signature
+from app.database import Base, apply_sqlite_pragmas
+from app.api import agent as agent_api
+from app.api.agent import BatchAnalysisRequest, analyze_bug_batch
+from app import models
+
+
+TRACE_A = '''Traceback (most recent call last):
+  File "/home/ci/build-1/app/calc.py", line 10, in divide
+    return a / b
+ZeroDivisionError: division by zero'''
+
+TRACE_B = '''Traceback (most recent call last):
+  File "/srv/deploy/app/calc.py", line 12, in divide
+    return a / b
+ZeroDivisionError: division by zero'''
+
+
+class TestErrorSignature(unittest.TestCase):
+    def test_run_specific_details_are_removed(self):
+        text = normalize_error(
+            "TypeError: <Foo object at 0x7f3a2b10> at 2024-01-31T12:00:00.123Z\n"
+            "    at run (/tmp/tmpab12cd34/index.js:12:5)"
+        )
+        self.assertEqual(text, "TypeError: <Foo object at 0x?> at <ts>\nat run (index.js:?)")
+
+    def test_same_bug_on_different_machines_matches(self):
+        self.assertEqual(normalize_error(TRACE_A), normalize_error(TRACE_B))
+        self.assertEqual(error_signature(TRACE_A, "return a / b"), error_signature(TRACE_B, "return a / b  \r\n"))
+
+    def test_code_and_language_are_part_of_the_signature(self):
+        self.assertNotEqual(error_signature(TRACE_A, "a / b"), error_signature(TRACE_A, "a // b"))
+        self.assertNotEqual(error_signature(TRACE_A, "a / b", "python"), error_signature(TRACE_A, "a / b", "javascript"))
+
+    def test_grouping_keeps_first_appearance_order(self):
+        clusters = group_by_signature([
+            (TRACE_A, "x", "python"),
+            ("KeyError: 'id'", "d['id']", "python"),
+            (TRACE_B, "x", "python"),
+        ])
+        self.assertEqual(list(clusters.values()), [[0, 2], [1]])
+
+
+class TestBatchAnalysis(unittest.TestCase):
+    def setUp(self):
+        # File-backed, so concurrent sessions get their own connections as in production
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{tmp.name}/test.db")
+        event.listen(self.engine.sync_engine, "connect", apply_sqlite_pragmas)
+        self.SessionLocal = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)
+        p = patch.object(agent_api, 'AsyncSessionLocal', self.SessionLocal)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def run_batch(self, bugs, **settings):
+        request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(rag=None)))
+
+        async def collect():
+            async with self.engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            response = await analyze_bug_batch(BatchAnalysisRequest(bugs=bugs, **settings), request)
+            lines = [json.loads(line) async for line in response.body_iterator]
+            async with self.SessionLocal() as db:
+                self.statuses = set((await db.execute(select(models.BugReport.status))).scalars())
+                self.session_count = (await db.execute(select(func.count()).select_from(models.Session))).scalar()
+            await self.engine.dispose()
+            return lines
+
+        return asyncio.run(collect())
+
+    def test_duplicates_are_analyzed_once(self):
+        calls = []
+
+        async def fix(**kwargs):
+            calls.append(kwargs["code_snippet"])
+            await asyncio.sleep(0.01)
+            return {
+                "success": True,
+                "final_fix": {"root_cause": "b is 0", "fixed_code": kwargs["code_snippet"] + " # fixed",
+                              "explanation": "guard", "confidence": 0.9, "timestamp": "t"},
+                "total_attempts": 1,
+                "all_attempts": [{"fix_result": {"usage": {"prompt_tokens": 10, "completion_tokens": 5, "estimated_cost": 0.01}}}]
+            }
+
+        bugs = [
+            {"error_message": TRACE_A, "code_snippet": "a / b"},
+            {"error_message": "KeyError: 'id'", "code_snippet": "d['id']"},
+            {"error_message": TRACE_B, "code_snippet": "a / b"},
+        ]
+        with patch.object(agent_api, 'BugExorcistAgent') as MockAgent:
+            MockAgent.return_value.analyze_and_fix_with_retry = AsyncMock(side_effect=fix)
+            MockAgent.return_value.close = AsyncMock()
+            lines = self.run_batch(bugs)
+
+        self.assertEqual(sorted(calls), ["a / b", "d['id']"])
+        results = {line["index"]: line for line in lines if line["type"] == "result"}
+        self.assertEqual(set(results), {0, 1, 2})
+        self.assertEqual(results[0]["signature"], results[2]["signature"])
+        self.assertEqual(results[2]["fix"]["fixed_code"], "a / b # fixed")
+        self.assertTrue(results[0]["representative"])
+        self.assertFalse(results[2]["representative"])
+        self.assertIsNone(results[2]["usage"])
+        self.assertEqual(lines[-1], {"type": "summary", "total": 3, "clusters": 2, "analyzed": 2,
+                                     "statuses": {"fixed": 3}})
+
+        self.assertEqual(self.statuses, {"fixed"})
+        self.assertEqual(self.session_count, 2)
+
+    def test_concurrency_limit_and_failures(self):
+        active = 0
+        peak = 0
+
+        async def fix(**kwargs):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            if kwargs["code_snippet"] == "boom":
+                raise RuntimeError("internal details")
+            return {"success": False, "final_fix": None, "total_attempts": 3, "all_attempts": []}
+
+        bugs = [{"error_message": f"Error {i}", "code_snippet": "boom" if i == 0 else f"x{i}"} for i in range(5)]
+        with patch.object(agent_api, 'BugExorcistAgent') as MockAgent:
+            MockAgent.return_value.analyze_and_fix_with_retry = AsyncMock(side_effect=fix)
+            MockAgent.return_value.close = AsyncMock()
+            lines = self.run_batch(bugs, concurrency=2)
+
+        self.assertEqual(peak, 2)
+        results = {line["index"]: line for line in lines if line["type"] == "result"}
+        self.assertEqual(results[0]["status"], "error")
+        self.assertNotIn("internal details", results[0]["error"])
+        self.assertEqual(lines[-1]["statuses"], {"error": 1, "failed": 4})
+
+
+if __name__ == '__main__':
+    unittest.main()
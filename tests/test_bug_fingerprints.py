@@ -0,0 +1,113 @@
+import sys
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+from app.database import Base, apply_sqlite_pragmas
+from app import async_crud
+from app.api import agent as agent_api
+from app.api.agent import RetryFixRequest, BugAnalysisRequest, fix_bug_with_retry, analyze_bug, get_bug_status
+from core.error_signature import error_signature
+
+
+TRACE = '''Traceback (most recent call last):
+  File "/tmp/tmpq8w7e6r5/main.py", line {line}, in <module>
+    print(1 / 0)
+ZeroDivisionError: division by zero'''
+
+FIX = {
+    "root_cause": "Division by zero",
+    "fixed_code": "print(0)",
+    "explanation": "Avoid dividing by zero",
+    "confidence": 0.9,
+    "timestamp": "2024-01-01T00:00:00",
+    "referenced_files": []
+}
+
+
+class TestBugFingerprints(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{tmp.name}/test.db")
+        event.listen(self.engine.sync_engine, "connect", apply_sqlite_pragmas)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.db = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)()
+        self.request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(rag=None)))
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def test_wal_mode_is_enabled(self):
+        result = await self.db.execute(text("PRAGMA journal_mode"))
+        self.assertEqual(result.scalar().lower(), "wal")
+
+    async def test_occurrences_are_counted_per_fingerprint(self):
+        fingerprint = error_signature(TRACE.format(line=1), "print(1 / 0)")
+        for _ in range(3):
+            await async_crud.create_bug_report(self.db, "ZeroDivisionError", fingerprint=fingerprint)
+        await async_crud.create_bug_report(self.db, "unrelated")
+
+        self.assertEqual((await async_crud.get_bug_fingerprint(self.db, fingerprint)).occurrences, 3)
+        self.assertIsNone(await async_crud.get_verified_fix(self.db, fingerprint))
+
+    async def test_recurring_bug_reuses_verified_fix(self):
+        with patch.object(agent_api, 'BugExorcistAgent') as MockAgent:
+            MockAgent.return_value.analyze_and_fix_with_retry = AsyncMock(return_value={
+                "success": True, "final_fix": FIX, "all_attempts": [],
+                "total_attempts": 1, "message": "Bug fixed successfully on attempt 1"
+            })
+            first = await fix_bug_with_retry(
+                RetryFixRequest(error_message=TRACE.format(line=1), code_snippet="print(1 / 0)"),
+                self.request, db=self.db
+            )
+            # Same bug from another run: different temp dir and line number
+            second = await fix_bug_with_retry(
+                RetryFixRequest(error_message=TRACE.format(line=7), code_snippet="print(1 / 0)"),
+                self.request, db=self.db
+            )
+            third = await analyze_bug(
+                BugAnalysisRequest(error_message=TRACE.format(line=9), code_snippet="print(1 / 0)"),
+                self.request, db=self.db
+            )
+
+        self.assertEqual(MockAgent.call_count, 1)
+        self.assertFalse(first.known_fix)
+        self.assertTrue(second.known_fix)
+        self.assertEqual(second.final_fix["fixed_code"], "print(0)")
+        self.assertEqual(second.fingerprint, first.fingerprint)
+        self.assertTrue(third.known_fix)
+        self.assertEqual(third.usage["total_tokens"], 0)
+
+        status = await get_bug_status(third.bug_id, db=self.db)
+        self.assertEqual(status.status, "fixed")
+        self.assertEqual(status.occurrences, 3)
+
+    async def test_failed_fix_is_not_reused(self):
+        with patch.object(agent_api, 'BugExorcistAgent') as MockAgent:
+            MockAgent.return_value.analyze_and_fix_with_retry = AsyncMock(return_value={
+                "success": False, "final_fix": None, "all_attempts": [],
+                "total_attempts": 3, "message": "Failed"
+            })
+            for _ in range(2):
+                await fix_bug_with_retry(
+                    RetryFixRequest(error_message="KeyError: 'id'", code_snippet="d['id']"),
+                    self.request, db=self.db
+                )
+        self.assertEqual(MockAgent.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import sys
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+from app.database import Base, apply_sqlite_pragmas
+from app.api.agent import list_bugs
+
+
+class TestBugList(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{tmp.name}/test.db")
+        event.listen(self.engine.sync_engine, "connect", apply_sqlite_pragmas)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            # 50 bugs, five per second, so pages split rows with equal timestamps
+            await conn.execute(text(
+                "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 50) "
+                "INSERT INTO bug_reports (id, description, status, fingerprint, created_at) "
+                "SELECT i, 'bug ' || i, CASE i % 2 WHEN 0 THEN 'fixed' ELSE 'open' END, 'fp' || (i % 5), "
+                "datetime('2026-01-01', '+' || (i / 5) || ' seconds') FROM n"
+            ))
+        self.db = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def collect(self, limit, **filters):
+        ids, cursor, pages = [], None, 0
+        while True:
+            page = await list_bugs(limit=limit, cursor=cursor, db=self.db, **filters)
+            ids.extend(bug.id for bug in page.bugs)
+            pages += 1
+            cursor = page.next_cursor
+            if cursor is None:
+                return ids, pages
+
+    async def test_cursor_walks_every_bug_once_newest_first(self):
+        ids, pages = await self.collect(limit=7)
+        self.assertEqual(ids, list(range(50, 0, -1)))
+        self.assertEqual(pages, 8)
+
+    async def test_filters(self):
+        ids, _ = await self.collect(limit=4, status="fixed")
+        self.assertEqual(ids, list(range(50, 0, -2)))
+
+        ids, _ = await self.collect(limit=4, fingerprint="fp3", status="open")
+        self.assertEqual(ids, [43, 33, 23, 13, 3])
+
+        ids, _ = await self.collect(
+            limit=100, created_after=datetime(2026, 1, 1, 0, 0, 2), created_before=datetime.fromisoformat("2026-01-01T00:00:04+00:00")
+        )
+        self.assertEqual(ids, list(range(19, 9, -1)))
+
+    async def test_count_estimate(self):
+        page = await list_bugs(limit=5, db=self.db)
+        self.assertIsNone(page.total_estimate)
+
+        page = await list_bugs(limit=5, include_count=True, db=self.db)
+        self.assertEqual((page.total_estimate, page.total_is_exact), (50, False))
+
+        page = await list_bugs(limit=5, status="open", include_count=True, db=self.db)
+        self.assertEqual((page.total_estimate, page.total_is_exact), (25, True))
+
+    async def test_skip_without_cursor_and_invalid_cursor(self):
+        page = await list_bugs(skip=45, limit=10, db=self.db)
+        self.assertEqual([bug.id for bug in page.bugs], [5, 4, 3, 2, 1])
+        self.assertIsNone(page.next_cursor)
+
+        with self.assertRaises(HTTPException) as ctx:
+            await list_bugs(cursor="not-a-cursor", db=self.db)
+        self.assertEqual(ctx.exception.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import sys
+import os
+import unittest
+
+# Add project root to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+from core.code_chunker import CodeChunker
+
+PYTHON_SOURCE = '''"""Billing helpers."""
+# Copyright (c) ACME
+import os
+from decimal import Decimal
+
+
+def total(items):
+    return sum(item.price for item in items)
+
+
+# Applies a percentage discount
+@cached
+def discount(amount, pct):
+    return amount * (1 - pct)
+
+
+class Cart:
+    def __init__(self):
+        self.items = []
+
+    def add(self, item):
+        self.items.append(item)
+'''
+
+JS_SOURCE = '''// Licensed under MIT
+'use strict';
+const db = require('./db');
+
+/** Loads a user */
+export async function getUser(id) {
+  return db.find(id);
+}
+
+export const handler = async (req, res) => {
+  res.send(await getUser(req.id));
+};
+'''
+
+
+class TestCodeChunker(unittest.TestCase):
+    def test_python_chunks_on_definitions(self):
+        chunks = CodeChunker(max_chars=120).chunk(PYTHON_SOURCE, "billing.py")
+        by_symbol = {chunk["symbol"]: chunk for chunk in chunks}
+
+        self.assertIn("discount", by_symbol)
+        discount = by_symbol["discount"]
+        # Leading comment and decorator stay with the function
+        self.assertTrue(discount["content"].startswith("# Applies a percentage discount\n@cached\ndef discount"))
+        self.assertEqual(discount["start_line"], 11)
+        self.assertEqual(discount["kind"], "function")
+
+        self.assertIn("Cart", by_symbol)
+        self.assertIn("def add", by_symbol["Cart"]["content"])
+
+    def test_import_block_is_dropped(self):
+        chunks = CodeChunker(max_chars=120).chunk(PYTHON_SOURCE, "billing.py")
+        self.assertFalse(any("import os" in chunk["content"] for chunk in chunks))
+
+    def test_small_units_are_merged(self):
+        chunks = CodeChunker(max_chars=2000).chunk(PYTHON_SOURCE, "billing.py")
+        symbols = [chunk["symbol"] for chunk in chunks]
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(symbols[0], "total, discount, Cart")
+
+    def test_oversized_class_is_split_by_method(self):
+        chunks = CodeChunker(max_chars=60).chunk(PYTHON_SOURCE, "billing.py")
+        symbols = [chunk["symbol"] for chunk in chunks]
+        self.assertIn("Cart.__init__", symbols)
+        self.assertIn("Cart.add", symbols)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk["content"]), 60 + 40)
+
+    def test_javascript_declarations(self):
+        chunks = CodeChunker(max_chars=100).chunk(JS_SOURCE, "users.js")
+        self.assertEqual([chunk["symbol"] for chunk in chunks], ["getUser", "handler"])
+        self.assertTrue(chunks[0]["content"].startswith("/** Loads a user */"))
+        self.assertEqual((chunks[1]["start_line"], chunks[1]["end_line"]), (10, 12))
+
+    def test_syntax_error_falls_back_to_text(self):
+        chunks = CodeChunker(fallback=lambda text: [text]).chunk("def broken(:\n    pass\n", "broken.py")
+        self.assertEqual(chunks[0]["kind"], "text")
+
+    def test_duplicate_chunks_are_removed(self):
+        source = "def a():\n    return 1\n\n\ndef a():\n    return 1\n"
+        chunks = CodeChunker(max_chars=25).chunk(source, "dup.py")
+        self.assertEqual(len(chunks), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
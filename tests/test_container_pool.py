@@ -0,0 +1,194 @@
+import sys
+import os
+import unittest
+import asyncio
+import shlex
+from unittest.mock import MagicMock, patch
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+import docker
+
+from app.container_pool import ContainerPool, POOL_TMPFS
+from app.sandbox import Sandbox, LANGUAGE_COMMANDS
+
+
+def make_client():
+    client = MagicMock()
+
+    def run_container(*args, **kwargs):
+        container = MagicMock()
+        container.status = "running"
+        container.exec_run.return_value = MagicMock(exit_code=0)
+        container.attrs = {"Config": {"WorkingDir": "/app"}}
+        return container
+
+    client.containers.run.side_effect = run_container
+    return client
+
+
+class TestContainerPool(unittest.TestCase):
+    def setUp(self):
+        self.client = make_client()
+        self.pool = ContainerPool(self.client, max_size=2, min_idle=1, idle_ttl=300)
+        self.spec = {"mem_limit": "512m", "nano_cpus": 500000000, "environment": {}, "volumes": {}}
+
+    def test_release_and_reuse(self):
+        first = self.pool.acquire("img", self.spec)
+        self.pool.release(first)
+        second = self.pool.acquire("img", self.spec)
+
+        self.assertIs(first, second)
+        self.assertEqual(self.client.containers.run.call_count, 1)
+        # Reset ran between uses
+        first.container.exec_run.assert_called_once()
+        metrics = self.pool.metrics()
+        self.assertEqual(metrics["hits"], 1)
+        self.assertEqual(metrics["misses"], 1)
+        self.assertEqual(metrics["in_use"], 1)
+
+    def test_size_bound(self):
+        self.pool.acquire("img", self.spec)
+        self.pool.acquire("img", self.spec)
+        self.assertIsNone(self.pool.acquire("img", self.spec))
+        self.assertEqual(self.pool.metrics()["rejected"], 1)
+
+    def test_spec_isolation(self):
+        a = self.pool.acquire("img", self.spec)
+        self.pool.release(a)
+        b = self.pool.acquire("img", {**self.spec, "mem_limit": "1g"})
+        self.assertIsNot(a, b)
+
+    def test_unhealthy_container_discarded(self):
+        pooled = self.pool.acquire("img", self.spec)
+        self.pool.release(pooled)
+        pooled.container.status = "exited"
+
+        replacement = self.pool.acquire("img", self.spec)
+        self.assertIsNot(pooled, replacement)
+        pooled.container.remove.assert_called_once_with(force=True)
+
+    def test_failed_reset_discards(self):
+        pooled = self.pool.acquire("img", self.spec)
+        pooled.container.exec_run.return_value = MagicMock(exit_code=1)
+        self.pool.release(pooled)
+        self.assertEqual(self.pool.metrics()["idle"], 0)
+        pooled.container.remove.assert_called_once_with(force=True)
+
+    def test_idle_eviction(self):
+        pooled = self.pool.acquire("img", self.spec)
+        self.pool.release(pooled)
+        pooled.last_used -= 301
+        self.assertEqual(self.pool.evict_idle(), 1)
+        self.assertEqual(self.pool.metrics()["idle"], 0)
+
+    def test_warm(self):
+        self.assertEqual(self.pool.warm("img", self.spec, count=2), 2)
+        self.assertEqual(self.pool.metrics()["idle"], 2)
+        # Already at capacity
+        self.assertEqual(self.pool.warm("img", self.spec, count=3), 0)
+
+    def test_root_filesystem_is_read_only_and_tmp_is_wiped(self):
+        pooled = self.pool.acquire("img", self.spec)
+        kwargs = self.client.containers.run.call_args.kwargs
+        self.assertTrue(kwargs["read_only"])
+        self.assertIn("/tmp", kwargs["tmpfs"])
+        self.assertEqual(kwargs["environment"]["HOME"], "/tmp")
+
+        self.pool.release(pooled)
+        reset = pooled.container.exec_run.call_args.args[0][-1]
+        self.assertIn("/tmp", reset)
+        self.assertIn("/sandbox", reset)
+
+    def test_maintain_evicts_and_refills_recently_used_keys(self):
+        pooled = self.pool.acquire("img", self.spec)
+        self.pool.release(pooled)
+        pooled.last_used -= 301
+
+        self.assertEqual(self.pool.maintain(), (1, 1))
+        self.assertEqual(self.pool.metrics()["idle"], 1)
+
+        # Nobody acquired this key for a whole TTL: it drains instead of being refilled
+        for key in self.pool._last_acquired:
+            self.pool._last_acquired[key] -= 301
+        for idle in self.pool._idle.values():
+            for p in idle:
+                p.last_used -= 301
+        self.assertEqual(self.pool.maintain(), (1, 0))
+        self.assertEqual(self.pool.metrics()["idle"], 0)
+        self.assertEqual(self.pool.maintain(), (0, 0))
+
+
+class TestSandboxPoolRouting(unittest.TestCase):
+    def setUp(self):
+        self.client = make_client()
+        with patch('docker.from_env', return_value=self.client):
+            self.sandbox = Sandbox()
+        self.sandbox.pool = ContainerPool(self.client, max_size=1)
+
+    def test_poolable_language_uses_exec(self):
+        with patch('app.sandbox.exec_with_stdin', return_value=(0, "ok\n")) as mock_exec:
+            result = asyncio.run(self.sandbox.run_code("print('ok')", language="python"))
+        self.assertEqual(result, "ok\n")
+        args, _ = mock_exec.call_args
+        self.assertEqual(args[3], b"print('ok')")
+        self.assertEqual(self.sandbox.pool.metrics()["idle"], 1)
+
+    def test_pooled_exec_runs_in_image_workdir(self):
+        with patch('app.sandbox.exec_with_stdin', return_value=(0, "ok\n")) as mock_exec:
+            asyncio.run(self.sandbox.run_code("console.log('ok')", language="javascript"))
+        self.assertEqual(mock_exec.call_args.kwargs["workdir"], "/app")
+
+    def test_pooled_rust_binary_is_built_on_an_exec_mount(self):
+        with patch('app.sandbox.exec_with_stdin', return_value=(0, "hi\n")) as mock_exec:
+            result = asyncio.run(self.sandbox.run_code("fn main() {}", language="rust"))
+        self.assertEqual(result, "hi\n")
+        command = mock_exec.call_args.args[2]
+        self.assertEqual(command, LANGUAGE_COMMANDS["rust"])
+
+        # The binary rustc writes (-o) is executed, so its tmpfs must not be noexec
+        words = shlex.split(command[2])
+        binary = words[words.index("-o") + 1]
+        self.assertEqual(words[-1], binary)
+        mount = max((m for m in POOL_TMPFS if binary.startswith(m + "/")), key=len)
+        self.assertIn("exec", POOL_TMPFS[mount].split(","))
+
+    def test_go_bypasses_pool(self):
+        with patch('app.sandbox.exec_with_stdin') as mock_exec:
+            asyncio.run(self.sandbox.run_code("package main", language="go"))
+        mock_exec.assert_not_called()
+
+    def test_project_test_runner_bypasses_pool(self):
+        with patch('app.sandbox.exec_with_stdin') as mock_exec:
+            asyncio.run(self.sandbox.run_code("test", language="cargo-test"))
+        mock_exec.assert_not_called()
+        args, kwargs = self.client.containers.run.call_args
+        self.assertEqual(kwargs['command'], ["/bin/sh", "-c", "cargo test"])
+
+
+class TestPooledRustInDocker(unittest.TestCase):
+    """Compiles and runs a Rust program in a real read-only pooled container."""
+    IMAGE = os.getenv("SANDBOX_RUST_TEST_IMAGE", "rust:1-slim")
+
+    def setUp(self):
+        try:
+            self.client = docker.from_env()
+            self.client.images.get(self.IMAGE)
+        except Exception:
+            self.skipTest(f"Docker or the {self.IMAGE} image is not available")
+        self.sandbox = Sandbox(image=self.IMAGE, client=self.client)
+        self.sandbox.pool = ContainerPool(self.client, max_size=1)
+        self.addCleanup(self.sandbox.pool.shutdown)
+
+    def test_compiled_binary_runs(self):
+        code = 'fn main() { println!("pooled {}", 6 * 7); }'
+        result = asyncio.run(self.sandbox.run_code(code, language="rust"))
+        self.assertEqual(result.strip(), "pooled 42")
+        self.assertEqual(self.sandbox.pool.metrics()["idle"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import sys
+import os
+import tempfile
+import unittest
+
+# Add project root to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+from langchain_core.embeddings import Embeddings
+from core.embedding_cache import EmbeddingCache, CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    model = "test-embedding"
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(t)), 0.5] for t in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 0.5]
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = EmbeddingCache(os.path.join(self.tmp.name, "embeddings.db"), max_entries=3)
+        self.provider = CountingEmbeddings()
+        self.embeddings = CachedEmbeddings(self.provider, self.cache)
+
+    def tearDown(self):
+        self.cache._conn.close()
+        self.tmp.cleanup()
+
+    def test_only_misses_reach_provider(self):
+        first = self.embeddings.embed_documents(["a", "bb"])
+        second = self.embeddings.embed_documents(["bb", "ccc", "a"])
+
+        self.assertEqual(self.provider.embedded, ["a", "bb", "ccc"])
+        self.assertEqual(first, [[1.0, 0.5], [2.0, 0.5]])
+        self.assertEqual(second, [[2.0, 0.5], [3.0, 0.5], [1.0, 0.5]])
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 3))
+
+    def test_keyed_by_model(self):
+        self.embeddings.embed_documents(["a"])
+        other = CachedEmbeddings(self.provider, self.cache, model="other-model")
+        other.embed_documents(["a"])
+        self.assertEqual(self.provider.embedded, ["a", "a"])
+
+    def test_size_eviction_drops_least_recently_used(self):
+        self.embeddings.embed_documents(["a", "bb", "ccc"])
+        self.cache._conn.execute("UPDATE embeddings SET last_access = last_access - 10")
+        self.embeddings.embed_documents(["a"])  # refresh "a"
+        self.embeddings.embed_documents(["dddd"])
+
+        self.assertEqual(self.cache.stats()["entries"], 3)
+        cached = self.cache.get_many(self.provider.model, ["a", "bb", "ccc", "dddd"])
+        self.assertEqual([v is not None for v in cached], [True, False, True, True])
+
+    def test_writes_keep_a_running_count_without_counting_rows(self):
+        statements = []
+        self.cache._conn.set_trace_callback(statements.append)
+        self.cache.put_many("m", ["a", "bb"], [[1.0], [2.0]])
+        # Overwriting an existing entry does not grow the count
+        self.cache.put_many("m", ["a", "a"], [[9.0], [9.0]])
+        self.cache._conn.set_trace_callback(None)
+
+        self.assertFalse([sql for sql in statements if "COUNT(" in sql.upper()])
+        self.assertEqual(self.cache._entries, 2)
+        self.assertEqual(self.cache.get_many("m", ["a"]), [[9.0]])
+
+        self.cache.put_many("m", ["ccc", "dddd"], [[3.0], [4.0]])
+        self.assertEqual(self.cache._entries, 3)
+        self.assertEqual(self.cache.stats()["entries"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import sys
+import os
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+from app.database import Base, apply_sqlite_pragmas
+from app import async_crud, jobs
+from app.jobs import JobQueue, QueueFullError
+
+
+PAYLOAD = {"error_message": "ZeroDivisionError: division by zero", "code_snippet": "1/0"}
+
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # Isolated in-memory app database
+        # File-backed, so concurrent sessions get their own connections as in production
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{tmp.name}/test.db")
+        event.listen(self.engine.sync_engine, "connect", apply_sqlite_pragmas)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.SessionLocal = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)
+        p = patch.object(jobs, 'AsyncSessionLocal', self.SessionLocal)
+        p.start()
+        self.addCleanup(p.stop)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def wait_for(self, queue, job_id, status="succeeded"):
+        for _ in range(200):
+            job = await queue.get(job_id)
+            if job["status"] == status:
+                return job
+            await asyncio.sleep(0.01)
+        self.fail(f"job {job_id} never reached {status}: {job}")
+
+    async def test_submit_returns_before_the_job_runs(self):
+        release = asyncio.Event()
+
+        async def runner(payload, secrets, rag=None):
+            await release.wait()
+            return {"success": True, "key": secrets.get("openai_api_key")}
+
+        queue = JobQueue(concurrency=1, runner=runner)
+        await queue.start()
+        try:
+            job = await queue.submit("fix_with_retry", PAYLOAD, secrets={"openai_api_key": "sk-test"})
+            self.assertEqual(job["status"], "queued")
+            self.assertTrue(job["bug_id"].startswith("BUG-"))
+            self.assertEqual(job["queue_depth"], 1)
+
+            await self.wait_for(queue, job["job_id"], "running")
+            release.set()
+            done = await self.wait_for(queue, job["job_id"])
+            self.assertEqual(done["result"], {"success": True, "key": "sk-test"})
+            self.assertIsNotNone(done["finished_at"])
+
+            # The API key is only held in memory
+            async with self.SessionLocal() as db:
+                self.assertNotIn("sk-test", (await async_crud.get_job(db, job["job_id"])).payload)
+        finally:
+            await queue.stop()
+
+    async def test_concurrency_is_bounded(self):
+        active = 0
+        peak = 0
+        release = asyncio.Event()
+
+        async def runner(payload, secrets, rag=None):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await release.wait()
+            await asyncio.sleep(0.01)
+            active -= 1
+            return {"success": True}
+
+        queue = JobQueue(concurrency=2, runner=runner)
+        await queue.start()
+        try:
+            ids = [(await queue.submit("fix_with_retry", PAYLOAD))["job_id"] for _ in range(5)]
+            await self.wait_for(queue, ids[1], "running")
+            release.set()
+            for job_id in ids:
+                await self.wait_for(queue, job_id)
+            self.assertEqual(peak, 2)
+        finally:
+            await queue.stop()
+
+    async def test_full_queue_rejects_submissions(self):
+        queue = JobQueue(concurrency=1, max_queued=2)
+        # Workers not started: jobs stay queued
+        await queue.submit("fix_with_retry", PAYLOAD)
+        await queue.submit("fix_with_retry", PAYLOAD)
+        with self.assertRaises(QueueFullError):
+            await queue.submit("fix_with_retry", PAYLOAD)
+
+    async def test_failed_job_stores_generic_error(self):
+        async def runner(payload, secrets, rag=None):
+            raise RuntimeError("secret internals")
+
+        queue = JobQueue(concurrency=1, runner=runner)
+        await queue.start()
+        try:
+            job_id = (await queue.submit("fix_with_retry", PAYLOAD))["job_id"]
+            failed = await self.wait_for(queue, job_id, "failed")
+            self.assertNotIn("secret internals", failed["error"])
+        finally:
+            await queue.stop()
+
+    async def test_interrupted_jobs_are_recovered_on_start(self):
+        async with self.SessionLocal() as db:
+            await async_crud.create_job(db, "queued-job", "fix_with_retry", PAYLOAD)
+            await async_crud.create_job(db, "running-job", "fix_with_retry", PAYLOAD)
+            await async_crud.update_job(db, "running-job", status="running")
+            await async_crud.create_job(db, "done-job", "fix_with_retry", PAYLOAD)
+            await async_crud.update_job(db, "done-job", status="succeeded", result={"success": True})
+
+        seen = []
+
+        async def runner(payload, secrets, rag=None):
+            seen.append(payload["code_snippet"])
+            return {"success": True}
+
+        queue = JobQueue(concurrency=1, runner=runner)
+        self.assertEqual(await queue.start(), 2)
+        try:
+            await self.wait_for(queue, "queued-job")
+            await self.wait_for(queue, "running-job")
+            self.assertEqual(len(seen), 2)
+        finally:
+            await queue.stop()
+
+    async def test_subscribers_receive_state_changes(self):
+        async def runner(payload, secrets, rag=None):
+            return {"success": True}
+
+        queue = JobQueue(concurrency=1, runner=runner)
+        job_id = (await queue.submit("fix_with_retry", PAYLOAD))["job_id"]
+        updates = queue.subscribe(job_id)
+        await queue.start()
+        try:
+            first = await asyncio.wait_for(updates.get(), 1)
+            second = await asyncio.wait_for(updates.get(), 1)
+            self.assertEqual([first["status"], second["status"]], ["running", "succeeded"])
+        finally:
+            queue.unsubscribe(job_id, updates)
+            await queue.stop()
+        self.assertEqual(queue._subscribers, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import sys
+import os
+import time
+import unittest
+
+# Add project root to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+
+from core.lexical_index import LexicalIndex, tokenize, reciprocal_rank_fusion
+
+
+class TestLexicalIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = LexicalIndex()
+        self.index.add("c1", "def calculate_total(items):\n    return sum(items)", "billing/cart.py")
+        self.index.add("c2", "class PaymentDeclinedError(Exception):\n    pass", "billing/errors.py")
+        self.index.add("c3", "def render_page(request):\n    return template", "web/views.py")
+
+    def test_tokenize_splits_identifiers(self):
+        tokens = tokenize("PaymentDeclinedError in calculate_total")
+        for token in ("paymentdeclinederror", "payment", "declined", "error", "calculate_total", "calculate", "total"):
+            self.assertIn(token, tokens)
+
+    def test_exact_symbol_ranks_first(self):
+        results = self.index.search('raise PaymentDeclinedError("card")', limit=3)
+        self.assertEqual(results[0][0], "c2")
+
+    def test_file_path_is_searchable(self):
+        results = self.index.search('File "web/views.py", line 3', limit=1)
+        self.assertEqual(results[0][0], "c3")
+
+    def test_remove_and_replace(self):
+        self.index.remove(["c2"])
+        self.assertEqual(self.index.search("PaymentDeclinedError"), [])
+        self.index.add("c1", "def apply_discount(): pass", "billing/cart.py")
+        self.assertEqual(self.index.search("calculate_total"), [])
+        self.assertEqual(len(self.index), 2)
+
+    def test_symbol_lookup_is_fast(self):
+        index = LexicalIndex()
+        for i in range(5000):
+            index.add(f"chunk-{i}", f"def handler_{i}(event):\n    return process_event(event, {i})", f"pkg/module_{i % 200}.py")
+        start = time.perf_counter()
+        results = index.search("handler_4321", limit=10)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(results[0][0], "chunk-4321")
+        self.assertLess(elapsed, 0.005)
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a", "d"]], k=60)
+        self.assertEqual(fused[:2], ["a", "c"])
+        self.assertEqual(set(fused), {"a", "b", "c", "d"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+from core.llm_cache import LLMResponseCache
+from core.agent import BugExorcistAgent
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = LLMResponseCache(os.path.join(self.tmp.name, "cache.db"), ttl_seconds=60, max_entries=2)
+
+    def tearDown(self):
+        self.cache._conn.close()
+        self.tmp.cleanup()
+
+    def test_key_is_content_addressed(self):
+        a = LLMResponseCache.make_key(model="m", user_prompt="p")
+        b = LLMResponseCache.make_key(user_prompt="p", model="m")
+        c = LLMResponseCache.make_key(model="m", user_prompt="q")
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+
+    def test_hit_and_miss_counters(self):
+        self.assertIsNone(self.cache.get("k"))
+        self.cache.set("k", {"result": 1})
+        self.assertEqual(self.cache.get("k"), {"result": 1})
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+
+    def test_ttl_expiry(self):
+        self.cache.set("k", {"result": 1})
+        self.cache._conn.execute("UPDATE llm_cache SET created_at = created_at - 120")
+        self.assertIsNone(self.cache.get("k"))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_lru_eviction(self):
+        self.cache.set("a", {"v": "a"})
+        self.cache.set("b", {"v": "b"})
+        # Touch "a" so "b" becomes least recently used
+        self.cache._conn.execute("UPDATE llm_cache SET last_access = last_access - 10 WHERE key = 'b'")
+        self.cache.get("a")
+        self.cache.set("c", {"v": "c"})
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("c"))
+
+
+class TestAnalyzeErrorCaching(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = LLMResponseCache(os.path.join(self.tmp.name, "cache.db"))
+
+        self.provider = MagicMock(spec=["ainvoke", "model_name"])
+        self.provider.model_name = "gpt-4o"
+        response = MagicMock()
+        response.content = "Root Cause: zero\n```python\nprint(1)\n```\nExplanation: fixed"
+        response.usage_metadata = {"input_tokens": 100, "output_tokens": 20}
+        self.provider.ainvoke = AsyncMock(return_value=response)
+
+    def tearDown(self):
+        self.cache._conn.close()
+        self.tmp.cleanup()
+
+    def make_agent(self, use_cache=True):
+        with patch('app.sandbox.Sandbox'), patch.object(BugExorcistAgent, '_init_provider', return_value=self.provider):
+            agent = BugExorcistAgent(bug_id="test-cache", use_cache=use_cache)
+        agent.rag = None
+        return agent
+
+    def test_repeated_bug_served_from_cache(self):
+        with patch('core.agent.get_llm_cache', return_value=self.cache):
+            first = asyncio.run(self.make_agent().analyze_error("ZeroDivisionError", "1/0"))
+            second = asyncio.run(self.make_agent().analyze_error("ZeroDivisionError", "1/0"))
+
+        self.assertEqual(self.provider.ainvoke.call_count, 1)
+        self.assertEqual(second["fixed_code"], first["fixed_code"])
+        self.assertEqual(second["provider_mode"], "cached")
+        self.assertEqual(second["usage"]["total_tokens"], 0)
+        self.assertEqual(second["usage"]["cached_usage"]["prompt_tokens"], 100)
+
+    def test_bypass_flag(self):
+        with patch('core.agent.get_llm_cache', return_value=self.cache):
+            asyncio.run(self.make_agent().analyze_error("ZeroDivisionError", "1/0"))
+            asyncio.run(self.make_agent(use_cache=False).analyze_error("ZeroDivisionError", "1/0"))
+
+        self.assertEqual(self.provider.ainvoke.call_count, 2)
+
+    def test_connection_test_is_never_answered_from_cache(self):
+        from app.api.agent import test_agent_connection
+
+        with patch('core.agent.get_llm_cache', return_value=self.cache):
+            # Warm the cache with the exact prompt the connection test sends
+            asyncio.run(self.make_agent().analyze_error(error_message="Test error", code_snippet="print('test')"))
+            self.assertEqual(self.cache.stats()["entries"], 1)
+
+            # The key has since been revoked
+            self.provider.ainvoke = AsyncMock(side_effect=RuntimeError("401 invalid api key"))
+            with patch('app.sandbox.Sandbox'), \
+                 patch.object(BugExorcistAgent, '_init_provider', return_value=self.provider):
+                result = asyncio.run(test_agent_connection())
+
+        self.provider.ainvoke.assert_called()
+        self.assertFalse(result.success)
+
+    def test_cache_runs_off_the_event_loop(self):
+        loop_threads, cache_threads = [], []
+        get, set_ = self.cache.get, self.cache.set
+
+        def record(method):
+            def wrapper(*args):
+                cache_threads.append(threading.get_ident())
+                return method(*args)
+            return wrapper
+
+        async def analyze():
+            loop_threads.append(threading.get_ident())
+            return await self.make_agent().analyze_error("ZeroDivisionError", "1/0")
+
+        with patch('core.agent.get_llm_cache', return_value=self.cache), \
+             patch.object(self.cache, "get", record(get)), patch.object(self.cache, "set", record(set_)):
+            asyncio.run(analyze())
+            asyncio.run(analyze())
+
+        self.assertEqual(len(cache_threads), 3)
+        self.assertFalse(set(cache_threads) & set(loop_threads))
+
+
+if __name__ == "__main__":
+    unittest.main()
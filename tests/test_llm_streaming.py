@@ -0,0 +1,148 @@
+import sys
+import os
+import asyncio
+import random
+from unittest.mock import MagicMock, AsyncMock, patch
+
+from langchain_core.messages import AIMessageChunk
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+from core.agent import BugExorcistAgent
+from core.response_parser import StreamingResponseParser
+
+RESPONSE = """Root Cause Analysis: the divisor can be zero.
+It is read from user input.
+
+```python
+def divide(a, b):
+    if b == 0:
+        return 0
+    return a / b  # good
+```
+
+Explanation: guard the zero divisor.
+"""
+
+
+class StreamingProvider:
+    """Chat model stand-in that streams a fixed response in small chunks."""
+
+    model_name = "streaming-fake"
+
+    def __init__(self, text, chunk_size=7, delay=0.01, tail_delay=0.3):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.tail_delay = tail_delay
+        self.invoked = 0
+
+    async def ainvoke(self, messages):
+        self.invoked += 1
+        response = MagicMock()
+        response.content = self.text
+        response.usage_metadata = {}
+        return response
+
+    async def astream(self, messages):
+        closing_newline = self.text.index("```\n", self.text.index("```python") + 3) + 3
+        for i in range(0, len(self.text), self.chunk_size):
+            await asyncio.sleep(self.delay)
+            yield AIMessageChunk(content=self.text[i:i + self.chunk_size])
+            # Pause once the code fence has closed, as if the model were still writing the explanation
+            if i <= closing_newline < i + self.chunk_size:
+                await asyncio.sleep(self.tail_delay)
+
+
+def make_agent(provider):
+    with patch('app.sandbox.Sandbox'), patch.object(BugExorcistAgent, '_init_provider'):
+        agent = BugExorcistAgent(bug_id="test-stream")
+    agent.primary_provider = provider
+    agent.secondary_provider = None
+    agent.primary_agent_type = "gpt-4o"
+    agent.rag = None
+    agent.use_cache = False
+    agent.sandbox = MagicMock()
+    agent.sandbox.build_image = AsyncMock()
+    agent.sandbox.close = AsyncMock()
+    return agent
+
+
+def test_incremental_parse_matches_full_parse():
+    with patch('app.sandbox.Sandbox'), patch.object(BugExorcistAgent, '_init_provider'):
+        agent = BugExorcistAgent(bug_id="test-stream")
+    expected = agent._parse_ai_response(RESPONSE, "original")
+
+    rng = random.Random(7)
+    for _ in range(20):
+        parser = StreamingResponseParser()
+        events = []
+        position = 0
+        while position < len(RESPONSE):
+            step = rng.randint(1, 12)
+            events.extend(parser.feed(RESPONSE[position:position + step]))
+            position += step
+        events.extend(parser.close())
+
+        assert parser.result("original") == expected
+        assert "".join(e["text"] for e in events if e["kind"] == "delta") == RESPONSE
+        sections = [e["section"] for e in events if e["kind"] == "section"]
+        assert sections == ["root_cause", "code", None, "explanation"]
+        completed = [e["code"] for e in events if e["kind"] == "code_complete"]
+        assert completed == [expected["fixed_code"]]
+
+
+async def test_stream_events_and_early_verification():
+    provider = StreamingProvider(RESPONSE)
+    agent = make_agent(provider)
+    loop = asyncio.get_running_loop()
+    timeline = {}
+
+    async def verify(fixed_code, original_error=None, language="python"):
+        timeline.setdefault("verify_started", loop.time())
+        timeline["verify_calls"] = timeline.get("verify_calls", 0) + 1
+        return {"verified": "good" in fixed_code, "output": "", "new_error": None, "timestamp": "now"}
+
+    agent.verify_fix = verify
+
+    async def on_stream_event(attempt_num, stream_event):
+        if stream_event["kind"] == "delta":
+            timeline.setdefault("first_delta", loop.time())
+        return {"type": "thought", "data": {"attempt": attempt_num, **stream_event}}
+
+    start = loop.time()
+    streamed = []
+    result = None
+    async for event in agent._execute_retry_logic(
+        error_message="ZeroDivisionError", code_snippet="code", max_attempts=1,
+        on_stream_event=on_stream_event
+    ):
+        if "success" in event:
+            result = event
+            timeline["done"] = loop.time()
+        else:
+            streamed.append(event)
+
+    assert result["success"] is True
+    assert provider.invoked == 0
+    assert streamed and all(e["data"]["attempt"] == 1 for e in streamed)
+    # Output reaches the caller long before the completion ends
+    assert timeline["first_delta"] - start < 0.1
+    # Verification started while the explanation was still streaming, and was not repeated
+    assert timeline["verify_started"] < timeline["done"] - 0.2
+    assert timeline["verify_calls"] == 1
+    assert result["all_attempts"][0]["fix_result"]["usage"]["completion_tokens"] > 0
+
+
+async def test_rest_path_does_not_stream():
+    provider = StreamingProvider(RESPONSE)
+    agent = make_agent(provider)
+    agent.verify_fix = AsyncMock(return_value={"verified": True, "output": "", "new_error": None, "timestamp": "now"})
+
+    result = await agent.analyze_and_fix_with_retry(error_message="err", code_snippet="code", max_attempts=1)
+
+    assert result["success"] is True
+    assert provider.invoked == 1
@@ -0,0 +1,126 @@
+import sys
+import os
+import json
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+from app.database import Base
+from app import crud, migrations, models
+
+
+# Shape of the tables before referenced files and fingerprints existed
+LEGACY_SCHEMA = [
+    """CREATE TABLE bug_reports (id INTEGER PRIMARY KEY, description TEXT, status VARCHAR,
+       created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME)""",
+    """CREATE TABLE sessions (id VARCHAR PRIMARY KEY, bug_report_id INTEGER, prompt_tokens INTEGER DEFAULT 0,
+       completion_tokens INTEGER DEFAULT 0, total_tokens INTEGER DEFAULT 0, estimated_cost VARCHAR DEFAULT '0.0',
+       created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME)""",
+]
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.engine = create_engine(f"sqlite:///{tmp.name}/test.db")
+        self.addCleanup(self.engine.dispose)
+
+    def upgrade(self):
+        Base.metadata.create_all(bind=self.engine)
+        with self.engine.connect() as conn:
+            return migrations.upgrade(conn)
+
+    def test_legacy_database_is_upgraded_and_backfilled(self):
+        with self.engine.begin() as conn:
+            for statement in LEGACY_SCHEMA:
+                conn.execute(text(statement))
+            conn.execute(text("INSERT INTO bug_reports (id, description, status) VALUES (1, 'boom', 'fixed')"))
+            conn.execute(text(
+                "INSERT INTO sessions (id, bug_report_id, prompt_tokens, completion_tokens, total_tokens, estimated_cost) "
+                "VALUES ('s1', 1, 100, 50, 150, '0.002500'), ('s2', 1, 0, 0, 0, '0.0')"
+            ))
+        # An intermediate release already had the JSON column
+        with self.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE sessions ADD COLUMN referenced_files TEXT"))
+            conn.execute(text("UPDATE sessions SET referenced_files = :files WHERE id = 's1'"),
+                         {"files": json.dumps(["a.py", "b.py", "a.py"])})
+
+        self.assertEqual(self.upgrade(), len(migrations.MIGRATIONS))
+
+        db = sessionmaker(bind=self.engine)()
+        self.addCleanup(db.close)
+        self.assertEqual(crud.get_session_files(db, "s1"), ["a.py", "b.py"])
+        self.assertEqual(crud.get_sessions_for_file(db, "b.py"), ["s1"])
+        self.assertEqual(crud.get_session_usage(db, "s1")["total_tokens"], 150)
+        events = db.query(models.UsageEvent).all()
+        self.assertEqual([(e.session_id, e.prompt_tokens, e.completion_tokens) for e in events], [("s1", 100, 50)])
+        self.assertAlmostEqual(events[0].estimated_cost, 0.0025)
+        self.assertIsNone(db.query(models.BugReport).one().fingerprint)
+
+        # Re-running is a no-op
+        self.assertEqual(self.upgrade(), len(migrations.MIGRATIONS))
+        self.assertEqual(db.query(models.UsageEvent).count(), 1)
+
+    def test_unversioned_current_database_is_not_backfilled_twice(self):
+        Base.metadata.create_all(bind=self.engine)
+        db = sessionmaker(bind=self.engine)()
+        self.addCleanup(db.close)
+        crud.create_session(db, "s1", bug_report_id=1)
+        crud.update_session_usage(db, "s1", 10, 5, 0.001, model="gpt-4o", attempt=1)
+
+        self.upgrade()
+        self.assertEqual(db.query(models.UsageEvent).count(), 1)
+
+    def test_indexes_exist(self):
+        self.upgrade()
+        with self.engine.connect() as conn:
+            indexes = {row[1] for row in conn.execute(text("SELECT type, name FROM sqlite_master WHERE type = 'index'"))}
+        self.assertTrue({"ix_usage_events_session_created", "ix_usage_events_created_model",
+                         "ix_session_files_file_session", "ix_bug_reports_fingerprint"} <= indexes)
+
+
+class TestUsageQueries(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.addCleanup(self.engine.dispose)
+        self.addCleanup(self.db.close)
+        crud.create_session(self.db, "s1", bug_report_id=1)
+
+    def test_usage_is_summarized_per_model(self):
+        crud.apply_session_updates(self.db, "s1", usage=[
+            {"prompt_tokens": 10, "completion_tokens": 5, "estimated_cost": 0.01, "model": "gpt-4o", "attempt": 1},
+            {"prompt_tokens": 20, "completion_tokens": 5, "estimated_cost": 0.02, "model": "gpt-4o", "attempt": 2},
+        ], files=["x.py"])
+        crud.update_session_usage(self.db, "s1", 7, 3, 0.0, model="llama3", attempt=3)
+
+        usage = crud.get_session_usage(self.db, "s1")
+        self.assertEqual((usage["calls"], usage["prompt_tokens"], usage["completion_tokens"], usage["total_tokens"]),
+                         (3, 37, 13, 50))
+        self.assertAlmostEqual(usage["estimated_cost"], 0.03)
+        # The deprecated string total on sessions is left alone
+        self.assertEqual(crud.get_session(self.db, "s1").estimated_cost, "0.00")
+
+        summary = {row["model"]: row for row in crud.get_usage_summary(self.db)}
+        self.assertEqual(summary["gpt-4o"]["calls"], 2)
+        self.assertEqual(summary["gpt-4o"]["prompt_tokens"], 30)
+        self.assertAlmostEqual(summary["gpt-4o"]["estimated_cost"], 0.03)
+        self.assertEqual(summary["llama3"]["completion_tokens"], 3)
+
+        tomorrow = datetime.now() + timedelta(days=1)
+        self.assertEqual(crud.get_usage_summary(self.db, since=tomorrow), [])
+        self.assertEqual(crud.get_sessions_for_file(self.db, "x.py"), ["s1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import sys
+import os
+import asyncio
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+import app.network_pool as network_pool
+from app.network_pool import NetworkPool, collect_orphan_networks, PROCESS_OWNER, SESSION_LABEL, OWNER_LABEL
+from app.sandbox import Sandbox, reap_orphan_networks
+from app.sandbox_utils import SandboxManifest
+
+
+def make_network(network_id, owner=PROCESS_OWNER, created="2020-01-01T00:00:00.000000000Z", containers=None):
+    network = MagicMock()
+    network.id = network_id
+    network.name = f"net-{network_id}"
+    network.attrs = {
+        "Created": created,
+        "Containers": containers or {},
+        "Labels": {SESSION_LABEL: network_id, OWNER_LABEL: owner} if owner else {SESSION_LABEL: network_id}
+    }
+    return network
+
+
+class TestNetworkPool(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(network_pool, "_network_pool", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = MagicMock()
+        self.created = []
+
+        def create(name, **kwargs):
+            network = make_network(name)
+            self.created.append(network)
+            return network
+
+        self.client.networks.create.side_effect = create
+        sidecar = MagicMock(status="running")
+        exec_container = MagicMock()
+        exec_container.wait.return_value = {"StatusCode": 0}
+        exec_container.logs.return_value = b"ok"
+        self.client.containers.run.side_effect = \
+            lambda image, **kwargs: sidecar if kwargs.get("name", "").startswith("sidecar-") else exec_container
+
+    def make_sandbox(self, services=True):
+        sandbox = Sandbox(client=self.client)
+        if services:
+            sandbox.manifest = SandboxManifest(services=[{"name": "redis", "image": "redis:7"}])
+        sandbox._wait_for_service_health = AsyncMock(return_value=True)
+        return sandbox
+
+    def exec_network(self):
+        calls = [c for c in self.client.containers.run.call_args_list if not c.kwargs.get("name")]
+        return calls[-1].kwargs["network"]
+
+    def test_no_network_until_sidecars_need_one(self):
+        sandbox = self.make_sandbox(services=False)
+        self.client.networks.create.assert_not_called()
+
+        asyncio.run(sandbox.run_code("print(1)"))
+        self.client.networks.create.assert_not_called()
+        self.assertEqual(self.exec_network(), "none")
+
+    def test_sessions_reuse_pooled_network(self):
+        first = self.make_sandbox()
+        asyncio.run(first.run_code("print(1)"))
+        network = first.network
+        self.assertEqual(self.exec_network(), network.name)
+        asyncio.run(first.close())
+        self.assertIsNone(first.network)
+        network.remove.assert_not_called()
+
+        second = self.make_sandbox()
+        asyncio.run(second.run_code("print(1)"))
+        self.assertIs(second.network, network)
+        self.assertEqual(self.client.networks.create.call_count, 1)
+
+    def test_reference_counted_release(self):
+        sandbox = self.make_sandbox()
+        with patch.dict(os.environ, {"SANDBOX_NETWORK_POOL_SIZE": "0"}):
+            network = sandbox._acquire_network()
+            self.assertIs(sandbox._acquire_network(), network)
+            sandbox._release_network()
+            network.remove.assert_not_called()
+            sandbox._release_network()
+        network.remove.assert_called_once()
+        self.assertIsNone(sandbox.network)
+
+    def test_session_ids_are_unique(self):
+        ids = {Sandbox(client=self.client).session_id for _ in range(50)}
+        self.assertEqual(len(ids), 50)
+
+    def test_busy_network_is_not_pooled(self):
+        pool = NetworkPool(self.client, max_idle=2)
+        network = pool.acquire()
+        network.attrs["Containers"] = {"abc": {}}
+        pool.release(network)
+        network.remove.assert_called_once()
+        self.assertEqual(pool.metrics()["idle"], 0)
+
+
+class TestOrphanCollection(unittest.TestCase):
+    def test_collects_only_unowned_networks(self):
+        client = MagicMock()
+        live = make_network("live")
+        orphan = make_network("orphan")
+        young = make_network("young", created="2999-01-01T00:00:00Z")
+        busy = make_network("busy", containers={"c1": {}})
+        dead_owner = make_network("dead", owner=f"{PROCESS_OWNER.rpartition(':')[0]}:999999999")
+        legacy = make_network("legacy", owner=None)
+        other_host = make_network("remote", owner="other-host:1")
+        networks = [live, orphan, young, busy, dead_owner, legacy, other_host]
+        client.networks.list.return_value = networks
+
+        removed = collect_orphan_networks(client, ["live"], grace_seconds=60)
+
+        self.assertEqual(removed, 3)
+        for network in (orphan, dead_owner, legacy):
+            network.remove.assert_called_once()
+        for network in (live, young, busy, other_host):
+            network.remove.assert_not_called()
+        client.networks.list.assert_called_once_with(filters={"label": SESSION_LABEL}, greedy=True)
+
+    def test_janitor_keeps_held_networks(self):
+        client = MagicMock()
+        held = make_network("held")
+        client.networks.create.return_value = held
+        client.networks.list.return_value = [held]
+        with patch.object(network_pool, "_network_pool", None), \
+                patch.dict(os.environ, {"SANDBOX_NETWORK_POOL_SIZE": "0"}):
+            sandbox = Sandbox(client=client)
+            sandbox._acquire_network()
+            self.assertEqual(reap_orphan_networks(client, grace_seconds=0), 0)
+            sandbox._release_network()
+        held.remove.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
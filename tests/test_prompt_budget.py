@@ -0,0 +1,104 @@
+import sys
+import os
+import unittest
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+from core.prompt_budget import PromptBuilder, TokenCounter, trim_traceback, cap_context
+
+TRACE = """Traceback (most recent call last):
+  File "/app/src/main.py", line 12, in <module>
+    run()
+  File "/usr/lib/python3.11/site-packages/requests/api.py", line 59, in get
+    return request("get", url)
+  File "/app/src/billing.py", line 4, in total
+    return a / b
+ZeroDivisionError: division by zero"""
+
+
+def make_attempts(count, size=400):
+    return [
+        {
+            "fixed_code": f"def fix_{i}():\n" + "    value = compute()\n" * size,
+            "verification_result": "FAILED",
+            "new_error": f"ValueError: attempt {i} failed"
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+class TestPromptBudget(unittest.TestCase):
+    def build(self, builder, **overrides):
+        kwargs = dict(
+            system_prompt="You are a debugger.",
+            error_message=TRACE,
+            code_snippet="def total(a, b):\n    return a / b\n",
+            language="python",
+            rag_context="--- File: src/billing.py ---\ndef total(a, b):\n    return a / b\n"
+        )
+        kwargs.update(overrides)
+        return builder.build(**kwargs)
+
+    def test_under_budget_keeps_everything(self):
+        attempts = make_attempts(2, size=2)
+        prompt, report = self.build(PromptBuilder(budget=100000), previous_attempts=attempts)
+        self.assertEqual(report["truncation"], [])
+        self.assertIn("site-packages", prompt)
+        self.assertIn("def fix_1", prompt)
+        self.assertIn("**RETRY ATTEMPT #3**", prompt)
+        self.assertEqual(report["budget"], 100000)
+        for section in ("error", "code", "context", "attempts", "instructions", "system", "total"):
+            self.assertIn(section, report["sections"])
+
+    def test_older_attempts_summarized_first(self):
+        attempts = make_attempts(4)
+        counter = TokenCounter()
+        latest = counter.count(attempts[-1]["fixed_code"])
+        prompt, report = self.build(PromptBuilder(budget=latest + 1500), previous_attempts=attempts)
+        self.assertEqual(report["truncation"], ["older_attempts_summarized"])
+        self.assertNotIn("def fix_1", prompt)
+        self.assertIn("Attempt 1 (summarized)", prompt)
+        self.assertIn("**Final Error:** ValueError: attempt 1 failed", prompt)
+        self.assertIn("def fix_4", prompt)
+        self.assertLessEqual(report["sections"]["total"], latest + 1500)
+
+    def test_tight_budget_is_enforced(self):
+        attempts = make_attempts(5)
+        context = "".join(f"--- File: src/m{i}.py ---\n" + "x = 1\n" * 200 for i in range(10))
+        prompt, report = self.build(
+            PromptBuilder(budget=1200, rag_max_tokens=100000),
+            previous_attempts=attempts,
+            rag_context=context,
+            code_snippet="line = 1\n" * 2000
+        )
+        self.assertLessEqual(report["sections"]["total"], 1200)
+        self.assertIn("code_truncated", report["truncation"])
+        self.assertIn("ZeroDivisionError: division by zero", prompt)
+
+    def test_context_cap_keeps_whole_blocks(self):
+        counter = TokenCounter()
+        blocks = [f"--- File: src/m{i}.py ---\n" + "x = 1\n" * 50 for i in range(5)]
+        capped = cap_context("".join(blocks), counter.count(blocks[0]) * 2 + 5, counter)
+        self.assertIn("src/m1.py", capped)
+        self.assertNotIn("src/m2.py", capped)
+        self.assertIn("3 context block(s) omitted", capped)
+
+    def test_trim_traceback_drops_library_frames(self):
+        trimmed = trim_traceback(TRACE)
+        self.assertNotIn("site-packages", trimmed)
+        self.assertNotIn('request("get", url)', trimmed)
+        self.assertIn("/app/src/billing.py", trimmed)
+        self.assertIn("return a / b", trimmed)
+        self.assertIn("[1 library frames omitted]", trimmed)
+
+    def test_error_attempts_without_code(self):
+        attempts = [{"verification_result": "ERROR", "error": "provider timeout"}]
+        prompt, _ = self.build(PromptBuilder(), previous_attempts=attempts)
+        self.assertIn("**Error:** provider timeout", prompt)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+import core.provider_registry as registry_module
+from core.provider_registry import ProviderRegistry
+from core.agent import BugExorcistAgent, MockLLM
+
+ENV = {
+    "OPENAI_API_KEY": "sk-test",
+    "PRIMARY_AGENT": "gpt-4o",
+    "SECONDARY_AGENT": "gpt-4o",
+    "ENABLE_RAG": "false",
+    "ALLOW_MOCK_LLM": "false"
+}
+
+
+class TestProviderRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ProviderRegistry()
+        patcher = patch.object(registry_module, "_provider_registry", self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: asyncio.run(self.registry.aclose()))
+
+    def test_get_or_create_is_lazy_and_shared(self):
+        factory = MagicMock(side_effect=lambda: object())
+        first = self.registry.get_or_create(("llm", "x"), factory)
+        second = self.registry.get_or_create(("llm", "x"), factory)
+        self.assertIs(first, second)
+        self.assertEqual(factory.call_count, 1)
+
+        self.registry.get_or_create(("llm", "y"), lambda: None, cache=lambda instance: instance is not None)
+        self.assertEqual(self.registry.stats()["instances"], {"llm": 1})
+
+    def test_cache_is_bounded_and_closes_evicted_instances(self):
+        registry = ProviderRegistry(max_instances=2)
+        closed = []
+        for name in ("a", "b", "c"):
+            registry.get_or_create(("rag", name), lambda name=name: name, close=closed.append)
+        self.assertEqual(closed, ["a"])
+
+        # Lookups refresh recency; pinned instances are skipped
+        registry.get_or_create(("rag", "b"), lambda: "b2")
+        registry.get_or_create(("rag", "p"), lambda: "p", close=closed.append, pin=True)
+        registry.get_or_create(("rag", "d"), lambda: "d", close=closed.append)
+        self.assertEqual(closed, ["a", "c", "b"])
+        self.assertEqual(registry.stats()["instances"], {"rag": 2})
+
+    def test_factory_runs_outside_the_lock_once_per_key(self):
+        release = threading.Event()
+        calls = []
+
+        def slow_factory():
+            calls.append(1)
+            release.wait(5)
+            return object()
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.registry.get_or_create(("llm", "slow"), slow_factory)))
+                   for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        # Another key is served while the slow one is still being built
+        start = time.perf_counter()
+        self.registry.get_or_create(("llm", "fast"), object)
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({id(r) for r in results}), 1)
+
+    def test_failed_factory_is_not_cached(self):
+        with self.assertRaises(RuntimeError):
+            self.registry.get_or_create(("llm", "bad"), MagicMock(side_effect=RuntimeError("down")))
+        self.assertEqual(self.registry.get_or_create(("llm", "bad"), lambda: "ok"), "ok")
+
+    def test_agents_share_provider_clients(self):
+        with patch.dict(os.environ, ENV):
+            first = BugExorcistAgent(bug_id="a")
+            start = time.perf_counter()
+            for i in range(20):
+                agent = BugExorcistAgent(bug_id=f"b{i}")
+            per_agent = (time.perf_counter() - start) / 20
+
+        self.assertIs(first.primary_provider, agent.primary_provider)
+        self.assertIs(first.primary_provider.root_async_client, agent.primary_provider.root_async_client)
+        # Both OpenAI models use the registry's keep-alive pool
+        self.assertIs(first.primary_provider.http_async_client, self.registry.http_clients()[1])
+        # No sandbox or Docker client is created until verification needs one
+        self.assertIsNone(agent._sandbox)
+        self.assertFalse(self.registry.stats()["docker"])
+        self.assertLess(per_agent, 0.005)
+
+    def test_api_key_changes_create_separate_clients(self):
+        with patch.dict(os.environ, ENV):
+            default = BugExorcistAgent(bug_id="a")
+            custom = BugExorcistAgent(bug_id="b", openai_api_key="sk-other")
+        self.assertIsNot(default.primary_provider, custom.primary_provider)
+
+    def test_mock_providers_are_not_shared(self):
+        with patch.dict(os.environ, {**ENV, "OPENAI_API_KEY": "", "ALLOW_MOCK_LLM": "true"}):
+            agent = BugExorcistAgent(bug_id="a")
+        self.assertIsInstance(agent.primary_provider, MockLLM)
+        self.assertEqual(self.registry.stats()["instances"], {})
+
+        with patch.dict(os.environ, {**ENV, "OPENAI_API_KEY": ""}):
+            with self.assertRaises(ValueError):
+                BugExorcistAgent(bug_id="b")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import sys
+import os
+import asyncio
+from unittest.mock import MagicMock, AsyncMock, patch
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+from core.agent import BugExorcistAgent
+
+
+class FakeProvider:
+    """Minimal chat model stand-in: returns a fixed code fence after a delay."""
+
+    def __init__(self, model_name, code, delay, cost_tokens=0):
+        self.model_name = model_name
+        self.code = code
+        self.delay = delay
+        self.cost_tokens = cost_tokens
+        self.calls = 0
+        self.cancelled = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        response = MagicMock()
+        response.content = f"Root Cause: test\n```python\n{self.code}\n```\nExplanation: test"
+        response.usage_metadata = {"input_tokens": self.cost_tokens, "output_tokens": 0}
+        return response
+
+
+def make_agent(primary, secondary):
+    with patch('app.sandbox.Sandbox'), patch.object(BugExorcistAgent, '_init_provider'):
+        agent = BugExorcistAgent(bug_id="test-race")
+    agent.primary_provider = primary
+    agent.secondary_provider = secondary
+    agent.primary_agent_type = "gpt-4o"
+    agent.rag = None
+    agent.sandbox = MagicMock()
+    agent.sandbox.build_image = AsyncMock()
+    agent.sandbox.close = AsyncMock()
+    agent.sandbox.manifest.services = []
+
+    async def verify(fixed_code, original_error=None, language="python", sandbox=None):
+        ok = "good" in fixed_code
+        return {"verified": ok, "output": "", "new_error": None if ok else "boom", "timestamp": "now"}
+
+    agent.verify_fix = verify
+    return agent
+
+
+async def test_race_returns_first_verified_fix():
+    slow_bad = FakeProvider("primary", "print('bad')", delay=0.5)
+    fast_good = FakeProvider("secondary", "print('good')", delay=0.05)
+    agent = make_agent(slow_bad, fast_good)
+
+    result = await agent.analyze_and_fix_with_retry(
+        error_message="err", code_snippet="code", max_attempts=2, race=True
+    )
+
+    assert result['success'] is True
+    assert result['mode'] == "race"
+    assert "good" in result['final_fix']['fixed_code']
+    # The slower candidate was cancelled rather than awaited
+    assert slow_bad.cancelled == 1
+    agent.sandbox.close.assert_awaited()
+
+
+async def test_race_respects_cost_ceiling():
+    # Primary is fast, fails verification and costs 1M prompt tokens (~$5)
+    expensive = FakeProvider("primary", "print('bad')", delay=0.01, cost_tokens=1_000_000)
+    slow = FakeProvider("secondary", "print('good')", delay=0.5)
+    agent = make_agent(expensive, slow)
+
+    result = await agent.analyze_and_fix_with_retry(
+        error_message="err", code_snippet="code", max_attempts=2, race=True, max_cost=1.0
+    )
+
+    assert result['success'] is False
+    assert result['cost_ceiling_hit'] is True
+    # Sent one at a time until a cost is known, so the second request never went out
+    assert slow.calls == 0
+    assert result['total_attempts'] == 1
+
+
+async def test_race_launches_within_estimated_budget():
+    # Every call costs $1 (200k prompt tokens); nothing verifies
+    provider = FakeProvider("primary", "print('bad')", delay=0.01, cost_tokens=200_000)
+    agent = make_agent(provider, None)
+
+    result = await agent.analyze_and_fix_with_retry(
+        error_message="err", code_snippet="code", max_attempts=4, race=True, max_cost=2.5
+    )
+
+    # $1 spent after the first call; a third call would exceed the budget
+    assert provider.calls == 2
+    assert result['cost_ceiling_hit'] is True
+    assert result['estimated_cost'] <= 2.5
+
+
+async def test_race_isolates_sandboxes_when_services_are_declared():
+    agent = make_agent(FakeProvider("primary", "print('bad')", delay=0.01),
+                       FakeProvider("secondary", "print('bad')", delay=0.01))
+    agent.sandbox.manifest.services = [{"name": "redis", "image": "redis:7"}]
+    agent.sandbox.image = "bug-exorcist-project:abc"
+    created = []
+
+    def create_sandbox():
+        sandbox = MagicMock()
+        sandbox.close = AsyncMock()
+        created.append(sandbox)
+        return sandbox
+
+    used = []
+
+    async def verify(fixed_code, original_error=None, language="python", sandbox=None):
+        used.append(sandbox)
+        return {"verified": False, "output": "", "new_error": "boom", "timestamp": "now"}
+
+    agent._create_sandbox = create_sandbox
+    agent.verify_fix = verify
+
+    await agent.analyze_and_fix_with_retry(error_message="err", code_snippet="code", max_attempts=2, race=True)
+
+    assert len(created) == 2
+    assert set(map(id, used)) == set(map(id, created))
+    for sandbox in created:
+        assert sandbox.image == "bug-exorcist-project:abc"
+        sandbox.close.assert_awaited()
+
+
+async def test_race_streams_callbacks():
+    agent = make_agent(FakeProvider("primary", "print('good')", delay=0.01), None)
+    agent.sandbox.get_diagnostics = AsyncMock(return_value={"env": {}})
+
+    events = [event async for event in agent.stream_thought_process(
+        error_message="err", code_snippet="code", max_attempts=1, race=True
+    )]
+
+    messages = [e.get("message", "") for e in events]
+    assert any("Attempt 1/1" in m for m in messages)
+    assert events[-1]["type"] == "result"
+    assert events[-1]["data"]["success"] is True
+
+
+if __name__ == "__main__":
+    asyncio.run(test_race_returns_first_verified_fix())
+    asyncio.run(test_race_respects_cost_ceiling())
+    asyncio.run(test_race_launches_within_estimated_budget())
+    asyncio.run(test_race_isolates_sandboxes_when_services_are_declared())
+    asyncio.run(test_race_streams_callbacks())
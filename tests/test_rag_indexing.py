@@ -0,0 +1,282 @@
+import sys
+import os
+import asyncio
+import hashlib
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from langchain_core.embeddings import Embeddings
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+from core.rag_engine import CodebaseRAG
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic local embeddings that record every text they embed."""
+
+    def __init__(self):
+        self.embedded: list = []
+        self.batches: list = []
+        self.queries: list = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _vector(text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [byte / 255 for byte in digest[:16]]
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+            self.embedded.extend(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return self._vector(text)
+
+
+class SlowFlakyEmbeddings(FakeEmbeddings):
+    """Takes a moment per batch, tracks concurrent calls and fails the first `failures` calls."""
+
+    def __init__(self, failures=0, delay=0.05):
+        super().__init__()
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls += 1
+            fail = self.calls <= self.failures
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            threading.Event().wait(self.delay)
+            if fail:
+                raise ConnectionError("rate limited")
+            return super().embed_documents(texts)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+RAG_ENV = {
+    "RAG_EMBEDDING_PROVIDER": "openai",
+    "ENABLE_EMBEDDING_CACHE": "false",
+    "RAG_HYBRID_SEARCH": "false",
+    # One chunk per test function
+    "RAG_CHUNK_MAX_CHARS": "40",
+}
+
+
+class RagTestCase(unittest.TestCase):
+    env: dict = {}
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name) / "project"
+        self.root.mkdir()
+        self.persist = str(Path(tmp.name) / "index")
+        self.embeddings = self.make_embeddings()
+
+        with patch.dict(os.environ, {**RAG_ENV, **self.env}), \
+             patch("core.rag_engine.OpenAIEmbeddings", return_value=self.embeddings):
+            self.rag = CodebaseRAG(str(self.root), persist_directory=self.persist)
+        self.addCleanup(self.rag.close)
+
+    def make_embeddings(self):
+        return FakeEmbeddings()
+
+    def write(self, rel_path, content):
+        path = self.root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        return path
+
+    def stored(self):
+        """{source: sorted chunk texts} currently in the vector store."""
+        data = self.rag.vector_store.get(include=["documents", "metadatas"])
+        stored = {}
+        for text, metadata in zip(data["documents"], data["metadatas"]):
+            stored.setdefault(metadata["source"], []).append(text)
+        return {source: sorted(texts) for source, texts in stored.items()}
+
+
+def functions(*names):
+    return "\n\n".join(f"def {name}():\n    return {name!r}\n" for name in names)
+
+
+class TestIncrementalIndexing(RagTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("a.py", functions("alpha", "beta"))
+        self.write("b.py", functions("gamma"))
+        self.rag.index_project()
+        self.embeddings.embedded.clear()
+
+    def test_unchanged_files_embed_nothing(self):
+        before = self.stored()
+        self.rag.index_project()
+        self.assertEqual(self.embeddings.embedded, [])
+        self.assertEqual(self.stored(), before)
+
+        # A touched file with identical content is re-hashed but not re-embedded
+        os.utime(self.root / "a.py", ns=(0, 1))
+        self.rag.index_project()
+        self.assertEqual(self.embeddings.embedded, [])
+
+    def test_edited_chunk_is_upserted(self):
+        self.write("a.py", functions("alpha", "delta"))
+        self.rag.index_project()
+
+        self.assertEqual(len(self.embeddings.embedded), 1)
+        self.assertIn("delta", self.embeddings.embedded[0])
+        stored = self.stored()
+        self.assertTrue(any("alpha" in text for text in stored["a.py"]))
+        self.assertFalse(any("beta" in text for text in stored["a.py"]))
+        self.assertTrue(any("delta" in text for text in stored["a.py"]))
+        self.assertIn("b.py", stored)
+
+    def test_deleted_file_chunks_are_removed(self):
+        (self.root / "b.py").unlink()
+        self.rag.index_project()
+        self.assertEqual(self.embeddings.embedded, [])
+        self.assertNotIn("b.py", self.stored())
+
+        self.rag.index_paths(["a.py"])
+        os.remove(self.root / "a.py")
+        self.rag.index_paths(["a.py"])
+        self.assertEqual(self.stored(), {})
+
+
+class TestEmbeddingPipeline(RagTestCase):
+    env = {"RAG_EMBED_BATCH_SIZE": "3", "RAG_EMBED_CONCURRENCY": "2", "RAG_EMBED_RETRY_BACKOFF": "0.5"}
+
+    def make_embeddings(self):
+        return SlowFlakyEmbeddings()
+
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            self.write(f"mod{i}.py", functions(*(f"f{i}_{j}" for j in range(4))))
+
+    def test_chunks_are_embedded_in_fixed_size_batches(self):
+        self.rag.index_project()
+        sizes = sorted((len(batch) for batch in self.embeddings.batches), reverse=True)
+        self.assertEqual(sum(sizes), 20)
+        self.assertEqual(sizes, [3] * 6 + [2])
+        self.assertEqual(sum(len(texts) for texts in self.stored().values()), 20)
+
+    def test_in_flight_batches_are_bounded(self):
+        self.rag.index_project()
+        self.assertEqual(self.embeddings.max_active, 2)
+
+    def test_transient_failures_are_retried_with_backoff(self):
+        self.embeddings.failures = 2
+        self.rag.embed_concurrency = 1
+        with patch("core.rag_engine.time.sleep") as sleep:
+            self.rag.index_project()
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [0.5, 1.0])
+        self.assertEqual(sum(len(texts) for texts in self.stored().values()), 20)
+
+        # Nothing failed for good, so the next run has nothing to do
+        self.embeddings.batches.clear()
+        self.rag.index_project()
+        self.assertEqual(self.embeddings.batches, [])
+
+    def test_persistent_failures_leave_files_for_the_next_run(self):
+        self.rag.embed_max_retries = 1
+        self.rag.embed_concurrency = 1
+        self.embeddings.failures = 2
+        with patch("core.rag_engine.time.sleep"):
+            self.rag.index_project()
+        self.assertEqual(sum(len(texts) for texts in self.stored().values()), 17)
+
+        with patch("core.rag_engine.time.sleep"):
+            self.rag.index_project()
+        self.assertEqual(sum(len(texts) for texts in self.stored().values()), 20)
+
+
+class TestSearchCache(RagTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("a.py", functions("alpha"))
+        self.rag.index_project()
+
+    def contents(self, query):
+        return [result["content"] for result in self.rag.search(query)["results"]]
+
+    def test_repeated_search_is_served_from_cache(self):
+        first = self.contents("alpha")
+        with patch.object(self.rag.vector_store, "similarity_search_by_vector") as vector_search:
+            self.assertEqual(self.contents("alpha"), first)
+        vector_search.assert_not_called()
+        self.assertEqual(self.embeddings.queries, ["alpha"])
+
+    def test_search_after_update_does_not_return_stale_hit(self):
+        self.assertEqual(self.contents("alpha"), [functions("alpha")])
+        generation = self.rag.index_generation
+
+        self.write("a.py", functions("omega"))
+        self.rag.index_project()
+        self.assertGreater(self.rag.index_generation, generation)
+        self.assertEqual(self.contents("alpha"), [functions("omega")])
+
+        self.write("b.py", functions("beta"))
+        self.rag.index_paths(["b.py"])
+        self.assertEqual(sorted(self.contents("alpha")), [functions("beta"), functions("omega")])
+
+        # The query vector does not depend on the index and stays cached
+        self.assertEqual(self.embeddings.queries, ["alpha"])
+
+    def test_unchanged_rescan_keeps_cached_results(self):
+        self.contents("alpha")
+        generation = self.rag.index_generation
+        self.rag.index_project()
+        self.assertEqual(self.rag.index_generation, generation)
+
+
+class TestPollingWatcher(RagTestCase, unittest.IsolatedAsyncioTestCase):
+    async def wait_for(self, condition, timeout=10.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition():
+            if asyncio.get_running_loop().time() > deadline:
+                self.fail(f"Index did not update; stored: {self.stored()}")
+            await asyncio.sleep(0.05)
+
+    async def test_poll_mode_indexes_created_modified_and_deleted_files(self):
+        self.write("a.py", functions("alpha"))
+        poll_env = {"RAG_WATCH_MODE": "poll", "RAG_POLL_INTERVAL": "0.05", "RAG_WATCH_DEBOUNCE_MS": "0"}
+        with patch.dict(os.environ, poll_env):
+            self.rag.start_background_indexing()
+            await self.wait_for(lambda: "a.py" in self.stored())
+
+            self.write("b.py", functions("beta"))
+            await self.wait_for(lambda: "b.py" in self.stored())
+
+            self.write("a.py", functions("alpha", "gamma"))
+            await self.wait_for(lambda: len(self.stored().get("a.py", [])) == 2)
+
+            (self.root / "b.py").unlink()
+            await self.wait_for(lambda: "b.py" not in self.stored())
+
+        self.assertEqual(list(self.stored()), ["a.py"])
+        self.assertTrue(any("gamma" in text for text in self.stored()["a.py"]))
+        task = self.rag.indexing_task
+        self.rag.close()
+        await asyncio.wait_for(asyncio.gather(task, return_exceptions=True), timeout=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import sys
+import os
+import time
+import unittest
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+from app import sandbox as sandbox_module
+from app.sandbox import Sandbox
+
+
+class TestSandboxNonBlocking(unittest.TestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.containers = []
+
+        def run_container(*args, **kwargs):
+            container = MagicMock()
+            container.logs.return_value = b"done"
+            # Simulate a slow, blocking Docker call
+            container.wait.side_effect = lambda timeout: (time.sleep(0.3), {"StatusCode": 0})[1]
+            self.containers.append(container)
+            return container
+
+        self.client.containers.run.side_effect = run_container
+        with patch('docker.from_env', return_value=self.client):
+            self.sandbox = Sandbox()
+
+    def test_event_loop_stays_responsive(self):
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            ticker_task = asyncio.create_task(ticker())
+            start = time.monotonic()
+            results = await asyncio.gather(*(self.sandbox.run_code(f"print({i})") for i in range(4)))
+            elapsed = time.monotonic() - start
+            ticker_task.cancel()
+            return results, elapsed, ticks
+
+        results, elapsed, ticks = asyncio.run(scenario())
+        self.assertEqual(results, ["done"] * 4)
+        # Runs overlap instead of queueing behind each other
+        self.assertLess(elapsed, 0.3 * 4)
+        # The loop kept running while Docker calls were in flight
+        self.assertGreater(ticks, 5)
+
+    def test_cancellation_kills_container(self):
+        async def scenario():
+            task = asyncio.create_task(self.sandbox.run_code("while True: pass"))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # Let the executor process the kill
+            await asyncio.sleep(0.3)
+
+        asyncio.run(scenario())
+        self.assertEqual(len(self.containers), 1)
+        self.containers[0].kill.assert_called()
+
+    def test_cancellation_during_container_creation_kills_it(self):
+        created = MagicMock()
+        created.logs.return_value = b"done"
+
+        def slow_create(*args, **kwargs):
+            time.sleep(0.3)
+            return created
+
+        self.client.containers.run.side_effect = slow_create
+
+        async def scenario():
+            task = asyncio.create_task(self.sandbox.run_code("while True: pass"))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # The executor thread finishes creating the container, then kills it
+            await asyncio.sleep(0.5)
+
+        asyncio.run(scenario())
+        created.kill.assert_called()
+        created.attach_socket.assert_not_called()
+
+    def test_abort_does_not_wait_for_busy_docker_workers(self):
+        busy = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(busy.shutdown)
+        release = threading.Event()
+        busy.submit(release.wait, 5)
+        container = MagicMock()
+        try:
+            with patch.object(sandbox_module, '_DOCKER_EXECUTOR', busy):
+                Sandbox._abort({"container": container})
+                for _ in range(50):
+                    if container.kill.called:
+                        break
+                    time.sleep(0.01)
+            container.kill.assert_called()
+        finally:
+            release.set()
+
+
+if __name__ == "__main__":
+    unittest.main()
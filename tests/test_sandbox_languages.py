@@ -26,7 +26,7 @@ class TestSandboxLanguages(unittest.TestCase):
             ("nodejs", ["/bin/sh", "-c", "node -e \"$(cat)\""]),
             ("go", ["/bin/sh", "-c", "cat > main.go && go run main.go"]),
             ("go-test", ["/bin/sh", "-c", "cat > main_test.go && go test -v"]),
-            ("rust", ["/bin/sh", "-c", "cat > main.rs && rustc main.rs -o main && ./main"]),
+            ("rust", ["/bin/sh", "-c", "cat > /tmp/main.rs && rustc /tmp/main.rs -o /tmp/main && /tmp/main"]),
             ("cargo-test", ["/bin/sh", "-c", "cargo test"]),
             ("npm-test", ["/bin/sh", "-c", "cat > test.js && npm test -- --test-file=test.js"]),
         ]
@@ -0,0 +1,129 @@
+import sys
+import os
+import unittest
+import asyncio
+import threading
+from unittest.mock import MagicMock, AsyncMock, patch
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+from app import network_pool
+from app.sandbox import Sandbox, reap_expired_sessions, _ACTIVE_SESSIONS
+from app.sandbox_utils import SandboxManifest
+
+
+class TestSessionScopedSidecars(unittest.TestCase):
+    def setUp(self):
+        # Each test gets a network pool bound to its own client
+        patcher = patch.object(network_pool, "_network_pool", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = MagicMock()
+        self.sidecar = MagicMock()
+        self.sidecar.status = "running"
+        self.sidecar.exec_run.return_value = MagicMock(exit_code=0)
+        self.exec_container = MagicMock()
+        self.exec_container.wait.return_value = {"StatusCode": 0}
+        self.exec_container.logs.return_value = b"ok"
+
+        def run_container(image, **kwargs):
+            return self.sidecar if kwargs.get("name", "").startswith("sidecar-") else self.exec_container
+
+        self.client.containers.run.side_effect = run_container
+        with patch('docker.from_env', return_value=self.client):
+            self.sandbox = Sandbox()
+        self.sandbox.manifest = SandboxManifest(services=[
+            {"name": "redis", "image": "redis:7", "reset": "redis-cli FLUSHALL"}
+        ])
+        self.sandbox._wait_for_service_health = AsyncMock(return_value=True)
+
+    def sidecar_starts(self):
+        return [c for c in self.client.containers.run.call_args_list
+                if c.kwargs.get("name", "").startswith("sidecar-")]
+
+    def test_sidecars_started_once_per_session(self):
+        async def attempts():
+            for _ in range(3):
+                await self.sandbox.run_code("print(1)")
+
+        asyncio.run(attempts())
+        self.assertEqual(len(self.sidecar_starts()), 1)
+        self.sidecar.stop.assert_not_called()
+
+    def test_reset_hook_runs_between_attempts(self):
+        async def attempts():
+            await self.sandbox.run_code("print(1)")
+            self.sidecar.exec_run.assert_not_called()
+            await self.sandbox.run_code("print(2)")
+
+        asyncio.run(attempts())
+        self.sidecar.exec_run.assert_called_once_with("redis-cli FLUSHALL")
+
+    def test_close_tears_down_session(self):
+        asyncio.run(self.sandbox.run_code("print(1)"))
+        network = self.sandbox.network
+        asyncio.run(self.sandbox.close())
+
+        self.sidecar.remove.assert_called_once_with(force=True)
+        network.remove.assert_called_once()
+        self.assertIsNone(self.sandbox.network)
+
+    def test_expired_session_is_reaped(self):
+        asyncio.run(self.sandbox.run_code("print(1)"))
+        self.sandbox._last_used -= self.sandbox.session_ttl + 1
+
+        self.assertEqual(reap_expired_sessions(), 1)
+        self.sidecar.remove.assert_called_once_with(force=True)
+        self.assertEqual(self.sandbox.sidecar_containers, [])
+
+    def reap_in_background(self):
+        """Start reaping the expired session and return once its teardown is blocked in stop()."""
+        self.sandbox._last_used -= self.sandbox.session_ttl + 1
+        stopping, self.release = threading.Event(), threading.Event()
+
+        def slow_stop(timeout=None):
+            stopping.set()
+            self.release.wait(5)
+
+        self.sidecar.stop.side_effect = slow_stop
+        self.reaped = []
+        self.reaper = threading.Thread(target=lambda: self.reaped.append(reap_expired_sessions()))
+        self.reaper.start()
+        self.assertTrue(stopping.wait(5))
+        self.sidecar.stop.side_effect = None
+
+    def finish_reaping(self):
+        self.release.set()
+        self.reaper.join(5)
+        self.assertEqual(self.reaped, [1])
+
+    def test_close_during_reap_tears_down_once(self):
+        asyncio.run(self.sandbox.run_code("print(1)"))
+        network = self.sandbox.network
+        self.reap_in_background()
+
+        asyncio.run(self.sandbox.close())
+        self.assertEqual(reap_expired_sessions(), 0)
+        self.finish_reaping()
+
+        self.sidecar.remove.assert_called_once_with(force=True)
+        network.remove.assert_called_once()
+
+    def test_run_during_reap_starts_fresh_sidecars(self):
+        asyncio.run(self.sandbox.run_code("print(1)"))
+        self.reap_in_background()
+
+        self.assertEqual(asyncio.run(self.sandbox.run_code("print(2)")), "ok")
+        self.finish_reaping()
+
+        self.assertEqual(len(self.sidecar_starts()), 2)
+        self.assertEqual(self.sandbox.sidecar_containers, [self.sidecar])
+        self.assertIn(self.sandbox, _ACTIVE_SESSIONS)
+        self.sandbox.cleanup_sidecars()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import sys
+import os
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+from app.database import Base, apply_sqlite_pragmas
+from app import async_crud
+from app.usage_buffer import SessionUsageBuffer
+
+
+class TestSessionUsageBuffer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{tmp.name}/test.db")
+        event.listen(self.engine.sync_engine, "connect", apply_sqlite_pragmas)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.SessionLocal = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)
+        async with self.SessionLocal() as db:
+            await async_crud.create_session(db, "s1", bug_report_id=1)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def stored(self):
+        async with self.SessionLocal() as db:
+            return await async_crud.get_session_usage(db, "s1")
+
+    def make_buffer(self, session_id="s1", **kwargs):
+        return SessionUsageBuffer(session_id, session_factory=self.SessionLocal, **kwargs)
+
+    async def test_events_are_coalesced_into_one_write(self):
+        buffer = self.make_buffer(max_events=5, max_delay_ms=60000)
+        for i in range(5):
+            await buffer.add(prompt_tokens=10, completion_tokens=2, estimated_cost=0.001, files=[f"f{i % 2}.py"],
+                             model="gpt-4o", attempt=i + 1)
+
+        self.assertEqual(buffer.stats, {"events": 5, "flushes": 1, "dropped": 0})
+        usage = await self.stored()
+        self.assertEqual((usage["prompt_tokens"], usage["completion_tokens"], usage["total_tokens"]), (50, 10, 60))
+        self.assertAlmostEqual(usage["estimated_cost"], 0.005)
+        async with self.SessionLocal() as db:
+            self.assertEqual(await async_crud.get_session_files(db, "s1"), ["f0.py", "f1.py"])
+            summary = await async_crud.get_usage_summary(db)
+        self.assertEqual(len(summary), 1)
+        self.assertEqual((summary[0]["model"], summary[0]["calls"], summary[0]["prompt_tokens"]), ("gpt-4o", 5, 50))
+
+    async def test_pending_updates_are_written_after_the_delay(self):
+        buffer = self.make_buffer(max_events=100, max_delay_ms=20)
+        await buffer.add(prompt_tokens=7)
+        await buffer.add(completion_tokens=3)
+        self.assertEqual((await self.stored())["prompt_tokens"], 0)
+
+        await asyncio.sleep(0.2)
+        self.assertEqual(buffer.pending, 0)
+        self.assertEqual(buffer.stats["flushes"], 1)
+        self.assertEqual((await self.stored())["total_tokens"], 10)
+        await buffer.close()
+
+    async def test_close_flushes_the_remainder(self):
+        buffer = self.make_buffer(max_events=100, max_delay_ms=60000)
+        await buffer.add(prompt_tokens=1, files=["a.py"])
+        await buffer.close()
+
+        usage = await self.stored()
+        self.assertEqual(usage["prompt_tokens"], 1)
+        async with self.SessionLocal() as db:
+            self.assertEqual(await async_crud.get_session_files(db, "s1"), ["a.py"])
+        self.assertEqual(buffer.stats["flushes"], 1)
+
+    async def test_failed_write_keeps_pending_totals(self):
+        buffer = self.make_buffer(max_events=100, max_delay_ms=60000)
+        await buffer.add(prompt_tokens=4)
+        with patch("app.usage_buffer.async_crud.apply_session_updates", AsyncMock(return_value=False)):
+            self.assertFalse(await buffer.flush())
+        self.assertEqual(buffer.pending, 1)
+        self.assertEqual(buffer._usage[0]["prompt_tokens"], 4)
+
+        self.assertTrue(await buffer.flush())
+        self.assertEqual((await self.stored())["prompt_tokens"], 4)
+
+    async def test_missing_session_drops_pending_reports(self):
+        buffer = self.make_buffer(session_id="missing", max_events=100, max_delay_ms=60000)
+        await buffer.add(prompt_tokens=4, files=["a.py"])
+        self.assertFalse(await buffer.flush())
+        self.assertEqual(buffer.pending, 0)
+        self.assertEqual(buffer.stats["dropped"], 1)
+        # Nothing is left to retry on close
+        with patch("app.usage_buffer.async_crud.apply_session_updates") as apply:
+            await buffer.close()
+        apply.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import sys
+import os
+import unittest
+import asyncio
+from unittest.mock import MagicMock, AsyncMock, patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add project root and backend to path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'backend'))
+
+import app.sandbox as sandbox_module
+from app.sandbox import Sandbox
+from app.sandbox_utils import SandboxManifest
+from app import crud
+from core.agent import BugExorcistAgent
+
+
+class TestVerificationCache(unittest.TestCase):
+    def setUp(self):
+        # Isolated in-memory app database
+        self.engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        sandbox_module._verification_table_ready = False
+        patches = [
+            patch('app.database.engine', self.engine),
+            patch('app.database.SessionLocal', self.SessionLocal),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        self.client = MagicMock()
+        self.client.images.get.return_value = MagicMock(id="sha256:abc")
+        with patch('docker.from_env', return_value=self.client):
+            self.sandbox = Sandbox()
+        self.sandbox.image = "bug-exorcist-proj:aaa"
+        self.sandbox.run_code = AsyncMock(return_value="ok\n")
+
+    def make_agent(self, use_cache=True):
+        with patch('app.sandbox.Sandbox'), patch.object(BugExorcistAgent, '_init_provider', return_value=MagicMock()):
+            agent = BugExorcistAgent(bug_id="test-verify-cache", use_cache=use_cache)
+        agent.sandbox = self.sandbox
+        return agent
+
+    def test_identical_fix_is_not_rerun(self):
+        agent = self.make_agent()
+        first = asyncio.run(agent.verify_fix("print('ok')"))
+        second = asyncio.run(agent.verify_fix("print('ok')"))
+
+        self.assertEqual(self.sandbox.run_code.await_count, 1)
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertTrue(second["verified"])
+        self.assertEqual(second["output"], "ok\n")
+
+    def test_key_depends_on_image_and_manifest(self):
+        key = asyncio.run(self.sandbox.verification_key("print(1)", "python"))
+        self.assertEqual(key, asyncio.run(self.sandbox.verification_key("print(1)", "python")))
+        self.assertNotEqual(key, asyncio.run(self.sandbox.verification_key("print(1)", "go")))
+
+        self.sandbox.manifest = SandboxManifest(env={"DEBUG": "1"})
+        manifest_key = asyncio.run(self.sandbox.verification_key("print(1)", "python"))
+        self.assertNotEqual(key, manifest_key)
+
+        self.sandbox.image = "bug-exorcist-proj:bbb"
+        self.client.images.get.return_value = MagicMock(id="sha256:def")
+        self.assertNotEqual(manifest_key, asyncio.run(self.sandbox.verification_key("print(1)", "python")))
+
+    def test_key_depends_on_project_and_mounted_files(self):
+        import tempfile
+        from pathlib import Path
+        first, second = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(first.cleanup)
+        self.addCleanup(second.cleanup)
+        (Path(first.name) / "fixtures").mkdir()
+        data = Path(first.name) / "fixtures" / "input.json"
+        data.write_text('{"rate": 1}')
+
+        def key():
+            return asyncio.run(self.sandbox.verification_key("print(1)", "python"))
+
+        self.sandbox.project_path = first.name
+        project_key = key()
+        self.sandbox.project_path = second.name
+        self.assertNotEqual(project_key, key())
+
+        self.sandbox.project_path = first.name
+        self.sandbox.manifest = SandboxManifest(volumes={"fixtures": "/data"})
+        mounted_key = key()
+        self.assertEqual(mounted_key, key())
+        data.write_text('{"rate": 2}')
+        self.assertNotEqual(mounted_key, key())
+
+        # Too large to digest: not memoized at all
+        with patch.dict(os.environ, {"VERIFICATION_CACHE_MAX_MOUNT_BYTES": "4"}):
+            self.assertIsNone(key())
+
+    def test_bypass_and_uncacheable_outputs(self):
+        asyncio.run(self.make_agent(use_cache=False).verify_fix("print('ok')"))
+        asyncio.run(self.make_agent().verify_fix("print('ok')"))
+        self.assertEqual(self.sandbox.run_code.await_count, 2)
+
+        self.sandbox.run_code = AsyncMock(return_value="System Error: docker went away")
+        agent = self.make_agent()
+        asyncio.run(agent.verify_fix("print('flaky')"))
+        asyncio.run(agent.verify_fix("print('flaky')"))
+        self.assertEqual(self.sandbox.run_code.await_count, 2)
+
+    def test_new_build_invalidates_older_tags(self):
+        self.sandbox._store_verification("k-old", "python", "old")
+        self.sandbox.image = "bug-exorcist-proj:bbb"
+        self.sandbox._store_verification("k-new", "python", "new")
+
+        self.sandbox._invalidate_verifications("bug-exorcist-proj:bbb")
+
+        db = self.SessionLocal()
+        try:
+            self.assertIsNone(crud.get_verification_result(db, "k-old"))
+            self.assertIsNotNone(crud.get_verification_result(db, "k-new"))
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()